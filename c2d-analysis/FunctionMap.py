@@ -1,19 +1,30 @@
 from pathlib import Path
 import json
-from PerfParser import AbstractFunctionMap
+from CategoryResolver import ResolvingFunctionMap
 
 
-class FunctionMap(AbstractFunctionMap):
-    def __init__(self, category_to_file_path, tags_path):
+class FunctionMap(ResolvingFunctionMap):
+    def __init__(
+        self,
+        category_to_file_path,
+        tags_path,
+        rules=(),
+        index_path=None,
+        derive_prefixes=False,
+    ):
         self.category_to_file_path = Path(category_to_file_path)
         self.tags_path = Path(tags_path)
 
         self.category_to_files = self._init_category_to_files()
         self.file_to_category = self._init_file_to_category()
-        self.function_to_category = self._init_function_to_category()
 
-    def get_category(self, function_name):
-        return self.function_to_category.get(function_name)
+        # tags are only read when there is no fresh persisted category index
+        super().__init__(
+            rules=rules, index_path=index_path, derive_prefixes=derive_prefixes
+        )
+
+    def get_input_paths(self):
+        return [self.category_to_file_path, self.tags_path]
 
     def _init_category_to_files(self):
         category_to_files = {}
@@ -28,12 +39,22 @@ class FunctionMap(AbstractFunctionMap):
                 file_to_category[file] = category
         return file_to_category
 
-    def _init_function_to_category(self):
-        function_to_category = {}
+    def _iter_tags(self):
         with open(self.tags_path, "r") as f:
-            tags = json.load(f)
+            if self.tags_path.suffix != ".ndjson":
+                yield from json.load(f)
+                return
+            # one tag per line, so the tags can be streamed
+            for line in f:
+                if not line.strip():
+                    continue
+                tag = json.loads(line)
+                if tag.get("kind") == "function":
+                    yield tag
 
-        for tag in tags:
+    def _build_function_to_category(self):
+        function_to_category = {}
+        for tag in self._iter_tags():
             if tag.get("kind") != "function":
                 continue
             function_name = tag.get("name")
@@ -1,5 +1,6 @@
 import os
 import shutil
+from RunManifest import RunManifest
 
 
 class Preprocessor:
@@ -9,8 +10,9 @@ class Preprocessor:
 
     VALID_KEYWORD = "Compiling..."
 
-    def __init__(self, stdout_dir):
+    def __init__(self, stdout_dir, jobs=1):
         self.stdout_dir = stdout_dir
+        self.jobs = jobs
         self.valid_dir = os.path.join(self.stdout_dir, "valid")
         self.invalid_dir = os.path.join(self.stdout_dir, "invalid")
 
@@ -18,17 +20,27 @@ class Preprocessor:
         os.makedirs(self.invalid_dir, exist_ok=True)
 
     def filter_stdout(self):
+        # validity of the logs comes from the run manifest
+        manifest = RunManifest(self.stdout_dir, jobs=self.jobs).refresh()
         for filename in os.listdir(self.stdout_dir):
             filepath = os.path.join(self.stdout_dir, filename)
-            if not os.path.isfile(filepath):
+            # skips dotfiles such as the run manifest
+            if not os.path.isfile(filepath) or filename.startswith("."):
                 continue
 
             try:
-                with open(filepath, "r") as f:
-                    contents = f.read()
-                    if Preprocessor.VALID_KEYWORD in contents:
-                        shutil.move(filepath, os.path.join(self.valid_dir, filename))
-                    else:
-                        shutil.move(filepath, os.path.join(self.invalid_dir, filename))
+                entry = manifest.get(filename)
+                if entry is not None and entry["location"] == "":
+                    valid = entry["valid"]
+                else:
+                    with open(filepath, "r") as f:
+                        valid = Preprocessor.VALID_KEYWORD in f.read()
+                if valid:
+                    shutil.move(filepath, os.path.join(self.valid_dir, filename))
+                else:
+                    shutil.move(filepath, os.path.join(self.invalid_dir, filename))
             except Exception as e:
                 print(f"Error processing file {filename}: {e}")
+        # moves keep size and mtime, so this only records the new locations
+        manifest.refresh()
+        manifest.close()
@@ -0,0 +1,26 @@
+import sys
+from functools import partial
+from pathlib import Path
+
+ANALYSIS_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ANALYSIS_DIR.parent / "perf-module"))
+sys.path.append(str(ANALYSIS_DIR))
+from PerfParser import Compiler
+from AnalysisPipeline import main
+from FunctionMap import FunctionMap
+from Preprocessor import Preprocessor
+
+# Headless analyze_times.ipynb: only stages whose inputs changed since the last
+# run are rebuilt, e.g. after each sweep:
+#   python scripts/run_analysis.py --jobs 4 --parse_jobs 8
+#   python scripts/run_analysis.py tables_completed --dry_run
+
+if __name__ == "__main__":
+    main(
+        Compiler.C2D,
+        function_map_factory=partial(FunctionMap, category_to_file_path="tags/category_to_file.json", tags_path="tags/tags.json"),
+        function_map_inputs=["tags/category_to_file.json", "tags/tags.json"],
+        preprocessor_factory=partial(Preprocessor, stdout_dir="stdout/"),
+        preprocessor_inputs=["stdout/*"],
+        root=ANALYSIS_DIR,
+    )
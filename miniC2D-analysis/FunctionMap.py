@@ -1,17 +1,26 @@
 from pathlib import Path
 import json
-from PerfParser import AbstractFunctionMap
+from CategoryResolver import ResolvingFunctionMap
 
 
-class FunctionMap(AbstractFunctionMap):
-    def __init__(self, category_to_function_path):
+class FunctionMap(ResolvingFunctionMap):
+    def __init__(
+        self,
+        category_to_function_path,
+        rules=(),
+        index_path=None,
+        derive_prefixes=False,
+    ):
         self.category_to_function_path = Path(category_to_function_path)
 
         self.category_to_functions = self._init_category_to_functions()
-        self.function_to_category = self._init_function_to_category()
 
-    def get_category(self, function_name):
-        return self.function_to_category.get(function_name)
+        super().__init__(
+            rules=rules, index_path=index_path, derive_prefixes=derive_prefixes
+        )
+
+    def get_input_paths(self):
+        return [self.category_to_function_path]
 
     def _init_category_to_functions(self):
         category_to_functions = {}
@@ -19,7 +28,7 @@ class FunctionMap(AbstractFunctionMap):
             category_to_functions = json.load(f)
         return category_to_functions
 
-    def _init_function_to_category(self):
+    def _build_function_to_category(self):
         function_to_category = {}
         for category, functions in self.category_to_functions.items():
             for function in functions:
@@ -20,7 +20,8 @@ class Preprocessor:
         perf_reports = set(os.listdir(self.perf_report_dir))
         for filename in os.listdir(self.stdout_dir):
             filepath = os.path.join(self.stdout_dir, filename)
-            if not os.path.isfile(filepath):
+            # skips dotfiles such as the run manifest
+            if not os.path.isfile(filepath) or filename.startswith("."):
                 continue
 
             if filename in perf_reports:
@@ -1,14 +1,21 @@
 import os
+import sys
 import subprocess
 import argparse
+from functools import partial
 from pathlib import Path
 from datetime import datetime
 
+sys.path.append(str(Path(__file__).resolve().parents[2] / "perf-module"))
+from ProfilingSweep import ProfilingSweep
+from JobScheduler import JobScheduler
+from SampleProfile import SampleProfile, SAMPLES_SUFFIX
+
 MAX_DELAY_MS = 1 * 60 * 60 * 1000 # hours * min/hr * sec/min * ms/sec
 
 def log(msg):
     timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    print(f"{timestamp} {msg}")
+    print(f"{timestamp} {msg}", flush=True)
 
 def ensure_directories():
     Path("./stdout").mkdir(parents=True, exist_ok=True)
@@ -28,11 +35,74 @@ def get_delay_range(log_path):
         log(f"⚠️ Failed to parse vtree time from {log_path}: {e}")
     return None
 
-def run_profiling(use_vtree_input=False):
+def profile_cnf(sweep, job, cnf_dir, cnf_path, vtree_path, delay_range, stdout_log, perf_report_log, report_format, use_vtree_input):
+    cnf_file = job["name"]
+    # each job records into its own scratch dir so concurrent jobs never share perf.data
+    perf_data = job["work_dir"] / "perf.data"
+
+    cmd = (
+        f"perf record -o {perf_data} -F max --call-graph dwarf,16384 --delay={delay_range} "
+        f"./bin/linux/miniC2D --cnf {cnf_path} "
+    )
+    if use_vtree_input:
+        cmd += f"--vtree {vtree_path}"
+    else:
+        cmd += f"--vtree_method 4"
+
+    log(f"📦 Profiling {cnf_file} with --delay={delay_range} on cores {job['cores'] or 'any'}")
+
+    # Run perf record and capture both perf and time output
+    log(f"Command: {cmd}")
+    with open(stdout_log, 'w') as out_file:
+        process = sweep.run_command(
+            cmd,
+            job,
+            stdout=out_file,
+            stderr=subprocess.STDOUT,
+            shell=True
+        )
+        if process.returncode not in [0, 143]: # 143 is perf delay timeout
+            log(f"⚠️ Failed to profile {cnf_file} (exit code: {process.returncode})")
+            return ProfilingSweep.FAILED, process.returncode
+        if process.returncode == 143:
+            log(f"Timeout expired profiling {cnf_file}")
+        else:
+            log(f"✅ Finished profiling {cnf_file}")
+
+    # Generate the perf report
+    if report_format == "samples":
+        # raw samples, interned and demangled in-process, instead of a text report
+        log(f"📊 Exporting perf samples for {cnf_file}...")
+        profile = SampleProfile.from_perf_data(perf_data, run=partial(sweep.run_command, job=job))
+        profile.save(perf_report_log)
+    else:
+        log(f"📊 Generating perf report for {cnf_file}...")
+        with open(perf_report_log, 'w') as report_file:
+            sweep.run_command(
+                f"perf report -i {perf_data} -g --call-graph=folded,0.01 --stdio | c++filt",
+                job,
+                shell=True,
+                stdout=report_file,
+                stderr=subprocess.STDOUT
+            )
+
+    # Clean up artifacts (perf.data is removed with the job's scratch dir)
+    nnf_file = os.path.join(cnf_dir, f"{cnf_file}.nnf")
+    try:
+        os.remove(nnf_file)
+    except FileNotFoundError:
+        pass
+
+    log(f"🧹 Cleanup done for {cnf_file}")
+    status = ProfilingSweep.TIMEOUT if process.returncode == 143 else ProfilingSweep.DONE
+    return status, process.returncode
+
+def run_profiling(sweep, use_vtree_input=False, report_format="text", scheduler_args=None):
     cnf_dir = "./cnfs"
     vtree_dir = "./vtree"
     vtree_logs_dir = "./vtree_logs/valid"
 
+    tasks = []
     for cnf_file in os.listdir(cnf_dir):
         if not cnf_file.endswith(".cnf"):
             continue
@@ -42,6 +112,8 @@ def run_profiling(use_vtree_input=False):
         vtree_log_path = os.path.join(vtree_logs_dir, f"{cnf_file}.log")
         stdout_log = os.path.join("./stdout", f"{cnf_file}.log")
         perf_report_log = os.path.join("./perf-report", f"{cnf_file}.log")
+        if report_format == "samples":
+            perf_report_log = os.path.join("./perf-report", f"{cnf_file}{SAMPLES_SUFFIX}")
 
         if not os.path.exists(vtree_log_path):
             continue
@@ -50,62 +122,43 @@ def run_profiling(use_vtree_input=False):
             log(f"⚠️ Skipping {cnf_file}: VTree not found.")
             continue
 
-        if os.path.exists(perf_report_log):
-            log(f"⏭️ Skipping {cnf_file}: Perf report already exists.")
-            continue
+        # reports from sweeps that predate the state file count as done
+        if os.path.exists(perf_report_log) and cnf_file not in sweep.state:
+            sweep.mark(cnf_file, status=ProfilingSweep.DONE)
 
         delay_range = get_delay_range(vtree_log_path)
         if not delay_range:
             log(f"⚠️ Skipping {cnf_file}: Could not determine delay range.")
             continue
 
-        cmd = (
-            f"perf record -F max --call-graph dwarf,16384 --delay={delay_range} "
-            f"./bin/linux/miniC2D --cnf {cnf_path} "
-        )
-        if use_vtree_input:
-            cmd += f"--vtree {vtree_path}"
-        else:
-            cmd += f"--vtree_method 4"
-
-        log(f"📦 Profiling {cnf_file} with --delay={delay_range}")
-
-        # Run perf record and capture both perf and time output
-        log(f"Command: {cmd}")
-        with open(stdout_log, 'w') as out_file:
-            process = subprocess.run(
-                cmd,
-                stdout=out_file,
-                stderr=subprocess.STDOUT,
-                shell=True
-            )
-            if process.returncode not in [0, 143]: # 143 is perf delay timeout
-                log(f"⚠️ Failed to profile {cnf_file} (exit code: {process.returncode})")
-                continue
-            if process.returncode == 143:
-                log(f"Timeout expired profiling {cnf_file}")
-            else:
-                log(f"✅ Finished profiling {cnf_file}")
-
-        # Generate the perf report
-        log(f"📊 Generating perf report for {cnf_file}...")
-        with open(perf_report_log, 'w') as report_file:
-            subprocess.run(
-                "perf report -g --call-graph=folded,0.01 --stdio | c++filt",
-                shell=True,
-                stdout=report_file,
-                stderr=subprocess.STDOUT
+        tasks.append((
+            cnf_file,
+            partial(
+                profile_cnf,
+                sweep,
+                cnf_dir=cnf_dir,
+                cnf_path=cnf_path,
+                vtree_path=vtree_path,
+                delay_range=delay_range,
+                stdout_log=stdout_log,
+                perf_report_log=perf_report_log,
+                report_format=report_format,
+                use_vtree_input=use_vtree_input,
             )
+        ))
+
+    predictions = None
+    if scheduler_args is not None and scheduler_args.order == "predicted":
+        scheduler = JobScheduler(cnf_dir, history_dir=scheduler_args.history)
+        budget = None
+        if scheduler_args.budget_hours is not None:
+            budget = scheduler_args.budget_hours * 60 * 60
+        tasks, predictions = scheduler.order_tasks(
+            tasks, sweep, objective=scheduler_args.objective, budget=budget
+        )
+        log(f"🗂️ Ordered {len(tasks)} jobs by predicted runtime ({scheduler_args.objective})")
 
-        # Clean up artifacts
-        nnf_file = os.path.join(cnf_dir, f"{cnf_file}.nnf")
-        for f in [nnf_file, "perf.data", "perf.data.old"]:
-            try:
-                os.remove(f)
-            except FileNotFoundError:
-                pass
-
-        log(f"🧹 Cleanup done for {cnf_file}")
+    sweep.run(tasks, predictions)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -115,6 +168,26 @@ if __name__ == "__main__":
         default=False,
         help="Use --vtree <file> instead of --vtree_method 4"
     )
+    parser.add_argument("--jobs", type=int, default=1, help="Concurrent perf record jobs")
+    parser.add_argument("--cores_per_job", type=int, default=1, help="Cores pinned to each job")
+    parser.add_argument("--reserve_cores", type=int, default=0, help="Cores left unassigned to limit interference")
+    parser.add_argument("--state", default="./sweep_state.json", help="Resumable job-state file")
+    parser.add_argument("--retry_failed", action="store_true", default=False, help="Rerun jobs that failed")
+    parser.add_argument("--order", choices=["listdir", "predicted"], default="listdir", help="Job order")
+    parser.add_argument("--objective", choices=JobScheduler.OBJECTIVES, default="most_completed", help="Goal of the predicted order")
+    parser.add_argument("--budget_hours", type=float, default=None, help="Drop jobs predicted not to start within this wall-clock budget")
+    parser.add_argument("--report_format", choices=["text", "samples"], default="text", help="Text perf report, or a compact sample file built from perf script")
+    parser.add_argument("--history", default="./stdout", help="Stdout logs of earlier runs used to fit the runtime model")
+    parser.add_argument("--work_dir", default="./perf-work", help="Where each job's scratch dir (perf.data, TMPDIR) is created")
     args = parser.parse_args()
+
     ensure_directories()
-    run_profiling(use_vtree_input=args.use_vtree_input)
+    sweep = ProfilingSweep(
+        state_path=args.state,
+        jobs=args.jobs,
+        cores_per_job=args.cores_per_job,
+        reserve_cores=args.reserve_cores,
+        work_dir=args.work_dir,
+        retry_failed=args.retry_failed,
+    )
+    run_profiling(sweep, use_vtree_input=args.use_vtree_input, report_format=args.report_format, scheduler_args=args)
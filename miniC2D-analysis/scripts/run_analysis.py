@@ -0,0 +1,27 @@
+import sys
+from functools import partial
+from pathlib import Path
+
+ANALYSIS_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ANALYSIS_DIR.parent / "perf-module"))
+sys.path.append(str(ANALYSIS_DIR))
+from PerfParser import Compiler
+from AnalysisPipeline import main
+from FunctionMap import FunctionMap
+from Preprocessor import Preprocessor
+
+# Headless analyze_times.ipynb: only stages whose inputs changed since the last
+# run are rebuilt, e.g. after each sweep:
+#   python scripts/run_analysis.py --jobs 4 --parse_jobs 8
+#   python scripts/run_analysis.py tables_completed --dry_run
+
+if __name__ == "__main__":
+    main(
+        Compiler.MINIC2D,
+        function_map_factory=partial(FunctionMap, category_to_function_path="tags/category_to_functions.json"),
+        function_map_inputs=["tags/category_to_functions.json"],
+        # stdout logs are sorted by whether the CNF has a perf report
+        preprocessor_factory=partial(Preprocessor, stdout_dir="stdout/", perf_report_dir="perf-report/"),
+        preprocessor_inputs=["stdout/*", "perf-report/*"],
+        root=ANALYSIS_DIR,
+    )
@@ -0,0 +1,548 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from BatchPlotter import BatchPlotter
+from CNFAnalyzer import CNFAnalyzer
+from PerfParser import PerfParser, StatMode
+from PerfTableGenerator import PerfTableGenerator
+from ProfilingSweep import log
+from ReportBuilder import REPORT_SUBSETS
+from RunManifest import RunManifest
+
+STATE_NAME = "pipeline_state.json"
+TABLES_DIR = "stats/tables"
+PLOTS_DIR = "plots"
+PARSE_CACHE_NAME = "stats/parse_cache.sqlite"
+CNF_ANALYSIS_NAME = "stats/cnf_analysis.json"
+# rows spilled by a streaming PerfParser while writing the CNF stats
+SPILL_NAME = "stats/cnf_rows.ndjson"
+
+# the notebooks' stats files, written by the "perf_stats" stage;
+# {prefix} is "unnorm" or "norm"
+STATS_FILES = {
+    StatMode.CNF_STATS: "stats/cnf_stats.json",
+    StatMode.AGGREGATE_STATS: "stats/{prefix}_agg_cnf_stats.json",
+    StatMode.CATEGORY_STATS: "stats/{prefix}_category_stats.json",
+    StatMode.TIMED_OUT_STATS: "stats/timed_out/cnf_stats.json",
+    StatMode.AGGREGATE_TIMED_OUT_STATS: "stats/timed_out/{prefix}_agg_stats.json",
+    StatMode.CATEGORY_TIMED_OUT_STATS: "stats/timed_out/{prefix}_category_stats.json",
+    StatMode.COMPLETED_STATS: "stats/completed/cnf_stats.json",
+    StatMode.AGGREGATE_COMPLETED_STATS: "stats/completed/{prefix}_agg_stats.json",
+    StatMode.CATEGORY_COMPLETED_STATS: "stats/completed/{prefix}_category_stats.json",
+}
+
+
+class Stage:
+    """
+    One step of an AnalysisPipeline.
+
+    - fn: picklable callable run with no arguments (e.g. a `partial` of a
+      module-level function), so it can run in a worker process
+    - inputs / outputs: glob patterns relative to the pipeline root
+    - deps: names of stages that must finish first
+    - params: JSON-serializable settings that also invalidate the outputs
+    - moves_inputs: the stage moves its inputs away (e.g. the Preprocessors),
+      so its inputs are fingerprinted after it runs
+    """
+
+    def __init__(
+        self,
+        name,
+        fn,
+        inputs=(),
+        outputs=(),
+        deps=(),
+        params=None,
+        moves_inputs=False,
+    ):
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.params = params or {}
+        self.moves_inputs = moves_inputs
+
+
+class AnalysisPipeline:
+    """
+    Make-style runner over a dependency graph of Stages.
+
+    A stage reruns only when its inputs' fingerprint (the path, size and
+    mtime of every file its input patterns match, plus its params) differs
+    from the one recorded after its last successful run, or when its outputs
+    are missing or were changed since. Upstream outputs are listed as
+    downstream inputs, so a stage that reran invalidates its dependents.
+
+    Stages whose dependencies are done run concurrently on up to `jobs`
+    worker processes. Fingerprints are kept in a JSON state file, like
+    ProfilingSweep's.
+
+    State File Fields (per stage name):
+    - fingerprint: of the inputs and params the outputs were built from
+    - outputs: fingerprint of the outputs when they were written
+    - finished: timestamp
+    - wall_seconds
+    """
+
+    UP_TO_DATE = "up_to_date"
+    DONE = "done"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+    def __init__(self, root, stages, state_path=None, jobs=1):
+        self.root = Path(root)
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown {dep}")
+        self.state_path = Path(state_path) if state_path else self.root / STATE_NAME
+        self.jobs = jobs
+        self.state = self._load_state()
+
+    def run(self, targets=None, force=False, dry_run=False):
+        """
+        Brings `targets` (default: every stage) and their dependencies up to
+        date. `force` reruns every selected stage; `dry_run` only reports
+        which stages would run, assuming stale stages change their outputs.
+
+        Returns {stage name: UP_TO_DATE, DONE, FAILED or SKIPPED (a
+        dependency failed)}.
+        """
+        selected = self._select(targets)
+        order = self._topological_order(selected)
+        statuses = {}
+        remaining = list(order)
+        running = {}
+
+        executor = None
+        if self.jobs > 1 and not dry_run:
+            executor = ProcessPoolExecutor(max_workers=self.jobs)
+        try:
+            while remaining or running:
+                for name in list(remaining):
+                    stage = self.stages[name]
+                    dep_statuses = [statuses.get(dep) for dep in stage.deps]
+                    if any(status is None for status in dep_statuses):
+                        continue
+                    remaining.remove(name)
+
+                    if any(s in (self.FAILED, self.SKIPPED) for s in dep_statuses):
+                        log(f"Skipping {name}: a dependency failed")
+                        statuses[name] = self.SKIPPED
+                        continue
+
+                    fingerprint = self._fingerprint(stage)
+                    upstream_ran = self.DONE in dep_statuses
+                    if not force and not (dry_run and upstream_ran):
+                        if self._is_up_to_date(stage, fingerprint):
+                            statuses[name] = self.UP_TO_DATE
+                            continue
+
+                    if dry_run:
+                        log(f"Would run {name}")
+                        statuses[name] = self.DONE
+                    elif executor is None:
+                        statuses[name] = self._run_stage(stage, fingerprint)
+                    else:
+                        log(f"Running {name}...")
+                        future = executor.submit(stage.fn)
+                        running[future] = (stage, fingerprint, time.time())
+
+                if not running:
+                    # stages are visited in dependency order, so with nothing
+                    # running every remaining stage is ready on the next pass
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, fingerprint, started = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        log(f"Stage {stage.name} failed: {e!r}")
+                        statuses[stage.name] = self.FAILED
+                        continue
+                    self._mark_done(stage, fingerprint, time.time() - started)
+                    statuses[stage.name] = self.DONE
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        return {name: statuses[name] for name in order}
+
+    def stale_stages(self, targets=None):
+        """
+        Names of the stages a `run(targets)` would (re)run.
+        """
+        statuses = self.run(targets, dry_run=True)
+        return [name for name, status in statuses.items() if status == self.DONE]
+
+    def _run_stage(self, stage, fingerprint):
+        log(f"Running {stage.name}...")
+        started = time.time()
+        try:
+            stage.fn()
+        except Exception as e:
+            log(f"Stage {stage.name} failed: {e!r}")
+            return self.FAILED
+        self._mark_done(stage, fingerprint, time.time() - started)
+        return self.DONE
+
+    def _mark_done(self, stage, fingerprint, wall_seconds):
+        if stage.moves_inputs:
+            fingerprint = self._fingerprint(stage)
+        self.state[stage.name] = {
+            "fingerprint": fingerprint,
+            "outputs": fingerprint_paths(self.root, stage.outputs),
+            "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "wall_seconds": wall_seconds,
+        }
+        self._save_state()
+        log(f"Finished {stage.name} in {wall_seconds:.1f}s")
+
+    def _is_up_to_date(self, stage, fingerprint):
+        recorded = self.state.get(stage.name)
+        if recorded is None or recorded["fingerprint"] != fingerprint:
+            return False
+        for pattern in stage.outputs:
+            if not any(self.root.glob(pattern)):
+                return False
+        return recorded["outputs"] == fingerprint_paths(self.root, stage.outputs)
+
+    def _fingerprint(self, stage):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps(stage.params, sort_keys=True).encode())
+        h.update(fingerprint_paths(self.root, stage.inputs).encode())
+        return h.hexdigest()
+
+    def _select(self, targets):
+        if targets is None:
+            return set(self.stages)
+        selected = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}")
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.stages[name].deps)
+        return selected
+
+    def _topological_order(self, selected):
+        order = []
+        visiting = set()
+
+        def visit(name):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through {name}")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        # stage definition order breaks ties
+        for name in self.stages:
+            if name in selected:
+                visit(name)
+        return order
+
+    def _load_state(self):
+        if self.state_path.exists():
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self):
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=4)
+        tmp_path.replace(self.state_path)
+
+
+def fingerprint_paths(root, patterns):
+    """
+    Hash of the relative path, size and mtime of every file the glob
+    `patterns` match under `root`; dotfiles (e.g. the run manifest) are
+    ignored.
+    """
+    root = Path(root)
+    h = hashlib.blake2b(digest_size=16)
+    for pattern in patterns:
+        h.update(pattern.encode())
+        for path in sorted(root.glob(pattern)):
+            if path.name.startswith(".") or not path.is_file():
+                continue
+            st = path.stat()
+            h.update(
+                f"{path.relative_to(root)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode()
+            )
+    return h.hexdigest()
+
+
+def stats_paths(normalize):
+    """
+    {StatMode: stats file path} of the "perf_stats" stage.
+    """
+    prefix = "norm" if normalize else "unnorm"
+    return {
+        stat_mode: path.format(prefix=prefix) for stat_mode, path in STATS_FILES.items()
+    }
+
+
+def build_analysis_stages(
+    root,
+    compiler,
+    function_map_factory,
+    function_map_inputs,
+    preprocessor_factory,
+    preprocessor_inputs=("stdout/*",),
+    normalize=False,
+    jobs=1,
+    streaming=False,
+):
+    """
+    The analyze_times notebook as Stages:
+
+    filter_stdout -> perf_stats -> tables_{all,completed,timed_out}, plots
+                  -> filter_cnfs -> cnf_features
+
+    - compiler: a PerfParser Compiler
+    - function_map_factory / preprocessor_factory: picklable callables
+      building the compiler's FunctionMap and Preprocessor (relative paths
+      are resolved against `root`, the compiler's analysis directory)
+    - function_map_inputs / preprocessor_inputs: glob patterns of the files
+      each reads
+    - jobs: worker processes used inside the parsing stages
+    - streaming: parse the perf reports in PerfParser's streaming mode,
+      keeping memory flat for very large corpora (the outputs are the same)
+    """
+    root = str(Path(root).resolve())
+    params = {"compiler": compiler.value, "normalize": normalize}
+    stats = stats_paths(normalize)
+    stages = [
+        Stage(
+            "filter_stdout",
+            partial(_filter_stdout, root, preprocessor_factory, jobs),
+            inputs=preprocessor_inputs,
+            moves_inputs=True,
+        ),
+        Stage(
+            "perf_stats",
+            partial(
+                _write_perf_stats,
+                root,
+                compiler,
+                function_map_factory,
+                normalize,
+                jobs,
+                streaming,
+            ),
+            inputs=["perf-report/*", "stdout/valid/*.log", *function_map_inputs],
+            outputs=list(stats.values()),
+            deps=["filter_stdout"],
+            params=params,
+        ),
+    ]
+    for subset, (aggregate_mode, category_mode) in REPORT_SUBSETS.items():
+        aggregate_path = stats[aggregate_mode]
+        category_path = stats[category_mode]
+        stages.append(
+            Stage(
+                f"tables_{subset}",
+                partial(_write_tables, root, subset, aggregate_path, category_path),
+                inputs=[aggregate_path, category_path],
+                outputs=[
+                    f"{TABLES_DIR}/{subset}_function_table.tex",
+                    f"{TABLES_DIR}/{subset}_category_table.tex",
+                ],
+                deps=["perf_stats"],
+            )
+        )
+    stages += [
+        Stage(
+            "plots",
+            partial(_write_plots, root, stats[StatMode.CNF_STATS], normalize),
+            inputs=[stats[StatMode.CNF_STATS]],
+            outputs=[f"{PLOTS_DIR}/*_time_percent.png"],
+            deps=["perf_stats"],
+            params={"normalize": normalize},
+        ),
+        Stage(
+            "filter_cnfs",
+            partial(_filter_cnfs, root, jobs),
+            inputs=["cnfs/*.cnf", "stdout/valid/*.log"],
+            deps=["filter_stdout"],
+            moves_inputs=True,
+        ),
+        Stage(
+            "cnf_features",
+            partial(_write_cnf_features, root, jobs),
+            inputs=["cnfs/valid/*.cnf", "stdout/valid/*.log"],
+            outputs=[CNF_ANALYSIS_NAME, f"{TABLES_DIR}/cnf_table.tex"],
+            deps=["filter_cnfs"],
+        ),
+    ]
+    return stages
+
+
+# stage functions: module-level so they can be sent to worker processes, and
+# run from the analysis directory like the notebooks
+
+
+def _filter_stdout(root, preprocessor_factory, jobs):
+    with _cwd(root):
+        preprocessor_factory().filter_stdout()
+        # index the logs once here, so the stages after this one, which may
+        # run concurrently, find the manifest current
+        RunManifest("stdout", jobs=jobs).refresh().close()
+
+
+def _write_perf_stats(
+    root, compiler, function_map_factory, normalize, jobs, streaming=False
+):
+    with _cwd(root):
+        perf_parser = PerfParser(
+            compiler=compiler,
+            function_map=function_map_factory(),
+            perf_dir="perf-report/",
+            stdout_dir="stdout/valid/",
+            normalize=normalize,
+            jobs=jobs,
+            cache_path=PARSE_CACHE_NAME,
+            streaming=streaming,
+            spill_path=SPILL_NAME if streaming else None,
+        )
+        paths = stats_paths(normalize)
+        perf_parser.compute(*paths)
+        for stat_mode, path in paths.items():
+            perf_parser.to_json(path, stat_mode)
+        if streaming:
+            Path(SPILL_NAME).unlink()
+
+
+def _write_tables(root, subset, aggregate_path, category_path):
+    with _cwd(root):
+        table_generator = PerfTableGenerator(
+            agg_stats_path=aggregate_path, category_stats_path=category_path
+        )
+        tables_dir = Path(TABLES_DIR)
+        tables_dir.mkdir(parents=True, exist_ok=True)
+        with open(tables_dir / f"{subset}_function_table.tex", "w") as f:
+            f.write(table_generator.generate_function_table_latex())
+        with open(tables_dir / f"{subset}_category_table.tex", "w") as f:
+            f.write(table_generator.generate_category_table_latex())
+
+
+def _write_plots(root, cnf_stats_path, normalize):
+    with _cwd(root):
+        BatchPlotter(cnf_stats_path).plot_all(PLOTS_DIR, normalize=normalize)
+
+
+def _filter_cnfs(root, jobs):
+    with _cwd(root):
+        CNFAnalyzer(
+            cnfs_dir="cnfs", valid_stdouts_dir="stdout/valid", jobs=jobs
+        ).preprocess()
+
+
+def _write_cnf_features(root, jobs):
+    with _cwd(root):
+        analyzer = CNFAnalyzer(
+            cnfs_dir="cnfs", valid_stdouts_dir="stdout/valid", jobs=jobs
+        )
+        # average_stats_to_latex runs analyze() and fills stats_by_category
+        latex = analyzer.average_stats_to_latex()
+        Path(TABLES_DIR).mkdir(parents=True, exist_ok=True)
+        with open(Path(TABLES_DIR) / "cnf_table.tex", "w") as f:
+            f.write(latex)
+        with open(CNF_ANALYSIS_NAME, "w") as f:
+            json.dump(analyzer.stats_by_category, f, indent=4)
+
+
+@contextmanager
+def _cwd(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def main(
+    compiler,
+    function_map_factory,
+    function_map_inputs,
+    preprocessor_factory,
+    preprocessor_inputs=("stdout/*",),
+    root=".",
+    argv=None,
+):
+    """
+    Command-line entry point shared by the compilers' run_analysis.py
+    scripts. Exits with 1 if a stage failed.
+    """
+    parser = argparse.ArgumentParser(
+        description=f"Rebuild the stale {compiler.value} stats, tables and plots"
+    )
+    parser.add_argument("targets", nargs="*", help="Stages to bring up to date")
+    parser.add_argument("--jobs", type=int, default=1, help="Stages run concurrently")
+    parser.add_argument(
+        "--parse_jobs",
+        type=int,
+        default=1,
+        help="Worker processes inside the parsing stages",
+    )
+    parser.add_argument("--normalize", action="store_true", default=False)
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        default=False,
+        help="Aggregate the perf reports with bounded memory",
+    )
+    parser.add_argument("--force", action="store_true", default=False)
+    parser.add_argument("--dry_run", action="store_true", default=False)
+    parser.add_argument("--state", default=None, help="Fingerprint state file")
+    parser.add_argument("--list", action="store_true", default=False)
+    args = parser.parse_args(argv)
+
+    stages = build_analysis_stages(
+        root,
+        compiler,
+        function_map_factory,
+        function_map_inputs,
+        preprocessor_factory,
+        preprocessor_inputs,
+        normalize=args.normalize,
+        jobs=args.parse_jobs,
+        streaming=args.streaming,
+    )
+    pipeline = AnalysisPipeline(root, stages, state_path=args.state, jobs=args.jobs)
+    if args.list:
+        for stage in stages:
+            deps = ", ".join(stage.deps) or "-"
+            print(f"{stage.name:<16} after: {deps}")
+        return
+
+    statuses = pipeline.run(
+        args.targets or None, force=args.force, dry_run=args.dry_run
+    )
+    if args.dry_run:
+        return
+    for name, status in statuses.items():
+        log(f"{name}: {status}")
+    if AnalysisPipeline.FAILED in statuses.values():
+        sys.exit(1)
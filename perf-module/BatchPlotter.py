@@ -0,0 +1,205 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from tqdm import tqdm
+from CNFStatsTable import CNFStatsTable
+from PerfParser import PerfParser
+from StatsIO import load_stats
+
+# above this many CNFs, completed runs are drawn as a hexbin density
+DENSITY_THRESHOLD = 5000
+HEXBIN_GRIDSIZE = 60
+FORMATS = ["png", "svg"]
+
+
+class BatchPlotter:
+    """
+    Headless counterpart of SatPlotter: category share vs. compile time for
+    every category at once, written to image files instead of shown.
+
+    Per-CNF shares of all categories come from one bincount over the
+    columnar rows (see `category_shares`), and figures are drawn on the Agg
+    canvas directly, so pyplot's global state (e.g. a notebook's inline
+    backend) is left alone and rendering can run in worker processes.
+    """
+
+    COLUMNS = ["category", "self_pct", "norm_self_pct"]
+
+    def __init__(self, cnf_stats_path, cnfs=None):
+        """
+        cnf_stats_path: .json, .ndjson or .npz CNF stats
+        cnfs: optional subset of CNF names to load
+        """
+        self.cnf_stats_path = Path(cnf_stats_path)
+        if self.cnf_stats_path.suffix == ".npz":
+            self.table = CNFStatsTable.load_npz(
+                self.cnf_stats_path, cnfs, BatchPlotter.COLUMNS
+            )
+        else:
+            cnf_stats = load_stats(
+                self.cnf_stats_path, keys=cnfs, columns=BatchPlotter.COLUMNS
+            )
+            self.table = CNFStatsTable.from_cnf_stats(
+                cnf_stats, columns=BatchPlotter.COLUMNS
+            )
+
+    def category_shares(self, normalize=False):
+        return category_shares(self.table, normalize)
+
+    def plot_all(
+        self,
+        output_dir,
+        categories=None,
+        normalize=False,
+        show_best_fit=True,
+        formats=("png",),
+        jobs=1,
+        density_threshold=DENSITY_THRESHOLD,
+    ):
+        """
+        Writes `<output_dir>/<category>_time_percent.<format>` for every
+        category (or those in `categories`) and returns the written paths.
+        """
+        for fmt in formats:
+            if fmt not in FORMATS:
+                raise ValueError(f"Invalid format: {fmt}")
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        times, names, shares = self.category_shares(normalize)
+        if categories is None:
+            categories = names
+        timed_out = times == PerfParser.TIMEOUT
+
+        plots = []
+        for category in categories:
+            if category not in names:
+                continue
+            share = shares[:, names.index(category)]
+            plots.append(
+                {
+                    "category": category,
+                    "x": times[~timed_out],
+                    "y": share[~timed_out],
+                    "x_timeout": times[timed_out],
+                    "y_timeout": share[timed_out],
+                    "show_best_fit": show_best_fit,
+                    "density": len(times) > density_threshold,
+                    "paths": [
+                        output_dir / f"{_file_stem(category)}_time_percent.{fmt}"
+                        for fmt in formats
+                    ],
+                }
+            )
+
+        if jobs > 1 and len(plots) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                written = list(
+                    tqdm(
+                        executor.map(render_category_plot, plots),
+                        total=len(plots),
+                        desc="Plotting Categories...",
+                    )
+                )
+        else:
+            written = [
+                render_category_plot(plot)
+                for plot in tqdm(plots, desc="Plotting Categories...")
+            ]
+        return [path for paths in written for path in paths]
+
+
+def category_shares(table, normalize=False):
+    """
+    Returns (times, categories, shares) for the CNFs of a CNFStatsTable that
+    have rows and a runtime: shares[i, j] is CNF i's fraction of samples in
+    category j (norm_self_pct, or self_pct / 100 like SatPlotter).
+    """
+    shares = table.category_shares(normalize)
+    has_rows = np.bincount(table.cnf_id, minlength=table.num_cnfs) > 0
+    keep = has_rows & ~np.isnan(table.times)
+    categories = [str(category) for category in table.categories]
+    return table.times[keep], categories, shares[keep]
+
+
+def get_best_fit(x, y, num_points=500):
+    """
+    Least-squares line of y on log(x), sampled over x's range.
+    """
+    x_np = np.array(x)
+    y_np = np.array(y)
+
+    coeffs = np.polyfit(np.log(x_np), y_np, deg=1)
+    best_fit_fn = np.poly1d(coeffs)
+    x_fit = np.linspace(x_np.min(), x_np.max(), num_points)
+    y_fit = best_fit_fn(np.log(x_fit))
+
+    return x_fit, y_fit
+
+
+def render_category_plot(plot):
+    """
+    Draws one category's share-vs-time figure (a `BatchPlotter.plot_all`
+    plot spec) and saves it to each of its paths.
+    """
+    category = plot["category"]
+    x, y = plot["x"], plot["y"]
+    x_timeout, y_timeout = plot["x_timeout"], plot["y_timeout"]
+
+    fig = Figure(figsize=(10, 10))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    if plot["density"]:
+        if len(x) > 0:
+            hexbin = ax.hexbin(
+                x,
+                y,
+                xscale="log",
+                gridsize=HEXBIN_GRIDSIZE,
+                bins="log",
+                mincnt=1,
+                cmap="Blues",
+                extent=(np.log10(x.min()), np.log10(x.max()), 0, 1),
+            )
+            fig.colorbar(hexbin, ax=ax, label="Completed CNFs (log count)")
+        if len(x_timeout) > 0:
+            # timed-out runs share one x, so summarize rather than bin them
+            q1, median, q3 = np.percentile(y_timeout, [25, 50, 75])
+            ax.errorbar(
+                [PerfParser.TIMEOUT],
+                [median],
+                yerr=[[median - q1], [q3 - median]],
+                color="red",
+                marker="x",
+                capsize=6,
+                label=f"Timed Out (median, IQR; n={len(x_timeout)})",
+            )
+    else:
+        ax.scatter(x, y, color="blue", label="Completed")
+        ax.scatter(x_timeout, y_timeout, color="red", label="Timed Out", marker="x")
+
+    if plot["show_best_fit"] and len(np.unique(x)) > 1:
+        x_fit, y_fit = get_best_fit(x, y)
+        ax.plot(
+            x_fit, y_fit, color="green", label="Best Fit Line (log-scale on x-axis)"
+        )
+
+    label = category.upper()
+    ax.set_xlabel("Total Time Spent Compiling (seconds, log-scale)")
+    ax.set_ylabel(f"Percent of Time in {label} Functions")
+    ax.set_title(f"{label} Function Percent vs. CNF Compile Time")
+    ax.legend()
+    ax.set_xscale("log")
+    ax.set_ylim(0, 1)
+
+    for path in plot["paths"]:
+        fig.savefig(path)
+    return plot["paths"]
+
+
+def _file_stem(category):
+    return re.sub(r"[^\w.-]+", "_", category) or "_"
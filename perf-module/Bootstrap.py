@@ -0,0 +1,58 @@
+import numpy as np
+
+BOOTSTRAP_RESAMPLES = 1000
+CONFIDENCE = 0.95
+# resamples drawn and reduced per matrix product, bounding temporary memory
+BOOTSTRAP_BATCH_SIZE = 256
+
+
+def bootstrap_ratio_intervals(
+    numerators,
+    denominators,
+    num_resamples=BOOTSTRAP_RESAMPLES,
+    confidence=CONFIDENCE,
+    seed=None,
+    batch_size=BOOTSTRAP_BATCH_SIZE,
+):
+    """
+    Percentile bootstrap intervals of sum(numerators[:, j]) / sum(denominators)
+    with the rows (CNFs) resampled with replacement.
+
+    Each batch of resamples is a (batch, rows) matrix of draw counts, so the
+    resampled sums of every column come from one matrix product rather than
+    a Python loop per resample.
+
+    numerators: (rows, columns), e.g. CNF x function times
+    denominators: (rows,), e.g. CNF runtimes
+    Returns (low, high) arrays of length `columns`.
+    """
+    numerators = np.asarray(numerators, dtype=np.float64)
+    denominators = np.asarray(denominators, dtype=np.float64)
+    num_rows, num_columns = numerators.shape
+    if num_rows == 0:
+        return np.full(num_columns, np.nan), np.full(num_columns, np.nan)
+
+    rng = np.random.default_rng(seed)
+    ratios = np.empty((num_resamples, num_columns))
+    for start in range(0, num_resamples, batch_size):
+        stop = min(start + batch_size, num_resamples)
+        size = stop - start
+        draws = rng.integers(0, num_rows, size=(size, num_rows))
+        offsets = np.arange(size)[:, None] * num_rows
+        counts = np.bincount(
+            (draws + offsets).ravel(), minlength=size * num_rows
+        ).reshape(size, num_rows)
+
+        sums = counts @ numerators
+        totals = counts @ denominators
+        np.divide(
+            sums,
+            totals[:, None],
+            out=ratios[start:stop],
+            where=totals[:, None] > 0,
+        )
+        ratios[start:stop][totals <= 0] = np.nan
+
+    alpha = (1 - confidence) / 2
+    low, high = np.nanquantile(ratios, [alpha, 1 - alpha], axis=0)
+    return low, high
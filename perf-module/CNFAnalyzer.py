@@ -1,12 +1,266 @@
+import mmap
 import os
+import re
 import shutil
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
+from RunManifest import RunManifest
+from Instrumentation import NULL_INSTRUMENTATION
+
+# scanned in newline-aligned windows so multi-GB CNFs stay in bounded memory
+SCAN_CHUNK_SIZE = 16 * 1024 * 1024
+HEADER_PATTERN = re.compile(rb"^[ \t]*p\s+cnf\s+(\d+)\s+(\d+)", re.MULTILINE)
+# lines starting with these after leading whitespace are comments or headers;
+# everything else is clause literals
+SKIPPED_LINE_PREFIXES = [b"c", b"p"]
+MINUS, ZERO, NEWLINE = b"-0\n"
+
+SUMMARY_FEATURES = ["num_vars", "num_clauses", "total_size"]
+
+
+def scan_cnf(cnf_path, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    Single pass over a memory-mapped DIMACS file, tokenizing literals with
+    NumPy (see `iter_clause_blocks`).
+
+    Result Fields:
+    - num_vars / num_clauses: from the "p cnf" header
+    - total_size: number of literals
+    - clause_length_histogram: clauses per length (index = length)
+    - max_clause_length / mean_clause_length
+    - binary_fraction: fraction of clauses with exactly two literals
+    - horn_fraction: fraction of clauses with at most one positive literal
+    - positive_fraction: fraction of literals that are positive
+    - polarity_balance: mean over used variables of |pos - neg| / (pos + neg),
+      0 when every variable appears equally often in both polarities
+    - used_vars / max_var_occurrences / mean_var_occurrences
+    - positive_occurrences / negative_occurrences: per-variable counts
+      (index = variable)
+    """
+    num_vars, num_clauses = read_cnf_header(cnf_path)
+    state = _ScanState(num_vars)
+    for literals, zeros in iter_clause_blocks(cnf_path, chunk_size):
+        state.add_clauses(literals, zeros)
+    return _scan_result(num_vars, num_clauses, state)
+
+
+def read_cnf_header(cnf_path):
+    """
+    Returns (num_vars, num_clauses) from the "p cnf" header, or (0, 0).
+    """
+    with open(cnf_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header = HEADER_PATTERN.search(mm)
+            if header is None:
+                return 0, 0
+            return int(header.group(1)), int(header.group(2))
+
+
+def iter_clause_blocks(cnf_path, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    Yields (literals, zeros) blocks of whole clauses from a memory-mapped
+    DIMACS file: `literals` holds each clause's literals followed by its 0
+    terminator, and `zeros` the terminator positions. Clauses may span lines
+    and chunks; a SATLIB-style "%" line ends the formula.
+    """
+    with open(cnf_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # the leading comments and header need no token filtering
+            header = HEADER_PATTERN.search(mm)
+            start = 0
+            if header:
+                start = mm.find(b"\n", header.end()) + 1 or size
+            end = mm.find(b"\n%", max(start - 1, 0))
+            end = size if end == -1 else end + 1
+
+            carry = np.empty(0, dtype=np.int64)
+            while start < end:
+                stop = min(start + chunk_size, end)
+                if stop < end:
+                    newline = mm.rfind(b"\n", start, stop)
+                    if newline == -1:
+                        # a single line longer than the chunk
+                        newline = mm.find(b"\n", stop, end)
+                    stop = end if newline == -1 else newline + 1
+                literals = _parse_literals(mm, start, stop)
+                start = stop
+
+                # literals after the last 0 carry into the next chunk
+                if len(carry) > 0:
+                    literals = np.concatenate((carry, literals))
+                zeros = np.flatnonzero(literals == 0)
+                if len(zeros) == 0:
+                    carry = literals
+                    continue
+                carry = literals[zeros[-1] + 1 :]
+                yield literals[: zeros[-1] + 1], zeros
+
+    # a final clause without its 0 terminator still counts
+    if len(carry) > 0:
+        yield np.append(carry, 0), np.array([len(carry)])
+
+
+def _parse_literals(mm, start, stop):
+    """
+    Returns the clause literals (including 0 terminators) in the
+    newline-aligned window [start, stop) of `mm`.
+    """
+    buf = np.frombuffer(mm, dtype=np.uint8, count=stop - start, offset=start)
+
+    # clause lines hold only digits, "-" and whitespace, so every byte at or
+    # above "-" is part of a token; anything else lands on skipped lines
+    is_token = buf >= MINUS
+    token_starts = is_token.copy()
+    token_starts[1:] &= ~is_token[:-1]
+    token_ends = is_token
+    token_ends[:-1] &= ~is_token[1:]
+    token_starts = np.flatnonzero(token_starts)
+    token_ends = np.flatnonzero(token_ends) + 1
+
+    if _has_skipped_lines(mm, start, stop):
+        token_starts, token_ends = _drop_skipped_tokens(buf, token_starts, token_ends)
+
+    if len(token_starts) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    negative = buf[token_starts] == MINUS
+    digit_starts = token_starts + negative
+    num_digits = token_ends - digit_starts
+
+    # decode tokens of each width at once: a row of digit bytes dotted with
+    # powers of ten, minus the "0" offsets (exact in float64 below 2**53)
+    values = np.empty(len(token_starts), dtype=np.int64)
+    for width in range(1, int(num_digits.max()) + 1):
+        selected = np.flatnonzero(num_digits == width)
+        if len(selected) == 0:
+            continue
+        rows = sliding_window_view(buf, width)[digit_starts[selected]]
+        powers = 10.0 ** np.arange(width - 1, -1, -1)
+        values[selected] = rows @ powers - ZERO * powers.sum()
+
+    values[negative] *= -1
+    return values
+
+
+def _has_skipped_lines(mm, start, stop):
+    # clause lines hold no letters, so windows without them skip the filtering
+    return any(mm.find(prefix, start, stop) != -1 for prefix in SKIPPED_LINE_PREFIXES)
+
+
+def _drop_skipped_tokens(buf, token_starts, token_ends):
+    """
+    Drops the tokens of lines whose first token starts with a skipped prefix,
+    i.e. `line.strip().startswith("c")`, so indented comments are skipped too.
+    """
+    newlines = np.flatnonzero(buf == NEWLINE)
+    token_lines = np.searchsorted(newlines, token_starts)
+    first_in_line = np.ones(len(token_starts), dtype=bool)
+    first_in_line[1:] = token_lines[1:] != token_lines[:-1]
+    prefixes = np.frombuffer(b"".join(SKIPPED_LINE_PREFIXES), dtype=np.uint8)
+    skipped_lines = token_lines[first_in_line & np.isin(buf[token_starts], prefixes)]
+    in_skipped = np.isin(token_lines, skipped_lines)
+    return token_starts[~in_skipped], token_ends[~in_skipped]
+
+
+class _ScanState:
+    """
+    Running totals of `scan_cnf` over clause blocks.
+    """
+
+    def __init__(self, num_vars):
+        self.clause_lengths = np.zeros(0, dtype=np.int64)
+        self.horn_clauses = 0
+        self.positive_occurrences = np.zeros(num_vars + 1, dtype=np.int64)
+        self.negative_occurrences = np.zeros(num_vars + 1, dtype=np.int64)
+
+    def add_clauses(self, literals, zeros):
+        lengths = np.diff(zeros, prepend=-1) - 1
+        self.clause_lengths = _add_counts(self.clause_lengths, np.bincount(lengths))
+
+        positive_counts = np.cumsum(literals > 0)[zeros]
+        positive_per_clause = np.diff(positive_counts, prepend=0)
+        self.horn_clauses += int(np.count_nonzero(positive_per_clause <= 1))
+
+        positive = literals[literals > 0]
+        negative = -literals[literals < 0]
+        self.positive_occurrences = _add_counts(
+            self.positive_occurrences, np.bincount(positive)
+        )
+        self.negative_occurrences = _add_counts(
+            self.negative_occurrences, np.bincount(negative)
+        )
+
+
+def _add_counts(totals, counts):
+    if len(counts) > len(totals):
+        totals = np.concatenate(
+            (totals, np.zeros(len(counts) - len(totals), dtype=totals.dtype))
+        )
+    totals[: len(counts)] += counts
+    return totals
+
+
+def _scan_result(num_vars, num_clauses, state):
+    histogram = state.clause_lengths
+    num_parsed = int(histogram.sum())
+    total_size = int(np.dot(histogram, np.arange(len(histogram))))
+
+    # without a header, or with an undercounted one, either polarity may have
+    # grown past num_vars on its own
+    num_counts = max(len(state.positive_occurrences), len(state.negative_occurrences))
+    positive = _add_counts(
+        np.zeros(num_counts, dtype=np.int64), state.positive_occurrences
+    )
+    negative = _add_counts(
+        np.zeros(num_counts, dtype=np.int64), state.negative_occurrences
+    )
+    occurrences = positive + negative
+    used = occurrences > 0
+    used_vars = int(np.count_nonzero(used))
+
+    return {
+        "num_vars": num_vars,
+        "num_clauses": num_clauses,
+        "total_size": total_size,
+        "clause_length_histogram": histogram,
+        "max_clause_length": len(histogram) - 1 if num_parsed else 0,
+        "mean_clause_length": total_size / num_parsed if num_parsed else 0.0,
+        "binary_fraction": (
+            int(histogram[2]) / num_parsed if len(histogram) > 2 else 0.0
+        ),
+        "horn_fraction": state.horn_clauses / num_parsed if num_parsed else 0.0,
+        "positive_fraction": (int(positive.sum()) / total_size if total_size else 0.0),
+        "polarity_balance": (
+            float(np.mean(np.abs(positive[used] - negative[used]) / occurrences[used]))
+            if used_vars
+            else 0.0
+        ),
+        "used_vars": used_vars,
+        "max_var_occurrences": int(occurrences.max()) if used_vars else 0,
+        "mean_var_occurrences": total_size / used_vars if used_vars else 0.0,
+        "positive_occurrences": positive,
+        "negative_occurrences": negative,
+    }
 
 
 class CNFAnalyzer:
-    def __init__(self, cnfs_dir, valid_stdouts_dir):
+    def __init__(self, cnfs_dir, valid_stdouts_dir, jobs=1, instrumentation=None):
         self.cnfs_dir = cnfs_dir
         self.valid_stdouts_dir = valid_stdouts_dir
+        self.jobs = jobs
+        # optional Instrumentation recording per-stage metrics
+        if instrumentation is None:
+            instrumentation = NULL_INSTRUMENTATION
+        self.instrumentation = instrumentation
+        self.run_manifest = RunManifest(valid_stdouts_dir, jobs=jobs)
         self.valid_cnfs_dir = os.path.join(cnfs_dir, "valid")
         self.invalid_cnfs_dir = os.path.join(cnfs_dir, "invalid")
 
@@ -24,10 +278,9 @@ class CNFAnalyzer:
             if not file.endswith(".cnf"):
                 continue
 
-            log_path = os.path.join(self.valid_stdouts_dir, f"{file}.log")
             src_path = os.path.join(self.cnfs_dir, file)
 
-            if os.path.exists(log_path):
+            if self.run_manifest.get_cnf(file) is not None:
                 dst_path = os.path.join(self.valid_cnfs_dir, file)
             else:
                 dst_path = os.path.join(self.invalid_cnfs_dir, file)
@@ -36,22 +289,35 @@ class CNFAnalyzer:
             print(f"Moved {file} to {dst_path}")
 
     def analyze(self):
-        for file in os.listdir(self.valid_cnfs_dir):
-            if not file.endswith(".cnf"):
-                continue
-
-            path = os.path.join(self.valid_cnfs_dir, file)
-            stats = self._analyze_file(path)
-            self.stats_by_category["all"].append(stats)
+        files = [
+            file for file in os.listdir(self.valid_cnfs_dir) if file.endswith(".cnf")
+        ]
+        paths = [os.path.join(self.valid_cnfs_dir, file) for file in files]
 
-            if self._cnf_timed_out(file):
-                self.stats_by_category["timed_out"].append(stats)
+        with self.instrumentation.stage("scan_cnfs", cnfs=len(paths)):
+            if self.jobs > 1 and len(paths) > 1:
+                with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                    # map() keeps submission order, so categories fill as before
+                    all_stats = list(executor.map(CNFAnalyzer._analyze_file, paths))
             else:
-                self.stats_by_category["completed"].append(stats)
+                all_stats = [CNFAnalyzer._analyze_file(path) for path in paths]
+            if self.instrumentation.enabled:
+                self.instrumentation.count(
+                    bytes_read=sum(os.path.getsize(path) for path in paths)
+                )
+
+        with self.instrumentation.stage("classify_cnfs"):
+            for file, stats in zip(files, all_stats):
+                self.stats_by_category["all"].append(stats)
+
+                if self._cnf_timed_out(file):
+                    self.stats_by_category["timed_out"].append(stats)
+                else:
+                    self.stats_by_category["completed"].append(stats)
 
         return self.stats_by_category
 
-    def average_stats(self):
+    def average_stats(self, features=SUMMARY_FEATURES):
         self.analyze()
         averages = {}
 
@@ -59,21 +325,14 @@ class CNFAnalyzer:
             if len(stats_list) == 0:
                 continue
 
-            total = {
-                "num_vars": 0,
-                "num_clauses": 0,
-                "total_size": 0,
-            }
+            total = {feature: 0 for feature in features}
             for stat in stats_list:
-                total["num_vars"] += stat["num_vars"]
-                total["num_clauses"] += stat["num_clauses"]
-                total["total_size"] += stat["total_size"]
+                for feature in features:
+                    total[feature] += stat[feature]
 
             num_cnfs = len(stats_list)
             averages[category] = {
-                "num_vars": total["num_vars"] / num_cnfs,
-                "num_clauses": total["num_clauses"] / num_cnfs,
-                "total_size": total["total_size"] / num_cnfs,
+                feature: total[feature] / num_cnfs for feature in features
             }
 
         return averages
@@ -98,33 +357,17 @@ class CNFAnalyzer:
                 )
         return df.to_latex(index=False, escape=True)
 
-    def _analyze_file(self, cnf_path):
-        num_vars = 0
-        num_clauses = 0
-        total_size = 0
-
-        with open(cnf_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith("c"):
-                    continue
-                elif line.startswith("p cnf"):
-                    _, _, num_vars, num_clauses = line.split()
-                    num_vars = int(num_vars)
-                    num_clauses = int(num_clauses)
-                else:
-                    literals = line.split()
-                    total_size += len([lit for lit in literals if lit != "0"])
-
-        return {
-            "num_vars": num_vars,
-            "num_clauses": num_clauses,
-            "total_size": total_size,
-        }
+    @staticmethod
+    def _analyze_file(cnf_path):
+        """
+        Structural features of one CNF, JSON-serializable (see `scan_cnf`
+        for the per-variable occurrence counts).
+        """
+        scan = scan_cnf(cnf_path)
+        del scan["positive_occurrences"]
+        del scan["negative_occurrences"]
+        scan["clause_length_histogram"] = scan["clause_length_histogram"].tolist()
+        return scan
 
     def _cnf_timed_out(self, cnf_name):
-        log_file = os.path.join(self.valid_stdouts_dir, f"{cnf_name}.log")
-        if not os.path.exists(log_file):
-            return False
-        with open(log_file, "r") as f:
-            return "Total Time:" not in f.read()
+        return self.run_manifest.timed_out(cnf_name)
@@ -0,0 +1,642 @@
+from array import array
+import numpy as np
+
+# per-function row fields, in the order PerfParser writes them
+ROW_FIELDS = (
+    "children_pct",
+    "self_pct",
+    "command",
+    "sharedobject",
+    "symbol",
+    "norm_self_pct",
+    "category",
+)
+# integer report-header fields kept per CNF (-1 when the header lacks one)
+METADATA_COUNTS = ("samples", "event_count", "lost_samples")
+
+
+class CNFStatsTable:
+    """
+    Columnar backing store for PerfParser.cnf_stats.
+
+    Every function row of every CNF becomes one entry in flat NumPy columns,
+    with symbol, category and command strings interned into lookup tables:
+
+    Row Columns:
+    - cnf_id, symbol_id, category_id, command_id
+    - self_pct, children_pct, norm_self_pct
+
+    CNF Columns (indexed by cnf_id):
+    - cnf_names
+    - times: reported runtime (NaN when unknown)
+    - integral_times: runtime was recorded as an int (the TIMEOUT fallback)
+    - has_stats: False for CNFs without a perf report
+    - metadata: optional report-header columns (None for tables built from
+      stats without metadata): has_metadata, samples, event_count,
+      lost_samples (int64, -1 when unknown) and event_id into events
+    """
+
+    def __init__(
+        self,
+        cnf_names,
+        times,
+        integral_times,
+        has_stats,
+        sharedobject,
+        symbols,
+        categories,
+        commands,
+        cnf_id,
+        symbol_id,
+        category_id,
+        command_id,
+        self_pct,
+        children_pct,
+        norm_self_pct,
+        metadata=None,
+    ):
+        self.cnf_names = cnf_names
+        self.times = times
+        self.integral_times = integral_times
+        self.has_stats = has_stats
+        self.sharedobject = sharedobject
+        self.symbols = symbols
+        self.categories = categories
+        self.commands = commands
+
+        self.cnf_id = cnf_id
+        self.symbol_id = symbol_id
+        self.category_id = category_id
+        self.command_id = command_id
+        self.self_pct = self_pct
+        self.children_pct = children_pct
+        self.norm_self_pct = norm_self_pct
+        self.metadata = metadata
+
+        # (normalize, cnf_mask) -> function_times result, shared by the
+        # function and category aggregations of the same subset
+        self._function_times_cache = {}
+
+    @classmethod
+    def from_cnf_stats(cls, cnf_stats, columns=None):
+        """
+        Builds the table from the dict-of-dicts `PerfParser.cnf_stats` shape,
+        preserving CNF and row order. With `columns`, only the row fields in
+        it are read (as loaded by `load_stats(..., columns=...)`) and the rest
+        are left as None, like `load_npz`.
+        """
+        if columns is not None:
+            return cls._from_cnf_stats_columns(cnf_stats, columns)
+
+        builder = CNFStatsTableBuilder()
+        for cnf, data in cnf_stats.items():
+            builder.append(cnf, data)
+        return builder.build()
+
+    @classmethod
+    def _from_cnf_stats_columns(cls, cnf_stats, columns):
+        category_ids = {}
+        cnf_names, times, integral_times, has_stats = [], [], [], []
+        cnf_id, category_id = [], []
+        pcts = {field: [] for field in ("self_pct", "children_pct", "norm_self_pct")}
+        pcts = {field: values for field, values in pcts.items() if field in columns}
+
+        for i, (cnf, data) in enumerate(cnf_stats.items()):
+            cnf_names.append(cnf)
+            time = data.get("time")
+            times.append(np.nan if time is None else time)
+            integral_times.append(isinstance(time, int))
+            has_stats.append("stats" in data)
+
+            for stat in data.get("stats", []):
+                cnf_id.append(i)
+                if "category" in columns:
+                    category = stat.get("category")
+                    category_id.append(
+                        category_ids.setdefault(category, len(category_ids))
+                    )
+                for field, values in pcts.items():
+                    values.append(stat.get(field, 0))
+
+        def column(field, values, dtype):
+            return np.array(values, dtype=dtype) if field in columns else None
+
+        return cls(
+            cnf_names=np.array(cnf_names, dtype=object),
+            times=np.array(times, dtype=np.float64),
+            integral_times=np.array(integral_times, dtype=bool),
+            has_stats=np.array(has_stats, dtype=bool),
+            sharedobject=None,
+            symbols=None,
+            categories=column("category", list(category_ids), object),
+            commands=None,
+            cnf_id=np.array(cnf_id, dtype=np.int32),
+            symbol_id=None,
+            category_id=column("category", category_id, np.int32),
+            command_id=None,
+            self_pct=column("self_pct", pcts.get("self_pct"), np.float64),
+            children_pct=column("children_pct", pcts.get("children_pct"), np.float64),
+            norm_self_pct=column(
+                "norm_self_pct", pcts.get("norm_self_pct"), np.float64
+            ),
+            metadata=_metadata_columns(
+                data.get("metadata") for data in cnf_stats.values()
+            ),
+        )
+
+    @property
+    def num_cnfs(self):
+        return len(self.cnf_names)
+
+    @property
+    def num_rows(self):
+        return len(self.cnf_id)
+
+    def nbytes(self):
+        """
+        Approximate memory held by the table, counting each interned string
+        once.
+        """
+        arrays = [
+            self.times,
+            self.integral_times,
+            self.has_stats,
+            self.cnf_id,
+            self.symbol_id,
+            self.category_id,
+            self.command_id,
+            self.self_pct,
+            self.children_pct,
+            self.norm_self_pct,
+        ]
+        # tables loaded with a column subset leave the other columns None
+        total = sum(a.nbytes for a in arrays if a is not None)
+        for table in (self.cnf_names, self.symbols, self.categories, self.commands):
+            if table is not None:
+                total += table.nbytes + sum(len(str(s)) for s in table)
+        return total
+
+    def timed_out_mask(self, timeout):
+        # CNFs without a report have no "time" and count as timed out, exactly
+        # like `stats.get("time", TIMEOUT) >= TIMEOUT`
+        times = np.where(self.has_stats, self.times, timeout)
+        return times >= timeout
+
+    def completed_mask(self, timeout):
+        times = np.where(self.has_stats, self.times, timeout)
+        return times < timeout
+
+    def category_shares(self, normalize):
+        """
+        (num_cnfs, num_categories) matrix of each CNF's share of samples per
+        category (norm_self_pct, or self_pct / 100), columns in
+        `categories` order.
+        """
+        num_categories = len(self.categories)
+        weights = self.norm_self_pct if normalize else self.self_pct / 100.0
+        return np.bincount(
+            self.cnf_id.astype(np.int64) * num_categories + self.category_id,
+            weights=weights,
+            minlength=self.num_cnfs * num_categories,
+        ).reshape(self.num_cnfs, num_categories)
+
+    def function_times(self, normalize, cnf_mask=None, cnf_weights=None):
+        """
+        Returns (symbol_ids, times, total_time) for the CNFs selected by
+        `cnf_mask`, with symbols in the order the dict implementation first
+        encounters them. `cnf_weights` (e.g. sample counts) replaces each
+        CNF's runtime as the scale of its rows.
+        """
+        key = (
+            normalize,
+            None if cnf_mask is None else cnf_mask.tobytes(),
+            None if cnf_weights is None else cnf_weights.tobytes(),
+        )
+        if key not in self._function_times_cache:
+            self._function_times_cache[key] = self._function_times(
+                normalize, cnf_mask, cnf_weights
+            )
+        return self._function_times_cache[key]
+
+    def _function_times(self, normalize, cnf_mask, cnf_weights):
+        cnf_times = self.times if cnf_weights is None else cnf_weights
+        cnf_times = np.where(self.has_stats, cnf_times, 0.0)
+        if cnf_mask is None:
+            cnf_mask = np.ones(self.num_cnfs, dtype=bool)
+
+        # plain Python sum keeps the same float rounding as the dict version
+        total_time = sum(cnf_times[cnf_mask].tolist())
+
+        row_mask = cnf_mask[self.cnf_id] & (cnf_times[self.cnf_id] != 0)
+        row_symbols = self.symbol_id[row_mask]
+        self_pct = (
+            self.norm_self_pct[row_mask]
+            if normalize
+            else self.self_pct[row_mask] / 100.0
+        )
+        row_times = self_pct * cnf_times[self.cnf_id[row_mask]]
+
+        # bincount accumulates sequentially in row order, like the dict loop
+        times = np.bincount(row_symbols, weights=row_times, minlength=len(self.symbols))
+
+        # first row index of every symbol, i.e. dict insertion order
+        num_rows = len(row_symbols)
+        first_seen = np.full(len(self.symbols), num_rows, dtype=np.int64)
+        np.minimum.at(first_seen, row_symbols, np.arange(num_rows))
+        present = np.flatnonzero(first_seen < num_rows)
+        symbol_ids = present[np.argsort(first_seen[present], kind="stable")]
+        return symbol_ids, times[symbol_ids], total_time
+
+    def function_time_matrix(self, normalize, cnf_mask=None):
+        """
+        Per-CNF function times behind `function_times`, for resampling CNFs.
+        Returns (symbol_ids, cnf_times, times), where only the selected CNFs
+        with a non-zero runtime are kept as rows and `times` is the dense
+        (CNF, symbol) matrix of their function times, columns in
+        `symbol_ids` order.
+        """
+        symbol_ids, _, _ = self.function_times(normalize, cnf_mask)
+        cnf_times = np.where(self.has_stats, self.times, 0.0)
+        if cnf_mask is None:
+            cnf_mask = np.ones(self.num_cnfs, dtype=bool)
+        cnfs = np.flatnonzero(cnf_mask & (cnf_times != 0))
+
+        rows = np.full(self.num_cnfs, -1, dtype=np.int64)
+        rows[cnfs] = np.arange(len(cnfs))
+        columns = np.full(len(self.symbols), -1, dtype=np.int64)
+        columns[symbol_ids] = np.arange(len(symbol_ids))
+
+        row_mask = rows[self.cnf_id] >= 0
+        self_pct = (
+            self.norm_self_pct[row_mask]
+            if normalize
+            else self.self_pct[row_mask] / 100.0
+        )
+        cnf_ids = self.cnf_id[row_mask]
+        times = np.bincount(
+            rows[cnf_ids] * len(symbol_ids) + columns[self.symbol_id[row_mask]],
+            weights=self_pct * cnf_times[cnf_ids],
+            minlength=len(cnfs) * len(symbol_ids),
+        ).reshape(len(cnfs), len(symbol_ids))
+        return symbol_ids, cnf_times[cnfs], times
+
+    def aggregate(self, normalize, get_category, cnf_mask=None, cnf_weights=None):
+        """
+        Vectorized equivalent of `PerfParser._aggregate_cnf_stats`.
+        """
+        symbol_ids, times, total_time = self.function_times(
+            normalize, cnf_mask, cnf_weights
+        )
+        assert total_time > 0, "Total time should be greater than 0"
+
+        order = np.argsort(-times, kind="stable")
+        function_stats = {}
+        for symbol_id, time in zip(symbol_ids[order].tolist(), times[order].tolist()):
+            function_name = self.symbols[symbol_id]
+            function_stats[function_name] = {
+                "time": time,
+                "pct": time / total_time,
+                "category": get_category(function_name),
+            }
+        return function_stats
+
+    def aggregate_by_category(
+        self, normalize, get_category, cnf_mask=None, cnf_weights=None
+    ):
+        """
+        Vectorized equivalent of `PerfParser._aggregate_cnf_stats_by_category`
+        applied to the output of `aggregate`.
+        """
+        symbol_ids, times, _ = self.function_times(normalize, cnf_mask, cnf_weights)
+        order = np.argsort(-times, kind="stable")
+        symbol_ids = symbol_ids[order]
+        times = times[order]
+
+        nonzero = times != 0
+        symbol_ids = symbol_ids[nonzero]
+        times = times[nonzero]
+
+        category_ids = {}
+        function_categories = np.array(
+            [
+                category_ids.setdefault(
+                    get_category(self.symbols[symbol_id]), len(category_ids)
+                )
+                for symbol_id in symbol_ids.tolist()
+            ],
+            dtype=np.int32,
+        )
+        category_times = np.bincount(
+            function_categories, weights=times, minlength=len(category_ids)
+        ).tolist()
+        total_time = sum(category_times)
+        assert total_time > 0, "Total time should be greater than 0"
+
+        categories = list(category_ids)
+        order = np.argsort(-np.array(category_times), kind="stable")
+        return {
+            categories[i]: {
+                "time": category_times[i],
+                "pct": category_times[i] / total_time,
+            }
+            for i in order.tolist()
+        }
+
+    def to_cnf_stats(self, cnf_mask=None, columns=None):
+        """
+        Rebuilds the dict-of-dicts `PerfParser.cnf_stats` shape for the CNFs
+        selected by `cnf_mask`, keeping only the row fields in `columns`.
+        """
+        return dict(self.iter_cnf_stats(cnf_mask, columns))
+
+    def iter_cnf_stats(self, cnf_mask=None, columns=None):
+        """
+        Yields (cnf, data) in the `PerfParser.cnf_stats` shape one CNF at a
+        time.
+        """
+        if cnf_mask is None:
+            cnf_mask = np.ones(self.num_cnfs, dtype=bool)
+        fields = [f for f in ROW_FIELDS if columns is None or f in columns]
+
+        # rows are stored grouped by CNF, so each CNF is a contiguous slice
+        starts = np.searchsorted(self.cnf_id, np.arange(self.num_cnfs), side="left")
+        ends = np.searchsorted(self.cnf_id, np.arange(self.num_cnfs), side="right")
+
+        for i in np.flatnonzero(cnf_mask).tolist():
+            data = {}
+            if self.has_stats[i]:
+                data["stats"] = self._rows_to_dicts(starts[i], ends[i], fields)
+                time = self.times[i]
+                if np.isnan(time):
+                    data["time"] = None
+                elif self.integral_times[i]:
+                    data["time"] = int(time)
+                else:
+                    data["time"] = float(time)
+                if self.metadata is not None and self.metadata["has_metadata"][i]:
+                    data["metadata"] = self.cnf_metadata(i)
+            yield self.cnf_names[i], data
+
+    def cnf_metadata(self, i):
+        """
+        The report metadata dict of CNF `i`, as stored in `cnf_stats`.
+        """
+        metadata = self.metadata
+        event_id = int(metadata["event_id"][i])
+        counts = {field: int(metadata[field][i]) for field in METADATA_COUNTS}
+        return {
+            "samples": None if counts["samples"] < 0 else counts["samples"],
+            "event": None if event_id < 0 else str(metadata["events"][event_id]),
+            "event_count": (
+                None if counts["event_count"] < 0 else counts["event_count"]
+            ),
+            "lost_samples": (
+                None if counts["lost_samples"] < 0 else counts["lost_samples"]
+            ),
+        }
+
+    def metadata_counts(self, field):
+        """
+        Per-CNF `samples`, `event_count` or `lost_samples` as floats, NaN
+        where unknown.
+        """
+        if self.metadata is None:
+            return np.full(self.num_cnfs, np.nan)
+        counts = self.metadata[field].astype(np.float64)
+        counts[self.metadata[field] < 0] = np.nan
+        return counts
+
+    def save_npz(self, output_path, cnf_mask=None):
+        """
+        Writes the CNFs selected by `cnf_mask` as an uncompressed .npz of
+        plain arrays. Rows are addressed by `row_offsets` (CSR layout), so a
+        reader can slice out single CNFs.
+        """
+        if cnf_mask is None:
+            cnf_mask = np.ones(self.num_cnfs, dtype=bool)
+        cnf_ids = np.flatnonzero(cnf_mask)
+        row_mask = cnf_mask[self.cnf_id]
+        counts = np.bincount(self.cnf_id, minlength=self.num_cnfs)[cnf_ids]
+
+        metadata = {}
+        if self.metadata is not None:
+            metadata = {
+                f"metadata_{field}": self.metadata[field][cnf_ids]
+                for field in ("has_metadata", "event_id") + METADATA_COUNTS
+            }
+            metadata["metadata_events"] = self.metadata["events"].astype(str)
+
+        np.savez(
+            output_path,
+            **metadata,
+            cnf_names=self.cnf_names[cnf_ids].astype(str),
+            times=self.times[cnf_ids],
+            integral_times=self.integral_times[cnf_ids],
+            has_stats=self.has_stats[cnf_ids],
+            row_offsets=np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            sharedobject=np.array(self.sharedobject or ""),
+            symbols=self.symbols.astype(str),
+            categories=self.categories.astype(str),
+            commands=self.commands.astype(str),
+            symbol_id=self.symbol_id[row_mask],
+            category_id=self.category_id[row_mask],
+            command_id=self.command_id[row_mask],
+            self_pct=self.self_pct[row_mask],
+            children_pct=self.children_pct[row_mask],
+            norm_self_pct=self.norm_self_pct[row_mask],
+        )
+
+    @classmethod
+    def load_npz(cls, path, cnfs=None, columns=None):
+        """
+        Loads a table written by `save_npz`, reading only the rows of `cnfs`
+        (all CNFs if None) and only the arrays behind the row fields in
+        `columns` (all if None). Unloaded row fields are left as None.
+        """
+        with np.load(path, allow_pickle=False) as npz:
+            cnf_names = npz["cnf_names"]
+            row_offsets = npz["row_offsets"]
+            if cnfs is None:
+                selected = np.arange(len(cnf_names))
+            else:
+                selected = np.flatnonzero(np.isin(cnf_names, list(cnfs)))
+
+            counts = row_offsets[selected + 1] - row_offsets[selected]
+            rows = np.concatenate(
+                [np.arange(row_offsets[i], row_offsets[i + 1]) for i in selected]
+                or [np.zeros(0, dtype=np.int64)]
+            )
+
+            def load(field, array_name, table=None):
+                if columns is not None and field not in columns:
+                    return None, None
+                values = npz[array_name][rows]
+                if table is None:
+                    return values, None
+                return values, np.array(npz[table].tolist(), dtype=object)
+
+            metadata = None
+            # tables saved before report metadata was kept have none
+            if "metadata_has_metadata" in npz.files:
+                metadata = {
+                    field: npz[f"metadata_{field}"][selected]
+                    for field in ("has_metadata", "event_id") + METADATA_COUNTS
+                }
+                metadata["events"] = np.array(
+                    npz["metadata_events"].tolist(), dtype=object
+                )
+
+            symbol_id, symbols = load("symbol", "symbol_id", "symbols")
+            category_id, categories = load("category", "category_id", "categories")
+            command_id, commands = load("command", "command_id", "commands")
+            self_pct, _ = load("self_pct", "self_pct")
+            children_pct, _ = load("children_pct", "children_pct")
+            norm_self_pct, _ = load("norm_self_pct", "norm_self_pct")
+
+            return cls(
+                cnf_names=np.array(cnf_names[selected].tolist(), dtype=object),
+                times=npz["times"][selected],
+                integral_times=npz["integral_times"][selected],
+                has_stats=npz["has_stats"][selected],
+                sharedobject=str(npz["sharedobject"]) or None,
+                symbols=symbols,
+                categories=categories,
+                commands=commands,
+                cnf_id=np.repeat(np.arange(len(selected), dtype=np.int32), counts),
+                symbol_id=symbol_id,
+                category_id=category_id,
+                command_id=command_id,
+                self_pct=self_pct,
+                children_pct=children_pct,
+                norm_self_pct=norm_self_pct,
+                metadata=metadata,
+            )
+
+    def _row_field(self, field, start, end):
+        match field:
+            case "children_pct":
+                return self.children_pct[start:end].tolist()
+            case "self_pct":
+                return self.self_pct[start:end].tolist()
+            case "command":
+                return [self.commands[i] for i in self.command_id[start:end].tolist()]
+            case "sharedobject":
+                return [self.sharedobject] * (end - start)
+            case "symbol":
+                return [self.symbols[i] for i in self.symbol_id[start:end].tolist()]
+            case "norm_self_pct":
+                return self.norm_self_pct[start:end].tolist()
+            case "category":
+                return [
+                    self.categories[i] for i in self.category_id[start:end].tolist()
+                ]
+
+    def _rows_to_dicts(self, start, end, fields=ROW_FIELDS):
+        values = [self._row_field(field, start, end) for field in fields]
+        return [dict(zip(fields, row)) for row in zip(*values)]
+
+
+def _metadata_columns(metadatas):
+    """
+    Metadata columns of the CNFs' report metadata (in order, None for CNFs
+    without one), or None when no CNF has report metadata.
+    """
+    event_ids = {}
+    has_metadata, event_id = [], []
+    counts = {field: [] for field in METADATA_COUNTS}
+    for metadata in metadatas:
+        has_metadata.append(metadata is not None)
+        metadata = metadata or {}
+        event = metadata.get("event")
+        event_id.append(
+            -1 if event is None else event_ids.setdefault(event, len(event_ids))
+        )
+        for field, values in counts.items():
+            value = metadata.get(field)
+            values.append(-1 if value is None else value)
+
+    if not any(has_metadata):
+        return None
+    return {
+        "has_metadata": np.array(has_metadata, dtype=bool),
+        "event_id": np.array(event_id, dtype=np.int32),
+        "events": np.array(list(event_ids), dtype=object),
+        **{field: np.array(values, dtype=np.int64) for field, values in counts.items()},
+    }
+
+
+class CNFStatsTableBuilder:
+    """
+    Builds a CNFStatsTable one CNF at a time, interning strings as rows are
+    appended into typed buffers, so a table can be filled while reports are
+    parsed without first holding every CNF's stats as dicts.
+    """
+
+    def __init__(self):
+        self.symbol_ids = {}
+        self.category_ids = {}
+        self.command_ids = {}
+        self.sharedobject = None
+
+        self.cnf_names = []
+        self.times = array("d")
+        self.integral_times = array("b")
+        self.has_stats = array("b")
+        self.metadatas = []
+
+        self.cnf_id = array("i")
+        self.symbol_id = array("i")
+        self.category_id = array("i")
+        self.command_id = array("i")
+        self.self_pct = array("d")
+        self.children_pct = array("d")
+        self.norm_self_pct = array("d")
+
+    def append(self, cnf, data):
+        """
+        Appends one CNF's `PerfParser.cnf_stats` entry; CNFs keep the order
+        they are appended in.
+        """
+        i = len(self.cnf_names)
+        self.cnf_names.append(cnf)
+        time = data.get("time")
+        self.times.append(np.nan if time is None else time)
+        self.integral_times.append(isinstance(time, int))
+        self.has_stats.append("stats" in data)
+        self.metadatas.append(data.get("metadata"))
+
+        for stat in data.get("stats", []):
+            self.sharedobject = stat["sharedobject"]
+            self.cnf_id.append(i)
+            self.symbol_id.append(
+                self.symbol_ids.setdefault(stat["symbol"], len(self.symbol_ids))
+            )
+            self.category_id.append(
+                self.category_ids.setdefault(stat["category"], len(self.category_ids))
+            )
+            self.command_id.append(
+                self.command_ids.setdefault(stat["command"], len(self.command_ids))
+            )
+            self.self_pct.append(stat["self_pct"])
+            self.children_pct.append(stat["children_pct"])
+            self.norm_self_pct.append(stat["norm_self_pct"])
+
+    def build(self):
+        return CNFStatsTable(
+            cnf_names=np.array(self.cnf_names, dtype=object),
+            times=np.array(self.times, dtype=np.float64),
+            integral_times=np.array(self.integral_times, dtype=bool),
+            has_stats=np.array(self.has_stats, dtype=bool),
+            sharedobject=self.sharedobject,
+            symbols=np.array(list(self.symbol_ids), dtype=object),
+            categories=np.array(list(self.category_ids), dtype=object),
+            commands=np.array(list(self.command_ids), dtype=object),
+            cnf_id=np.array(self.cnf_id, dtype=np.int32),
+            symbol_id=np.array(self.symbol_id, dtype=np.int32),
+            category_id=np.array(self.category_id, dtype=np.int32),
+            command_id=np.array(self.command_id, dtype=np.int32),
+            self_pct=np.array(self.self_pct, dtype=np.float64),
+            children_pct=np.array(self.children_pct, dtype=np.float64),
+            norm_self_pct=np.array(self.norm_self_pct, dtype=np.float64),
+            metadata=_metadata_columns(self.metadatas),
+        )
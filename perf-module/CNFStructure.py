@@ -0,0 +1,284 @@
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from tqdm import tqdm
+from CNFAnalyzer import SCAN_CHUNK_SIZE, iter_clause_blocks, read_cnf_header
+
+# clause pairs expanded per batch, bounding memory for very long clauses
+EDGE_BATCH_SIZE = 1 << 22
+# past this elimination degree the width bound falls back to |remaining| - 1
+MAX_ELIMINATION_WIDTH = 256
+HEURISTICS = ["min_degree", "min_fill"]
+
+
+class PrimalGraph:
+    """
+    Variable-interaction (primal) graph of a CNF in CSR form: vertex v is
+    variable v (vertex 0 is unused), and two variables are adjacent when
+    they share a clause.
+
+    Arrays:
+    - indptr: v's neighbours are indices[indptr[v] : indptr[v + 1]]
+    - indices: sorted neighbour lists
+    - occurs: whether v appears in any clause (unit-clause-only variables
+      are isolated vertices)
+    """
+
+    def __init__(self, indptr, indices, occurs=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.occurs = self.degrees() > 0 if occurs is None else occurs
+
+    @property
+    def num_vertices(self):
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self):
+        return len(self.indices) // 2
+
+    @classmethod
+    def from_cnf(cls, cnf_path, chunk_size=SCAN_CHUNK_SIZE):
+        num_vars, _ = read_cnf_header(cnf_path)
+        occurs = np.zeros(num_vars + 1, dtype=bool)
+        codes = []
+        pending = 0
+        for literals, zeros in iter_clause_blocks(cnf_path, chunk_size):
+            variables = np.abs(literals)
+            if len(variables) > 0 and variables.max() >= len(occurs):
+                occurs = np.resize(occurs, variables.max() + 1)
+                occurs[num_vars + 1 :] = False
+                num_vars = len(occurs) - 1
+            occurs[variables] = True
+
+            block_codes = _clause_edge_codes(variables, zeros)
+            codes.append(block_codes)
+            pending += len(block_codes)
+            # dedupe as we go so shared edges do not pile up across blocks
+            if pending > 4 * EDGE_BATCH_SIZE:
+                codes = [_sorted_unique(np.concatenate(codes))]
+                pending = len(codes[0])
+
+        occurs[0] = False
+        codes = (
+            _sorted_unique(np.concatenate(codes)) if codes else np.empty(0, np.int64)
+        )
+        return cls.from_edges(len(occurs), codes >> 32, codes & 0xFFFFFFFF, occurs)
+
+    @classmethod
+    def from_edges(cls, num_vertices, sources, targets, occurs=None):
+        """
+        Builds the graph from unique undirected (source, target) pairs.
+        """
+        if len(sources) > 0:
+            num_vertices = max(num_vertices, int(sources.max()) + 1)
+            num_vertices = max(num_vertices, int(targets.max()) + 1)
+        # both directions, sorted by (row, col) through their packed codes
+        rows = np.concatenate((sources, targets))
+        cols = np.concatenate((targets, sources))
+        cols = np.sort((rows << 32) | cols) & 0xFFFFFFFF
+
+        indptr = np.zeros(num_vertices + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_vertices), out=indptr[1:])
+        if occurs is not None and len(occurs) < num_vertices:
+            occurs = np.concatenate(
+                (occurs, np.zeros(num_vertices - len(occurs), dtype=bool))
+            )
+        return cls(indptr, cols.astype(np.int32), occurs)
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def neighbors(self, vertex):
+        return self.indices[self.indptr[vertex] : self.indptr[vertex + 1]]
+
+    def connected_components(self):
+        """
+        Returns per-vertex component labels (the smallest vertex in each
+        component), by vectorized hooking and pointer jumping.
+        """
+        labels = np.arange(self.num_vertices)
+        sources = np.repeat(labels, self.degrees())
+        targets = self.indices
+        while True:
+            source_labels = labels[sources]
+            target_labels = labels[targets]
+            if np.array_equal(source_labels, target_labels):
+                return labels
+            # hook each root onto the smallest label across its edges
+            np.minimum.at(labels, source_labels, target_labels)
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+
+    def elimination_width(
+        self, heuristic="min_degree", max_width=MAX_ELIMINATION_WIDTH
+    ):
+        """
+        Width of a greedy elimination ordering, an upper bound on treewidth
+        (and so on the dtree/vtree width the compilers can reach).
+
+        Returns (width, truncated). Once every remaining vertex has more than
+        `max_width` neighbours, elimination stops and the rest is bounded by
+        the number of remaining vertices minus one (`truncated` is True).
+        """
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Invalid heuristic: {heuristic}")
+
+        adjacency = {
+            vertex: set(self.neighbors(vertex).tolist())
+            for vertex in np.flatnonzero(self.degrees()).tolist()
+        }
+        if heuristic == "min_fill":
+            score = lambda vertex: _fill_in(adjacency, vertex)
+        else:
+            score = lambda vertex: len(adjacency[vertex])
+
+        scores = {vertex: score(vertex) for vertex in adjacency}
+        heap = [(key, vertex) for vertex, key in scores.items()]
+        heapq.heapify(heap)
+
+        width = 0
+        while adjacency:
+            if len(adjacency) - 1 <= width:
+                break
+            key, vertex = heapq.heappop(heap)
+            if vertex not in adjacency or scores[vertex] != key:
+                continue
+
+            neighbors = adjacency.pop(vertex)
+            if len(neighbors) > max_width:
+                return max(width, len(adjacency)), True
+            width = max(width, len(neighbors))
+
+            # connect the neighbours into a clique
+            for neighbor in neighbors:
+                adjacency[neighbor].discard(vertex)
+                adjacency[neighbor] |= neighbors
+                adjacency[neighbor].discard(neighbor)
+            # only the neighbours' scores are refreshed; stale min-fill
+            # scores further out only make the ordering greedier, and any
+            # ordering still gives a valid bound
+            for neighbor in neighbors:
+                scores[neighbor] = score(neighbor)
+                heapq.heappush(heap, (scores[neighbor], neighbor))
+
+        return width, False
+
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes
+
+
+def _clause_edge_codes(variables, zeros):
+    """
+    Unique (lo << 32) | hi codes of every variable pair sharing a clause in
+    one clause block, expanded a clause length at a time.
+    """
+    lengths = np.diff(zeros, prepend=-1) - 1
+    starts = zeros - lengths
+    codes = []
+    for length in np.unique(lengths[lengths >= 2]).tolist():
+        firsts, seconds = np.triu_indices(length, 1)
+        clause_starts = starts[lengths == length]
+        batch = max(1, EDGE_BATCH_SIZE // len(firsts))
+        for i in range(0, len(clause_starts), batch):
+            batch_starts = clause_starts[i : i + batch, None]
+            u = variables[batch_starts + firsts].ravel()
+            v = variables[batch_starts + seconds].ravel()
+            lo = np.minimum(u, v)
+            hi = np.maximum(u, v)
+            keep = lo != hi
+            codes.append(_sorted_unique((lo[keep] << 32) | hi[keep]))
+
+    if not codes:
+        return np.empty(0, dtype=np.int64)
+    return _sorted_unique(np.concatenate(codes))
+
+
+def _sorted_unique(codes):
+    # sort-based; much faster than np.unique's hashing on large int64 arrays
+    codes = np.sort(codes)
+    if len(codes) == 0:
+        return codes
+    return codes[np.concatenate(([True], codes[1:] != codes[:-1]))]
+
+
+def _fill_in(adjacency, vertex):
+    neighbors = adjacency[vertex]
+    missing = sum(len(neighbors - adjacency[neighbor]) - 1 for neighbor in neighbors)
+    return missing // 2
+
+
+def analyze_structure(
+    cnf_path, heuristic="min_degree", max_width=MAX_ELIMINATION_WIDTH
+):
+    """
+    Primal-graph features of one CNF. Variables that appear in no clause are
+    left out of the vertex, degree and component counts.
+    """
+    graph = PrimalGraph.from_cnf(cnf_path)
+    degrees = graph.degrees()
+    labels = graph.connected_components()
+
+    used = graph.occurs
+    num_vertices = int(used.sum())
+    used_degrees = degrees[used]
+    component_sizes = np.bincount(labels[used]) if num_vertices else np.zeros(0)
+
+    width, truncated = graph.elimination_width(heuristic, max_width)
+    return {
+        "num_vertices": num_vertices,
+        "num_edges": graph.num_edges,
+        "density": (
+            2 * graph.num_edges / (num_vertices * (num_vertices - 1))
+            if num_vertices > 1
+            else 0.0
+        ),
+        "max_degree": int(used_degrees.max()) if num_vertices else 0,
+        "mean_degree": float(used_degrees.mean()) if num_vertices else 0.0,
+        "degree_std": float(used_degrees.std()) if num_vertices else 0.0,
+        "num_components": int(np.count_nonzero(component_sizes)),
+        "largest_component": int(component_sizes.max()) if num_vertices else 0,
+        "width_upper_bound": width,
+        "width_heuristic": heuristic,
+        "width_truncated": truncated,
+    }
+
+
+def structure_stats(
+    cnf_dir, cnfs, jobs=1, heuristic="min_degree", max_width=MAX_ELIMINATION_WIDTH
+):
+    """
+    Returns {cnf: analyze_structure features} for the CNF names in `cnfs`
+    (as in `PerfParser.cnfs`) found in `cnf_dir`.
+    """
+    cnfs = [cnf for cnf in cnfs if os.path.exists(os.path.join(cnf_dir, cnf))]
+    paths = [os.path.join(cnf_dir, cnf) for cnf in cnfs]
+    args = ([heuristic] * len(paths), [max_width] * len(paths))
+
+    if jobs > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            features = list(
+                tqdm(
+                    executor.map(analyze_structure, paths, *args),
+                    total=len(paths),
+                    desc="Analyzing CNF Structure...",
+                )
+            )
+    else:
+        features = [
+            analyze_structure(path, heuristic, max_width)
+            for path in tqdm(paths, desc="Analyzing CNF Structure...")
+        ]
+    return dict(zip(cnfs, features))
+
+
+def join_cnf_features(cnf_stats, features, key="structure"):
+    """
+    Returns a copy of per-CNF stats (e.g. `PerfParser.cnf_stats`) with each
+    CNF's `features` entry under `key`; CNFs without features get None.
+    """
+    return {cnf: {**data, key: features.get(cnf)} for cnf, data in cnf_stats.items()}
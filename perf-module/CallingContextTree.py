@@ -0,0 +1,142 @@
+from array import array
+import numpy as np
+
+
+class CallingContextTree:
+    """
+    Array-backed calling-context tree built from folded call-graph stacks.
+
+    Node Columns (node 0 is the root):
+    - parents: parent node id (-1 for the root)
+    - node_frames: interned frame (function) id (-1 for the root)
+    - exclusive: weight of samples whose stack ends at the node
+
+    Frames are interned once in `frames`, and child lookup is a single dict
+    keyed by `(parent << 32) | frame_id`.
+    """
+
+    ROOT = 0
+
+    def __init__(self):
+        self.frames = []
+        self.frame_ids = {}
+
+        self.parents = array("i", [-1])
+        self.node_frames = array("i", [-1])
+        self.exclusive = array("d", [0.0])
+        self._children = {}
+
+    @property
+    def num_nodes(self):
+        return len(self.parents)
+
+    def intern_frame(self, frame):
+        frame_id = self.frame_ids.get(frame)
+        if frame_id is None:
+            frame_id = len(self.frames)
+            self.frame_ids[frame] = frame_id
+            self.frames.append(frame)
+        return frame_id
+
+    def child(self, node, frame_id):
+        key = (node << 32) | frame_id
+        child = self._children.get(key)
+        if child is None:
+            child = len(self.parents)
+            self._children[key] = child
+            self.parents.append(node)
+            self.node_frames.append(frame_id)
+            self.exclusive.append(0.0)
+        return child
+
+    def add_stack(self, frames, weight):
+        """
+        Adds `weight` to the exclusive value of the root-first `frames` path.
+        """
+        node = CallingContextTree.ROOT
+        for frame in frames:
+            node = self.child(node, self.intern_frame(frame))
+        self.exclusive[node] += weight
+        return node
+
+    def merge(self, other, scale=1.0):
+        """
+        Adds every path of `other` into this tree with its exclusive values
+        multiplied by `scale`. Returns the node id each of `other`'s nodes
+        was merged into.
+        """
+        frame_map = [self.intern_frame(frame) for frame in other.frames]
+        node_map = array("i", [CallingContextTree.ROOT]) * other.num_nodes
+        # parents always precede their children, so one forward sweep suffices
+        for node in range(1, other.num_nodes):
+            mapped = self.child(
+                node_map[other.parents[node]], frame_map[other.node_frames[node]]
+            )
+            node_map[node] = mapped
+            self.exclusive[mapped] += other.exclusive[node] * scale
+        return node_map
+
+    def inclusive(self, exclusive=None):
+        """
+        Returns the inclusive value of every node as a NumPy array, from the
+        tree's own exclusive values or a per-node `exclusive` override.
+        """
+        if exclusive is None:
+            exclusive = self.exclusive
+        inclusive = np.array(exclusive, dtype=np.float64)
+        parents = np.frombuffer(self.parents, dtype=np.int32)
+        for node in range(self.num_nodes - 1, 0, -1):
+            inclusive[parents[node]] += inclusive[node]
+        return inclusive
+
+    def depths(self):
+        depths = np.zeros(self.num_nodes, dtype=np.int32)
+        for node in range(1, self.num_nodes):
+            depths[node] = depths[self.parents[node]] + 1
+        return depths
+
+    def children(self):
+        """
+        Returns {node: [child nodes]} for every node with children.
+        """
+        children = {}
+        for node in range(1, self.num_nodes):
+            children.setdefault(self.parents[node], []).append(node)
+        return children
+
+    def path(self, node):
+        frames = []
+        while node != CallingContextTree.ROOT:
+            frames.append(self.frames[self.node_frames[node]])
+            node = self.parents[node]
+        return frames[::-1]
+
+    def paths(self, min_inclusive=0.0):
+        """
+        Yields (path, inclusive, exclusive) for every node whose inclusive
+        value is at least `min_inclusive`.
+        """
+        inclusive = self.inclusive()
+        for node in range(1, self.num_nodes):
+            if inclusive[node] < min_inclusive:
+                continue
+            yield self.path(node), float(inclusive[node]), self.exclusive[node]
+
+    def exclusive_by_frame(self):
+        """
+        Returns {frame: total exclusive value} summed over every context.
+        """
+        frame_ids = np.frombuffer(self.node_frames, dtype=np.int32)[1:]
+        totals = np.bincount(
+            frame_ids,
+            weights=np.array(self.exclusive[1:], dtype=np.float64),
+            minlength=len(self.frames),
+        )
+        return dict(zip(self.frames, totals.tolist()))
+
+    def nbytes(self):
+        return (
+            self.parents.itemsize * len(self.parents)
+            + self.node_frames.itemsize * len(self.node_frames)
+            + self.exclusive.itemsize * len(self.exclusive)
+        )
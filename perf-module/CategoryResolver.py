@@ -0,0 +1,215 @@
+import json
+import re
+from abc import abstractmethod
+from pathlib import Path
+from PerfParser import AbstractFunctionMap
+
+
+class CategoryResolver:
+    """
+    Resolves perf symbols to categories in three tiers:
+    - exact: function name -> category, built from the tags inputs
+    - prefix: longest matching prefix in a character trie (e.g. "sat_" -> sat)
+      from the explicit "name*" rules, plus derived ones if `derive_prefixes`
+    - regex: first matching pattern
+
+    Symbols are first stripped of compiler clone suffixes (".isra.0",
+    ".part.1", ".cold", ...) and "+0x..." offsets, and every lookup is
+    memoized. With an `index_path`, the compiled tiers are persisted there,
+    keyed by the input files' mtimes and the settings, so later
+    constructions skip rebuilding them.
+    """
+
+    # bumped whenever resolution changes; keys the index and, through
+    # `settings`, cached parse results
+    VERSION = 2
+    CLONE_SUFFIX_PATTERN = re.compile(
+        r"(?:\+0x[0-9a-f]+"
+        r"|\.(?:isra|part|constprop|cold|lto_priv|localalias)(?:\.\d+)?)+$"
+    )
+
+    # a derived prefix rule needs this many exact names, all in one category
+    MIN_PREFIX_SUPPORT = 3
+
+    def __init__(
+        self,
+        input_paths,
+        build_exact,
+        rules=(),
+        index_path=None,
+        derive_prefixes=False,
+    ):
+        """
+        input_paths: files `build_exact` reads, used to key the index
+        build_exact: callable returning {function name: category}
+        rules: (pattern, category) pairs; "name*" is a prefix rule, anything
+            else is a regex
+        index_path: where the compiled index is persisted (None to disable)
+        derive_prefixes: also derive prefix rules from the exact names (see
+            `_derive_prefix_rules`), which recategorizes unknown symbols that
+            happen to share a prefix
+        """
+        self.input_paths = [Path(p) for p in input_paths]
+        self.rules = [list(rule) for rule in rules]
+        self.index_path = None if index_path is None else Path(index_path)
+        self.derive_prefixes = derive_prefixes
+
+        index = self._load_index()
+        if index is None:
+            index = self._build_index(build_exact())
+            self._save_index(index)
+
+        self.exact = index["exact"]
+        self.prefix_rules = index["prefix_rules"]
+        self.regex_rules = [
+            (re.compile(pattern), category)
+            for pattern, category in index["regex_rules"]
+        ]
+        self.trie = self._build_trie(self.prefix_rules)
+        self._memo = {}
+
+    def resolve(self, symbol):
+        if symbol in self._memo:
+            return self._memo[symbol]
+
+        name = CategoryResolver.CLONE_SUFFIX_PATTERN.sub("", symbol)
+        category = self.exact.get(name)
+        if category is None:
+            category = self._resolve_prefix(name)
+        if category is None:
+            for pattern, rule_category in self.regex_rules:
+                if pattern.match(name):
+                    category = rule_category
+                    break
+
+        self._memo[symbol] = category
+        return category
+
+    def _resolve_prefix(self, name):
+        node = self.trie
+        category = None
+        for char in name:
+            node = node.get(char)
+            if node is None:
+                break
+            category = node.get(None, category)
+        return category
+
+    def settings(self):
+        """
+        Everything besides the input files that decides the categories.
+        """
+        return {
+            "version": CategoryResolver.VERSION,
+            "rules": self.rules,
+            "derive_prefixes": self.derive_prefixes,
+        }
+
+    def _build_index(self, exact):
+        prefix_rules = self._derive_prefix_rules(exact) if self.derive_prefixes else {}
+        regex_rules = []
+        for pattern, category in self.rules:
+            if pattern.endswith("*") and re.escape(pattern[:-1]) == pattern[:-1]:
+                prefix_rules[pattern[:-1]] = category
+            else:
+                regex_rules.append([pattern, category])
+        return {
+            "exact": exact,
+            "prefix_rules": prefix_rules,
+            "regex_rules": regex_rules,
+        }
+
+    def _derive_prefix_rules(self, exact):
+        """
+        Adds "<prefix>_" -> category for every underscore prefix whose exact
+        names all share one category.
+        """
+        prefix_categories = {}
+        prefix_counts = {}
+        for name, category in exact.items():
+            head, sep, _ = name.partition("_")
+            if not sep or not head:
+                continue
+            prefix = head + sep
+            prefix_categories.setdefault(prefix, set()).add(category)
+            prefix_counts[prefix] = prefix_counts.get(prefix, 0) + 1
+
+        return {
+            prefix: next(iter(categories))
+            for prefix, categories in sorted(prefix_categories.items())
+            if len(categories) == 1
+            and prefix_counts[prefix] >= CategoryResolver.MIN_PREFIX_SUPPORT
+        }
+
+    def _build_trie(self, prefix_rules):
+        trie = {}
+        for prefix, category in prefix_rules.items():
+            node = trie
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node[None] = category
+        return trie
+
+    def _index_key(self):
+        return {
+            **self.settings(),
+            "inputs": {
+                str(p.resolve()): p.stat().st_mtime_ns for p in self.input_paths
+            },
+        }
+
+    def _load_index(self):
+        if self.index_path is None or not self.index_path.exists():
+            return None
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if index.get("key") != self._index_key():
+            return None
+        return index
+
+    def _save_index(self, index):
+        if self.index_path is None:
+            return
+        index["key"] = self._index_key()
+        try:
+            with open(self.index_path, "w") as f:
+                json.dump(index, f)
+        except OSError as e:
+            print(f"Could not write category index {self.index_path}: {e}")
+
+
+class ResolvingFunctionMap(AbstractFunctionMap):
+    """
+    Base for function maps backed by a CategoryResolver. Subclasses provide
+    their inputs and the exact name -> category table.
+    """
+
+    def __init__(self, rules=(), index_path=None, derive_prefixes=False):
+        self.resolver = CategoryResolver(
+            self.get_input_paths(),
+            self._build_function_to_category,
+            rules=rules,
+            index_path=index_path,
+            derive_prefixes=derive_prefixes,
+        )
+
+    @property
+    def function_to_category(self):
+        return self.resolver.exact
+
+    def get_category(self, function_name):
+        return self.resolver.resolve(function_name)
+
+    def get_category_settings(self):
+        return self.resolver.settings()
+
+    @abstractmethod
+    def get_input_paths(self):
+        pass
+
+    @abstractmethod
+    def _build_function_to_category(self):
+        pass
@@ -0,0 +1,237 @@
+import json
+from pathlib import Path
+import numpy as np
+from CNFStatsTable import CNFStatsTable
+from PerfParser import PerfParser
+from StatsIO import write_ndjson
+
+SHARE_COLUMNS = ["category", "self_pct", "norm_self_pct"]
+
+
+class CompilerComparison:
+    """
+    Per-CNF comparison of two compilers' PerfParser results (e.g. c2d vs.
+    miniC2D) on the CNFs both have a report and a runtime for, joined on
+    CNF name.
+
+    Outcomes are indexed by left_timed_out + 2 * right_timed_out:
+    both_completed, <left>_timed_out, <right>_timed_out, both_timed_out.
+
+    Arrays (one entry per joined CNF, in sorted name order):
+    - cnfs
+    - left_times / right_times: runtimes, TIMEOUT for timed-out runs
+    - left_timed_out / right_timed_out
+    - speedup: left_time / right_time (> 1 means `right` is faster); a
+      bound rather than a ratio when one side timed out, NaN when both did
+    - left_shares / right_shares: (cnfs, categories) share of samples per
+      category, over the union of both compilers' category names
+    - deltas: right_shares - left_shares
+    """
+
+    def __init__(self, left: PerfParser, right: PerfParser, normalize=False):
+        self.left_name = left.compiler.value
+        self.right_name = right.compiler.value
+        left_cnfs, left_times, left_categories, left_shares = _compiler_columns(
+            left, normalize
+        )
+        right_cnfs, right_times, right_categories, right_shares = _compiler_columns(
+            right, normalize
+        )
+
+        self.cnfs, left_idx, right_idx = np.intersect1d(
+            left_cnfs, right_cnfs, assume_unique=True, return_indices=True
+        )
+        self.left_times = left_times[left_idx]
+        self.right_times = right_times[right_idx]
+        self.left_timed_out = self.left_times >= PerfParser.TIMEOUT
+        self.right_timed_out = self.right_times >= PerfParser.TIMEOUT
+
+        self.speedup = self.left_times / self.right_times
+        self.speedup[self.left_timed_out & self.right_timed_out] = np.nan
+        self.outcomes = self.left_timed_out + 2 * self.right_timed_out.astype(int)
+
+        # both share matrices scattered into the union of category names
+        self.categories = list(dict.fromkeys(left_categories + right_categories))
+        column = {category: i for i, category in enumerate(self.categories)}
+        self.left_shares = np.zeros((len(self.cnfs), len(self.categories)))
+        self.right_shares = np.zeros((len(self.cnfs), len(self.categories)))
+        self.left_shares[:, [column[c] for c in left_categories]] = left_shares[
+            left_idx
+        ]
+        self.right_shares[:, [column[c] for c in right_categories]] = right_shares[
+            right_idx
+        ]
+        self.deltas = self.right_shares - self.left_shares
+
+    @property
+    def num_cnfs(self):
+        return len(self.cnfs)
+
+    def outcome_counts(self):
+        """
+        Returns {outcome: number of CNFs}, with the left/right outcomes named
+        after the compilers (e.g. "c2d_timed_out").
+        """
+        names = self._outcome_names()
+        counts = np.bincount(self.outcomes, minlength=len(names))
+        return dict(zip(names, counts.tolist()))
+
+    def category_delta(self, category):
+        """
+        Per-CNF right minus left share of one category.
+        """
+        return self.deltas[:, self.categories.index(category)]
+
+    def hot_categories(self):
+        """
+        (left, right) arrays of each CNF's highest-share category index.
+        """
+        if not self.categories:
+            empty = np.zeros(self.num_cnfs, dtype=np.int64)
+            return empty, empty
+        return self.left_shares.argmax(axis=1), self.right_shares.argmax(axis=1)
+
+    def hot_category_divergence(self):
+        """
+        Per-CNF share each compiler's hottest category loses under the other
+        compiler, taking the larger of the two; 0 when both agree on the
+        hot category and its share.
+        """
+        left_hot, right_hot = self.hot_categories()
+        rows = np.arange(self.num_cnfs)
+        left_drop = self.left_shares[rows, left_hot] - self.right_shares[rows, left_hot]
+        right_drop = (
+            self.right_shares[rows, right_hot] - self.left_shares[rows, right_hot]
+        )
+        return np.maximum(np.maximum(left_drop, right_drop), 0)
+
+    def summary(self):
+        """
+        Returns {
+            num_cnfs,
+            outcomes: outcome_counts(),
+            geomean_speedup: over CNFs both compilers completed (None if none),
+            median_speedup: likewise,
+            mean_deltas: {category: mean right - left share},
+            hot_category_disagreements: CNFs whose hot categories differ,
+        }
+        """
+        completed = self.outcomes == 0
+        speedups = self.speedup[completed & (self.speedup > 0)]
+        left_hot, right_hot = self.hot_categories()
+        return {
+            "num_cnfs": self.num_cnfs,
+            "outcomes": self.outcome_counts(),
+            "geomean_speedup": (
+                float(np.exp(np.log(speedups).mean())) if len(speedups) else None
+            ),
+            "median_speedup": float(np.median(speedups)) if len(speedups) else None,
+            "mean_deltas": (
+                dict(zip(self.categories, self.deltas.mean(axis=0).tolist()))
+                if self.num_cnfs
+                else {}
+            ),
+            "hot_category_disagreements": int(np.count_nonzero(left_hot != right_hot)),
+        }
+
+    def ranked_divergence(self, top=None):
+        """
+        CNFs in descending `hot_category_divergence` order, as dicts with both
+        compilers' hot categories, their shares on each side, runtimes and
+        outcome.
+        """
+        divergence = self.hot_category_divergence()
+        order = np.argsort(-divergence, kind="stable")[:top]
+        left_hot, right_hot = self.hot_categories()
+        outcome_names = self._outcome_names()
+        left, right = self.left_name, self.right_name
+
+        ranking = []
+        for i in order.tolist():
+            lh, rh = left_hot[i], right_hot[i]
+            ranking.append(
+                {
+                    "cnf": str(self.cnfs[i]),
+                    "divergence": float(divergence[i]),
+                    f"{left}_hot_category": self.categories[lh],
+                    f"{right}_hot_category": self.categories[rh],
+                    f"{left}_hot_share": {
+                        left: float(self.left_shares[i, lh]),
+                        right: float(self.right_shares[i, lh]),
+                    },
+                    f"{right}_hot_share": {
+                        left: float(self.left_shares[i, rh]),
+                        right: float(self.right_shares[i, rh]),
+                    },
+                    f"{left}_time": float(self.left_times[i]),
+                    f"{right}_time": float(self.right_times[i]),
+                    "outcome": outcome_names[self.outcomes[i]],
+                }
+            )
+        return ranking
+
+    def iter_cnf_rows(self):
+        """
+        Yields (cnf, per-CNF comparison) for every joined CNF.
+        """
+        outcome_names = self._outcome_names()
+        left, right = self.left_name, self.right_name
+        for i in range(self.num_cnfs):
+            speedup = self.speedup[i]
+            yield str(self.cnfs[i]), {
+                f"{left}_time": float(self.left_times[i]),
+                f"{right}_time": float(self.right_times[i]),
+                "speedup": None if np.isnan(speedup) else float(speedup),
+                "outcome": outcome_names[self.outcomes[i]],
+                "deltas": dict(zip(self.categories, self.deltas[i].tolist())),
+            }
+
+    def to_json(self, output_path, top=None):
+        """
+        Writes the summary and the `ranked_divergence(top)` list.
+        """
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(
+                {
+                    "compilers": [self.left_name, self.right_name],
+                    "summary": self.summary(),
+                    "ranking": self.ranked_divergence(top),
+                },
+                f,
+                indent=4,
+            )
+
+    def to_ndjson(self, output_path):
+        """
+        Writes `iter_cnf_rows` one CNF per line.
+        """
+        write_ndjson(output_path, self.iter_cnf_rows(), "cnf")
+
+    def _outcome_names(self):
+        return [
+            "both_completed",
+            f"{self.left_name}_timed_out",
+            f"{self.right_name}_timed_out",
+            "both_timed_out",
+        ]
+
+
+def _compiler_columns(parser, normalize):
+    """
+    (cnfs, times, categories, shares) of the CNFs in `parser` that have
+    report rows and a runtime, sorted by CNF name.
+    """
+    if parser.columnar:
+        table = parser.stats_table
+    else:
+        table = CNFStatsTable.from_cnf_stats(parser.cnf_stats, columns=SHARE_COLUMNS)
+
+    shares = table.category_shares(normalize)
+    has_rows = np.bincount(table.cnf_id, minlength=table.num_cnfs) > 0
+    keep = np.flatnonzero(has_rows & ~np.isnan(table.times))
+    cnfs = table.cnf_names[keep].astype(str)
+    order = np.argsort(cnfs, kind="stable")
+    categories = [str(category) for category in table.categories]
+    return cnfs[order], table.times[keep][order], categories, shares[keep][order]
@@ -0,0 +1,207 @@
+import json
+import zlib
+from html import escape
+from pathlib import Path
+import numpy as np
+from CallingContextTree import CallingContextTree
+
+
+class FlameGraphExporter:
+    """
+    Writes folded-stack, speedscope and SVG flame graphs from a
+    CallingContextTree (e.g. `PerfParser.build_calling_context_tree()`).
+    Weights are the tree's exclusive seconds, so a flame graph's total is the
+    aggregate time of the CNFs merged into the tree.
+
+    Passing a `baseline` tree switches to differential mode: both trees are
+    merged into one union tree, widths follow `tree`, and colors show the
+    change in each context's share of total time relative to `baseline`
+    (red: larger share, blue: smaller share).
+    """
+
+    SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+    SVG_WIDTH = 1200
+    FRAME_HEIGHT = 16
+    FONT_SIZE = 11
+
+    def __init__(self, tree: CallingContextTree, baseline: CallingContextTree = None):
+        self.differential = baseline is not None
+        if not self.differential:
+            self.tree = tree
+            self.values = np.array(tree.exclusive, dtype=np.float64)
+            self.baseline_values = None
+            return
+
+        # structure only (scale 0), then scatter each side's values through
+        # the node maps so neither side's values are mixed
+        self.tree = CallingContextTree()
+        baseline_map = self.tree.merge(baseline, scale=0.0)
+        tree_map = self.tree.merge(tree, scale=0.0)
+        self.baseline_values = np.bincount(
+            np.frombuffer(baseline_map, dtype=np.int32),
+            weights=np.array(baseline.exclusive, dtype=np.float64),
+            minlength=self.tree.num_nodes,
+        )
+        self.values = np.bincount(
+            np.frombuffer(tree_map, dtype=np.int32),
+            weights=np.array(tree.exclusive, dtype=np.float64),
+            minlength=self.tree.num_nodes,
+        )
+
+    def to_folded(self, output_path):
+        """
+        One `frame;frame;frame value` line per context with exclusive time
+        (flamegraph.pl input). Differential mode writes `baseline value`
+        pairs, matching difffolded.pl output.
+        """
+        output_path = self._prepare(output_path)
+        with open(output_path, "w") as f:
+            for node in range(1, self.tree.num_nodes):
+                value = self.values[node]
+                base = 0.0 if not self.differential else self.baseline_values[node]
+                if value == 0 and base == 0:
+                    continue
+                stack = ";".join(self.tree.path(node))
+                if self.differential:
+                    f.write(f"{stack} {base:.6f} {value:.6f}\n")
+                else:
+                    f.write(f"{stack} {value:.6f}\n")
+
+    def to_speedscope(self, output_path, name="profile"):
+        """
+        Writes a speedscope "sampled" profile with one weighted sample per
+        context, weights in seconds. Differential mode writes one profile per
+        side.
+        """
+        output_path = self._prepare(output_path)
+        frames = [{"name": frame} for frame in self.tree.frames]
+        profiles = [self._speedscope_profile(name, self.values)]
+        if self.differential:
+            profiles.insert(
+                0, self._speedscope_profile(f"{name} (baseline)", self.baseline_values)
+            )
+
+        with open(output_path, "w") as f:
+            json.dump(
+                {
+                    "$schema": FlameGraphExporter.SPEEDSCOPE_SCHEMA,
+                    "shared": {"frames": frames},
+                    "profiles": profiles,
+                    "name": name,
+                    "exporter": "perf-module FlameGraphExporter",
+                },
+                f,
+            )
+
+    def to_svg(self, output_path, title="Flame Graph", min_fraction=1e-3):
+        """
+        Renders a static SVG flame graph. Contexts narrower than
+        `min_fraction` of the total are dropped along with their subtrees.
+        """
+        output_path = self._prepare(output_path)
+        tree = self.tree
+        inclusive = tree.inclusive(self.values)
+        total = inclusive[CallingContextTree.ROOT]
+        deltas = None
+        if self.differential:
+            base_inclusive = tree.inclusive(self.baseline_values)
+            base_total = base_inclusive[CallingContextTree.ROOT]
+            deltas = inclusive / (total or 1) - base_inclusive / (base_total or 1)
+
+        children = tree.children()
+        depths = tree.depths()
+        x_offsets = np.zeros(tree.num_nodes, dtype=np.float64)
+        max_depth = 0
+        rects = []
+
+        stack = [CallingContextTree.ROOT]
+        while stack:
+            node = stack.pop()
+            x = x_offsets[node]
+            kids = sorted(
+                children.get(node, []), key=lambda c: tree.frames[tree.node_frames[c]]
+            )
+            for child in kids:
+                if total == 0 or inclusive[child] / total < min_fraction:
+                    continue
+                x_offsets[child] = x
+                x += inclusive[child]
+                stack.append(child)
+                max_depth = max(max_depth, depths[child])
+                rects.append(child)
+
+        height = (max_depth + 3) * FlameGraphExporter.FRAME_HEIGHT
+        scale = FlameGraphExporter.SVG_WIDTH / total if total else 0
+        lines = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{FlameGraphExporter.SVG_WIDTH}" '
+            f'height="{height}" font-family="Verdana" font-size="{FlameGraphExporter.FONT_SIZE}">',
+            f'<text x="{FlameGraphExporter.SVG_WIDTH / 2}" y="{FlameGraphExporter.FRAME_HEIGHT}" '
+            f'text-anchor="middle">{escape(title)}</text>',
+        ]
+        for node in rects:
+            frame = tree.frames[tree.node_frames[node]]
+            x = x_offsets[node] * scale
+            width = inclusive[node] * scale
+            y = height - (depths[node] + 1) * FlameGraphExporter.FRAME_HEIGHT
+            color = self._color(frame, None if deltas is None else deltas[node])
+            label = f"{frame} ({inclusive[node]:.2f}s, {inclusive[node] / total:.2%})"
+            if deltas is not None:
+                label += f" delta {deltas[node]:+.2%}"
+            # roughly 7px per character at this font size
+            max_chars = int(width / 7)
+            text = frame if len(frame) <= max_chars else frame[: max_chars - 2] + ".."
+            lines.append(
+                f"<g><title>{escape(label)}</title>"
+                f'<rect x="{x:.2f}" y="{y}" width="{width:.2f}" '
+                f'height="{FlameGraphExporter.FRAME_HEIGHT - 1}" fill="{color}"/>'
+                + (
+                    f'<text x="{x + 3:.2f}" y="{y + FlameGraphExporter.FRAME_HEIGHT - 4}">'
+                    f"{escape(text)}</text>"
+                    if max_chars > 3
+                    else ""
+                )
+                + "</g>"
+            )
+        lines.append("</svg>")
+
+        with open(output_path, "w") as f:
+            f.write("\n".join(lines))
+
+    def _speedscope_profile(self, name, values):
+        samples = []
+        weights = []
+        for node in range(1, self.tree.num_nodes):
+            if values[node] == 0:
+                continue
+            path = []
+            current = node
+            while current != CallingContextTree.ROOT:
+                path.append(self.tree.node_frames[current])
+                current = self.tree.parents[current]
+            samples.append(path[::-1])
+            weights.append(float(values[node]))
+        return {
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }
+
+    def _color(self, frame, delta=None):
+        if delta is not None:
+            # saturate at a 5 percentage point change in share
+            intensity = int(min(abs(delta) / 0.05, 1.0) * 200)
+            if delta > 0:
+                return f"rgb(255,{255 - intensity},{255 - intensity})"
+            return f"rgb({255 - intensity},{255 - intensity},255)"
+        # stable warm palette keyed by the frame name
+        h = zlib.crc32(frame.encode())
+        return f"rgb({205 + h % 50},{(h >> 8) % 230},{(h >> 16) % 55})"
+
+    def _prepare(self, output_path):
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        return output_path
@@ -0,0 +1,298 @@
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# per-report steps timed by `ReportTimer`, in the order they run
+REPORT_STEPS = ["parse", "normalize", "categorize", "runtime", "metadata"]
+SLOWEST_REPORTS = 10
+
+
+class Instrumentation:
+    """
+    Stage-level metrics of a PerfParser / CNFAnalyzer run.
+
+    `stage(name)` records a stage's wall time, CPU time, peak RSS and the
+    bytes/lines read inside it (see `count`); stages may nest. A stage's CPU
+    time is this process's, so with pool workers it is the per-report CPU
+    times that show the parsing cost. Per-report parse times come in through
+    `record_report`, including those of pool workers, and their bytes/lines
+    count toward the enclosing stage.
+
+    Pass `NULL_INSTRUMENTATION` (the default of the instrumented classes) to
+    turn all of this into no-ops.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        # finished stages in completion order, and the open ones innermost last
+        self.stages = []
+        self._open = []
+        self.reports = []
+
+    @contextmanager
+    def stage(self, name, **args):
+        record = {
+            "name": name,
+            "start": time.perf_counter() - self.origin,
+            "depth": len(self._open),
+            "bytes_read": 0,
+            "lines_read": 0,
+            "args": args,
+        }
+        cpu_start = time.process_time()
+        rss_start = peak_rss()
+        self._open.append(record)
+        try:
+            yield record
+        finally:
+            self._open.pop()
+            record["wall"] = time.perf_counter() - self.origin - record["start"]
+            record["cpu"] = time.process_time() - cpu_start
+            record["peak_rss"] = peak_rss()
+            record["peak_rss_growth"] = record["peak_rss"] - rss_start
+            # reads inside a nested stage count toward its parents as well
+            if self._open:
+                self._open[-1]["bytes_read"] += record["bytes_read"]
+                self._open[-1]["lines_read"] += record["lines_read"]
+            self.stages.append(record)
+
+    def count(self, bytes_read=0, lines_read=0):
+        """
+        Adds to the innermost open stage's bytes/lines read.
+        """
+        if self._open:
+            self._open[-1]["bytes_read"] += bytes_read
+            self._open[-1]["lines_read"] += lines_read
+
+    def report_timer(self, name):
+        return ReportTimer(name, self.origin)
+
+    def record_report(self, timer):
+        self.merge_reports([timer.to_dict()])
+
+    def merge_reports(self, reports):
+        """
+        Adds report records (`ReportTimer.to_dict`), e.g. those a pool worker
+        sent back with `pop_reports`.
+        """
+        for report in reports:
+            self.reports.append(report)
+            self.count(report["bytes_read"], report["lines_read"])
+
+    def pop_reports(self):
+        reports, self.reports = self.reports, []
+        return reports
+
+    def summary(self):
+        """
+        Returns {
+            stages: {name: {calls, wall, cpu, peak_rss, bytes_read, lines_read}},
+            reports: {count, wall, cpu, bytes_read, lines_read,
+                      steps: {step: seconds summed over reports}},
+            slowest_reports: `slowest_reports()`,
+        }
+        Repeated stages are summed; peak_rss is the largest seen.
+        """
+        stages = {}
+        for record in self.stages:
+            totals = stages.setdefault(
+                record["name"],
+                {
+                    "calls": 0,
+                    "wall": 0.0,
+                    "cpu": 0.0,
+                    "peak_rss": 0,
+                    "bytes_read": 0,
+                    "lines_read": 0,
+                },
+            )
+            totals["calls"] += 1
+            totals["wall"] += record["wall"]
+            totals["cpu"] += record["cpu"]
+            totals["peak_rss"] = max(totals["peak_rss"], record["peak_rss"])
+            totals["bytes_read"] += record["bytes_read"]
+            totals["lines_read"] += record["lines_read"]
+
+        reports = {
+            "count": len(self.reports),
+            "wall": sum(report["wall"] for report in self.reports),
+            "cpu": sum(report["cpu"] for report in self.reports),
+            "bytes_read": sum(report["bytes_read"] for report in self.reports),
+            "lines_read": sum(report["lines_read"] for report in self.reports),
+            "steps": {
+                step: sum(report["steps"].get(step, 0) for report in self.reports)
+                for step in REPORT_STEPS
+            },
+        }
+        return {
+            "stages": stages,
+            "reports": reports,
+            "slowest_reports": self.slowest_reports(),
+        }
+
+    def slowest_reports(self, top=SLOWEST_REPORTS):
+        return sorted(self.reports, key=lambda report: report["wall"], reverse=True)[
+            :top
+        ]
+
+    def to_json(self, output_path):
+        """
+        Writes the summary along with every stage and report record.
+        """
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(
+                {
+                    "summary": self.summary(),
+                    "stages": self.stages,
+                    "reports": self.reports,
+                },
+                f,
+                indent=4,
+            )
+
+    def to_chrome_trace(self, output_path):
+        """
+        Writes the stages and reports as Trace Event Format "complete"
+        events, viewable in chrome://tracing or Perfetto. Reports are drawn
+        on the thread row of the process that parsed them.
+        """
+        events = [
+            {
+                "name": record["name"],
+                "cat": "stage",
+                "ph": "X",
+                "ts": record["start"] * 1e6,
+                "dur": record["wall"] * 1e6,
+                "pid": self.pid,
+                "tid": self.pid,
+                "args": {
+                    "cpu": record["cpu"],
+                    "peak_rss": record["peak_rss"],
+                    "bytes_read": record["bytes_read"],
+                    "lines_read": record["lines_read"],
+                    **record["args"],
+                },
+            }
+            for record in self.stages
+        ]
+        for report in self.reports:
+            events.append(
+                {
+                    "name": report["name"],
+                    "cat": "report",
+                    "ph": "X",
+                    "ts": report["start"] * 1e6,
+                    "dur": report["wall"] * 1e6,
+                    "pid": self.pid,
+                    "tid": report["pid"],
+                    "args": {
+                        "cpu": report["cpu"],
+                        "bytes_read": report["bytes_read"],
+                        "lines_read": report["lines_read"],
+                        **report["steps"],
+                    },
+                }
+            )
+
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+class NullInstrumentation:
+    """
+    Disabled Instrumentation: every call is a no-op.
+    """
+
+    enabled = False
+
+    def stage(self, name, **args):
+        return nullcontext()
+
+    def count(self, bytes_read=0, lines_read=0):
+        pass
+
+    def report_timer(self, name):
+        return NULL_REPORT_TIMER
+
+    def record_report(self, timer):
+        pass
+
+    def merge_reports(self, reports):
+        pass
+
+    def pop_reports(self):
+        return []
+
+
+class ReportTimer:
+    """
+    Times the steps of one report's ingestion; `lap(step)` closes the step
+    that started at the previous lap. `counts` is filled by the report
+    readers (see `PerfParser.iter_report_lines`).
+    """
+
+    def __init__(self, name, origin):
+        self.name = name
+        self.origin = origin
+        self.counts = {"bytes": 0, "lines": 0}
+        self.steps = {}
+        self.start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self._last = self.start
+
+    def lap(self, step):
+        now = time.perf_counter()
+        self.steps[step] = self.steps.get(step, 0) + now - self._last
+        self._last = now
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "pid": os.getpid(),
+            "start": self.start - self.origin,
+            "wall": self._last - self.start,
+            "cpu": time.process_time() - self.cpu_start,
+            "bytes_read": self.counts["bytes"],
+            "lines_read": self.counts["lines"],
+            "steps": self.steps,
+        }
+
+
+class NullReportTimer:
+    counts = None
+
+    def lap(self, step):
+        pass
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+NULL_REPORT_TIMER = NullReportTimer()
+
+
+def peak_rss():
+    """
+    Peak resident set size in bytes of this process or its largest child
+    (pool workers), 0 where `resource` is unavailable.
+    """
+    if resource is None:
+        return 0
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
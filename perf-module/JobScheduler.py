@@ -0,0 +1,198 @@
+import heapq
+import json
+from pathlib import Path
+import numpy as np
+from CNFAnalyzer import CNFAnalyzer
+from RunManifest import RunManifest, LOG_SUFFIX
+
+
+class JobScheduler:
+    """
+    Orders profiling jobs by predicted runtime.
+
+    Features are `CNFAnalyzer._analyze_file`'s num_vars, num_clauses and
+    total_size (cached in `features_path` by file size and mtime). The model
+    is a least-squares fit of log runtime on log features over the
+    `history_dir` stdout logs of valid runs; timed-out runs enter at TIMEOUT,
+    so they pull predictions up to the cap rather than being dropped. Until a
+    model is fitted, jobs are ordered by total_size as a relative cost and no
+    runtimes are predicted.
+
+    Objectives:
+    - most_completed: shortest predicted first, which maximizes the number of
+      CNFs finished within a wall-clock budget
+    - makespan: longest predicted first (LPT), which keeps workers evenly
+      loaded when the whole sweep has to finish
+    """
+
+    TIMEOUT = 3600
+    FEATURES = ["num_vars", "num_clauses", "total_size"]
+    OBJECTIVES = ["most_completed", "makespan"]
+
+    def __init__(
+        self,
+        cnf_dir,
+        history_dir=None,
+        features_path="cnf_features.json",
+        timeout=TIMEOUT,
+    ):
+        self.cnf_dir = Path(cnf_dir)
+        self.history_dir = None if history_dir is None else Path(history_dir)
+        self.features_path = None if features_path is None else Path(features_path)
+        self.timeout = timeout
+
+        self.features = self._load_features()
+        self.coeffs = None
+
+    def get_features(self, cnf_file):
+        path = self.cnf_dir / cnf_file
+        st = path.stat()
+        cached = self.features.get(cnf_file)
+        if (
+            cached
+            and cached["size"] == st.st_size
+            and cached["mtime_ns"] == st.st_mtime_ns
+        ):
+            return cached["features"]
+
+        features = CNFAnalyzer._analyze_file(path)
+        self.features[cnf_file] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "features": features,
+        }
+        return features
+
+    def fit(self):
+        """
+        Fits the runtime model on every history log whose CNF is in cnf_dir.
+        Returns the number of training runs.
+        """
+        if self.history_dir is None or not self.history_dir.exists():
+            return 0
+
+        rows = []
+        runtimes = []
+        # logs are indexed across stdout/, valid/ and invalid/, wherever
+        # Preprocessor.filter_stdout has sorted them
+        manifest = RunManifest(self.history_dir)
+        for log_file, entry in manifest.iter_entries():
+            cnf_file = log_file[: -len(LOG_SUFFIX)]
+            # invalid runs (e.g. a dtree/vtree mismatch) fail fast and say
+            # nothing about the runtime
+            if not entry["valid"] or not (self.cnf_dir / cnf_file).exists():
+                continue
+            rows.append(self._design_row(self.get_features(cnf_file)))
+            runtimes.append(entry["runtime"] if entry["completed"] else self.timeout)
+        manifest.close()
+        self._save_features()
+
+        # need more runs than coefficients for a meaningful fit
+        if len(rows) <= len(JobScheduler.FEATURES) + 1:
+            return len(rows)
+
+        X = np.array(rows)
+        y = np.log(np.clip(runtimes, 1e-3, None))
+        self.coeffs, *_ = np.linalg.lstsq(X, y, rcond=None)
+        return len(rows)
+
+    @property
+    def fitted(self):
+        return self.coeffs is not None
+
+    def predict(self, cnf_file):
+        """
+        Predicted runtime in seconds, capped at the timeout, or None without a
+        fitted model.
+        """
+        if not self.fitted:
+            return None
+        features = self.get_features(cnf_file)
+        log_runtime = float(np.dot(self._design_row(features), self.coeffs))
+        return float(min(np.exp(log_runtime), self.timeout))
+
+    def cost(self, cnf_file):
+        """
+        The predicted runtime, or total_size as a relative cost without a
+        fitted model.
+        """
+        if not self.fitted:
+            return float(self.get_features(cnf_file)["total_size"])
+        return self.predict(cnf_file)
+
+    def order(self, cnf_files, objective="most_completed", jobs=1, budget=None):
+        """
+        Returns (ordered cnf_files, {cnf_file: predicted seconds}). With a
+        `budget` in seconds, jobs that are not predicted to start before the
+        budget runs out on `jobs` workers are dropped. Without a fitted model
+        the predictions are None and the budget is ignored, since relative
+        costs are not seconds.
+        """
+        if objective not in JobScheduler.OBJECTIVES:
+            raise ValueError(f"Invalid objective: {objective}")
+
+        costs = {cnf_file: self.cost(cnf_file) for cnf_file in cnf_files}
+        self._save_features()
+        ordered = sorted(
+            cnf_files,
+            key=lambda cnf_file: costs[cnf_file],
+            reverse=objective == "makespan",
+        )
+        if not self.fitted:
+            if budget is not None:
+                print("No fitted runtime model, so the budget is ignored")
+            return ordered, None
+
+        predictions = costs
+        if budget is None:
+            return ordered, predictions
+
+        # simulate the pool: each job starts on the earliest free worker
+        workers = [0.0] * max(jobs, 1)
+        scheduled = []
+        for cnf_file in ordered:
+            start = heapq.heappop(workers)
+            if start >= budget:
+                heapq.heappush(workers, start)
+                continue
+            scheduled.append(cnf_file)
+            heapq.heappush(workers, start + min(predictions[cnf_file], self.timeout))
+        return scheduled, predictions
+
+    def order_tasks(self, tasks, sweep, objective="most_completed", budget=None):
+        """
+        Orders ProfilingSweep (name, fn) tasks that are not finished yet.
+        Returns (tasks, predictions) for `ProfilingSweep.run`.
+        """
+        num_runs = self.fit()
+        if self.fitted:
+            print(f"Fitted runtime model on {num_runs} previous runs")
+        else:
+            print(
+                f"Too few previous runs ({num_runs}) to fit a runtime model, "
+                "ordering by total_size"
+            )
+
+        fns = dict(tasks)
+        pending = [name for name, _ in tasks if not sweep.is_finished(name)]
+        ordered, predictions = self.order(pending, objective, sweep.jobs, budget)
+        if len(ordered) < len(pending):
+            print(
+                f"Dropped {len(pending) - len(ordered)} jobs that do not fit the budget"
+            )
+        return [(name, fns[name]) for name in ordered], predictions
+
+    def _design_row(self, features):
+        return [1.0] + [np.log1p(features[name]) for name in JobScheduler.FEATURES]
+
+    def _load_features(self):
+        if self.features_path is None or not self.features_path.exists():
+            return {}
+        with open(self.features_path, "r") as f:
+            return json.load(f)
+
+    def _save_features(self):
+        if self.features_path is None:
+            return
+        with open(self.features_path, "w") as f:
+            json.dump(self.features, f)
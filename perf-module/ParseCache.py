@@ -0,0 +1,127 @@
+import hashlib
+import json
+import sqlite3
+import zlib
+from pathlib import Path
+
+
+class ParseCache:
+    """
+    Persistent cache of the filtered, categorized rows parsed from each perf
+    report, so reruns only reparse reports that changed.
+
+    Entries are keyed by report path and validated against the report's size,
+    mtime and content hash, the compiler whose rows were kept, and a
+    fingerprint of the function map's input files and category settings.
+    """
+
+    HASH_CHUNK_SIZE = 1 << 20
+
+    def __init__(
+        self, cache_path, compiler, function_map_inputs=(), function_map_settings=None
+    ):
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.compiler = compiler
+        self.function_map_hash = self._fingerprint_function_map(
+            function_map_inputs, function_map_settings or {}
+        )
+
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(self.cache_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS reports (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                compiler TEXT NOT NULL,
+                function_map_hash TEXT NOT NULL,
+                rows BLOB NOT NULL
+            )
+            """)
+        self.conn.commit()
+
+    def get(self, report_path):
+        """
+        Returns the cached rows for `report_path`, or None on a miss.
+        """
+        report_path = Path(report_path)
+        key = str(report_path.resolve())
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, content_hash, compiler, function_map_hash, rows "
+            "FROM reports WHERE path = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        size, mtime_ns, content_hash, compiler, function_map_hash, rows = row
+        if (
+            compiler != self.compiler.value
+            or function_map_hash != self.function_map_hash
+        ):
+            self.misses += 1
+            return None
+
+        st = report_path.stat()
+        if st.st_size != size:
+            self.misses += 1
+            return None
+        if st.st_mtime_ns != mtime_ns:
+            # touched but possibly unchanged (e.g. copied back from the drive)
+            if self._hash_file(report_path) != content_hash:
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE reports SET mtime_ns = ? WHERE path = ?",
+                (st.st_mtime_ns, key),
+            )
+            self.conn.commit()
+
+        self.hits += 1
+        return json.loads(zlib.decompress(rows))
+
+    def put(self, report_path, rows):
+        report_path = Path(report_path)
+        st = report_path.stat()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(report_path.resolve()),
+                st.st_size,
+                st.st_mtime_ns,
+                self._hash_file(report_path),
+                self.compiler.value,
+                self.function_map_hash,
+                zlib.compress(json.dumps(rows).encode()),
+            ),
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def summary(self):
+        return f"Parse cache: {self.hits} hits, {self.misses} misses"
+
+    def _hash_file(self, path):
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            while chunk := f.read(ParseCache.HASH_CHUNK_SIZE):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def _fingerprint_function_map(self, paths, settings):
+        h = hashlib.blake2b(digest_size=16)
+        for path in sorted((Path(p) for p in paths), key=lambda p: p.name):
+            h.update(path.name.encode())
+            h.update(path.read_bytes())
+        h.update(json.dumps(settings, sort_keys=True).encode())
+        return h.hexdigest()
@@ -1,9 +1,26 @@
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 import re
 from tqdm import tqdm
 import json
+import numpy as np
 from enum import Enum
 from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from ParseCache import ParseCache
+from CNFStatsTable import CNFStatsTable, CNFStatsTableBuilder
+from CallingContextTree import CallingContextTree
+from StatsIO import write_ndjson, write_json_items, NDJSONStats
+from RunManifest import RunManifest
+from Instrumentation import NULL_INSTRUMENTATION
+from Bootstrap import bootstrap_ratio_intervals, BOOTSTRAP_RESAMPLES, CONFIDENCE
+from SampleProfile import SampleProfile, SAMPLES_SUFFIX
+from PhaseProfile import (
+    PhaseTimeline,
+    aggregate_timelines,
+    PHASE_RESOLUTION,
+    NUM_PHASE_BUCKETS,
+)
 
 
 class StatMode(Enum):
@@ -28,6 +45,27 @@ class AbstractFunctionMap(ABC):
     def get_category(self, function_name):
         pass
 
+    def get_input_paths(self):
+        """
+        Files the map is built from, used to invalidate cached categories
+        """
+        return []
+
+    def get_category_settings(self):
+        """
+        JSON-serializable settings besides the input files that decide the
+        categories (e.g. resolver rules), used to invalidate cached categories
+        """
+        return {}
+
+
+# reports below this many samples, or losing a larger share of them, are
+# flagged by `report_quality`
+MIN_REPORT_SAMPLES = 1000
+MAX_LOST_RATIO = 0.05
+# CNFs parsed per batch in streaming and columnar modes, bounding the rows held
+STREAM_BATCH_SIZE = 256
+
 
 class PerfParser:
     TIMEOUT = 3600
@@ -40,83 +78,628 @@ class PerfParser:
         perf_dir="perf-report/",
         stdout_dir="stdout/valid",
         normalize=True,
+        jobs=1,
+        cache_path=None,
+        columnar=False,
+        streaming=False,
+        spill_path=None,
+        instrumentation=None,
     ):
         self.perf_dir = Path(perf_dir)
         self.stdout_dir = Path(stdout_dir)
-        self.cnfs = self._get_cnf_names()
+
+        # optional Instrumentation recording per-stage and per-report metrics
+        if instrumentation is None:
+            instrumentation = NULL_INSTRUMENTATION
+        self.instrumentation = instrumentation
+
+        # runtimes come from the stdout logs' manifest, scanned once up front
+        with self.instrumentation.stage("run_manifest"):
+            self.run_manifest = RunManifest(stdout_dir, jobs=jobs).refresh()
+        with self.instrumentation.stage("list_reports"):
+            self.cnfs = self._get_cnf_names()
         self.compiler = compiler
         self.function_map = function_map
 
         # normalize self_pct's to guarantee they add to 100%
         self.normalize = normalize
 
-        self.cnf_stats = self._init_cnf_stats()
-        self.timed_out_cnfs = {
-            cnf: stats
-            for cnf, stats in self.cnf_stats.items()
-            if stats.get("time", self.TIMEOUT) >= self.TIMEOUT
-        }
-        self.completed_cnfs = {
-            cnf: stats
-            for cnf, stats in self.cnf_stats.items()
-            if stats.get("time", self.TIMEOUT) < self.TIMEOUT
+        # number of worker processes used to ingest the per-CNF reports
+        self.jobs = jobs
+
+        # optional on-disk cache of parsed reports, e.g. "stats/parse_cache.sqlite"
+        self.parse_cache = None
+        if cache_path is not None:
+            self.parse_cache = ParseCache(
+                cache_path,
+                compiler,
+                function_map.get_input_paths(),
+                function_map.get_category_settings(),
+            )
+
+        # columnar=True keeps the rows in a CNFStatsTable; the row-level views
+        # (CNF_STATS, TIMED_OUT_STATS, COMPLETED_STATS) are then rebuilt from it
+        # on access instead of being held
+        self.columnar = columnar
+        self.stats_table = None
+        self._cnf_stats = None
+
+        # streaming=True folds every report into running per-function times of
+        # each subset as soon as it is parsed and drops its rows, so memory
+        # stays flat in the number of CNFs; the row-level views are then only
+        # available from the NDJSON file rows are spilled to at `spill_path`
+        if streaming and columnar:
+            raise ValueError("streaming and columnar modes are exclusive")
+        self.streaming = streaming
+        self.spill_path = None if spill_path is None else Path(spill_path)
+        self._accumulator = None
+
+        with self.instrumentation.stage("init_cnf_stats"):
+            if streaming:
+                self._accumulator, self._cnf_stats = self._stream_cnf_stats()
+            elif columnar:
+                self.stats_table = self._init_stats_table()
+            else:
+                self._cnf_stats = self._init_cnf_stats()
+
+        # StatMode -> stats, computed on first use
+        self._views = {}
+
+    def __getstate__(self):
+        # the parse cache's sqlite connection cannot be sent to pool workers
+        state = self.__dict__.copy()
+        state["parse_cache"] = None
+        state["_accumulator"] = None
+        return state
+
+    @property
+    def cnf_stats(self):
+        return self.get_stats(StatMode.CNF_STATS)
+
+    @property
+    def timed_out_cnfs(self):
+        return self.get_stats(StatMode.TIMED_OUT_STATS)
+
+    @property
+    def completed_cnfs(self):
+        return self.get_stats(StatMode.COMPLETED_STATS)
+
+    @property
+    def aggregate_stats(self):
+        return self.get_stats(StatMode.AGGREGATE_STATS)
+
+    @property
+    def aggregate_timed_out_stats(self):
+        return self.get_stats(StatMode.AGGREGATE_TIMED_OUT_STATS)
+
+    @property
+    def aggregate_completed_stats(self):
+        return self.get_stats(StatMode.AGGREGATE_COMPLETED_STATS)
+
+    @property
+    def category_stats(self):
+        return self.get_stats(StatMode.CATEGORY_STATS)
+
+    @property
+    def category_timed_out_stats(self):
+        return self.get_stats(StatMode.CATEGORY_TIMED_OUT_STATS)
+
+    @property
+    def category_completed_stats(self):
+        return self.get_stats(StatMode.CATEGORY_COMPLETED_STATS)
+
+    def get_stats(self, stat_mode: StatMode):
+        if not isinstance(stat_mode, StatMode):
+            raise ValueError(f"Invalid stat mode: {stat_mode}")
+        if stat_mode in self._views:
+            return self._views[stat_mode]
+        if self.columnar and stat_mode in ROW_MODES:
+            return self._get_row_view(stat_mode)
+        if stat_mode in ROW_MODES:
+            self._require_rows()
+
+        self.compute(stat_mode)
+        return self._views[stat_mode]
+
+    def compute(self, *stat_modes: StatMode):
+        """
+        Computes and caches the requested views. The aggregates needed by the
+        requested modes (including those behind category modes) are computed
+        together in one pass over the rows.
+        """
+        aggregate_modes = []
+        for stat_mode in stat_modes:
+            aggregate_mode = CATEGORY_TO_AGGREGATE_MODE.get(stat_mode, stat_mode)
+            if (
+                aggregate_mode in AGGREGATE_MODE_SUBSETS
+                and aggregate_mode not in self._views
+                and aggregate_mode not in aggregate_modes
+            ):
+                aggregate_modes.append(aggregate_mode)
+
+        if aggregate_modes:
+            subsets = [AGGREGATE_MODE_SUBSETS[mode] for mode in aggregate_modes]
+            for subset in subsets:
+                print(f"Aggregating Stats for {subset} CNFs...")
+            with self.instrumentation.stage("aggregate", subsets=subsets):
+                aggregates = self._aggregate_subsets(subsets)
+            for mode, subset in zip(aggregate_modes, subsets):
+                self._views[mode] = aggregates[subset]
+
+        for stat_mode in stat_modes:
+            if stat_mode in self._views:
+                continue
+            if stat_mode in CATEGORY_TO_AGGREGATE_MODE:
+                subset = AGGREGATE_MODE_SUBSETS[CATEGORY_TO_AGGREGATE_MODE[stat_mode]]
+                print(f"Aggregating Stats by Category for {subset} CNFs...")
+                with self.instrumentation.stage("aggregate_by_category", subset=subset):
+                    self._views[stat_mode] = self._aggregate_subset_by_category(subset)
+                continue
+            if self.columnar:
+                # row views are rebuilt from the table on every access
+                continue
+
+            self._require_rows()
+            if stat_mode == StatMode.CNF_STATS:
+                self._views[stat_mode] = self._cnf_stats
+            else:
+                self._views[stat_mode] = CNFStatsView(
+                    self._cnf_stats,
+                    [
+                        cnf
+                        for cnf, data in self._cnf_stats.items()
+                        if self._in_subset(data, ROW_MODE_SUBSETS[stat_mode])
+                    ],
+                )
+
+    def to_json(self, output_path: str, stat_mode: StatMode):
+        if self.streaming and stat_mode in ROW_MODES:
+            # copied from the spill file one CNF at a time
+            with self.instrumentation.stage("write_json", stat_mode=stat_mode.value):
+                write_json_items(output_path, self._iter_spilled_rows(stat_mode))
+            return
+
+        stats = self.get_stats(stat_mode)
+        if isinstance(stats, CNFStatsView):
+            stats = dict(stats)
+
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.instrumentation.stage("write_json", stat_mode=stat_mode.value):
+            with open(output_path, "w") as f:
+                json.dump(stats, f, indent=4)
+
+    def to_ndjson(self, output_path: str, stat_mode: StatMode):
+        """
+        Streaming alternative to `to_json`: one CNF (or function/category for
+        aggregate modes) per line, written as it is produced.
+        """
+        if self.columnar and stat_mode in ROW_MODES:
+            mask = self._subset_mask(ROW_MODE_SUBSETS[stat_mode])
+            items = self.stats_table.iter_cnf_stats(mask)
+        elif self.streaming and stat_mode in ROW_MODES:
+            items = self._iter_spilled_rows(stat_mode)
+        else:
+            items = self.get_stats(stat_mode).items()
+        key_field = "cnf" if stat_mode in ROW_MODES else "name"
+        write_ndjson(output_path, items, key_field)
+
+    def to_npz(self, output_path: str, stat_mode: StatMode):
+        """
+        Columnar alternative to `to_json` for the row-level modes, readable
+        per CNF and per column with `CNFStatsTable.load_npz`.
+        """
+        if stat_mode not in ROW_MODES:
+            raise ValueError(f"Invalid stat mode for npz output: {stat_mode}")
+
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.columnar:
+            mask = self._subset_mask(ROW_MODE_SUBSETS[stat_mode])
+            self.stats_table.save_npz(output_path, mask)
+        else:
+            table = CNFStatsTable.from_cnf_stats(self.get_stats(stat_mode))
+            table.save_npz(output_path)
+
+    def build_calling_context_tree(self, stat_mode=StatMode.CNF_STATS):
+        """
+        Merges the folded call-graph stacks of every CNF in the row view
+        `stat_mode` into one CallingContextTree. Each CNF's percentages are
+        scaled by its runtime (and normalized like the flat stats), so node
+        values are seconds and a function's exclusive total over all contexts
+        matches its aggregate time. Reports are streamed one at a time.
+        """
+        if stat_mode not in ROW_MODES:
+            raise ValueError(
+                f"Invalid stat mode for a calling-context tree: {stat_mode}"
+            )
+
+        tree = CallingContextTree()
+        for cnf, cnf_time in tqdm(
+            self._get_cnf_times(stat_mode), desc="Building Calling-Context Tree..."
+        ):
+            if not cnf_time:
+                continue
+            cnf_tree, total_self_pct = self._get_cnf_calling_context_tree(cnf)
+            if cnf_tree is None or total_self_pct == 0:
+                continue
+            scale = cnf_time / (total_self_pct if self.normalize else 100.0)
+            tree.merge(cnf_tree, scale)
+        return tree
+
+    def build_phase_timelines(
+        self, stat_mode=StatMode.CNF_STATS, resolution=PHASE_RESOLUTION
+    ):
+        """
+        Returns {cnf: PhaseTimeline} of category share over time for every CNF
+        in the row view `stat_mode` profiled with sample files (text reports
+        have no timestamps). Samples are bucketed chunk by chunk and only
+        samples whose leaf is a kept compiler function count, as in the flat
+        stats.
+        """
+        if stat_mode not in ROW_MODES:
+            raise ValueError(f"Invalid stat mode for phase timelines: {stat_mode}")
+
+        timelines = {}
+        for cnf, _ in tqdm(
+            self._get_cnf_times(stat_mode), desc="Building Phase Timelines..."
+        ):
+            report_path = self._get_report_path(cnf)
+            if not is_sample_file(report_path):
+                continue
+            timelines[cnf] = self._get_cnf_phase_timeline(report_path, resolution)
+        return timelines
+
+    def phase_profile(
+        self,
+        stat_mode=StatMode.CNF_STATS,
+        num_buckets=NUM_PHASE_BUCKETS,
+        resolution=PHASE_RESOLUTION,
+    ):
+        """
+        Category share over normalized run time, averaged across the CNFs of
+        `stat_mode` (see `aggregate_timelines`), with each CNF's own
+        normalized shares and duration under "cnfs".
+        """
+        timelines = self.build_phase_timelines(stat_mode, resolution)
+        profile = aggregate_timelines(timelines.values(), num_buckets)
+        profile["cnfs"] = {
+            cnf: {
+                "duration": timeline.duration,
+                "shares": {
+                    category: share.tolist()
+                    for category, share in timeline.normalized(num_buckets).items()
+                },
+            }
+            for cnf, timeline in timelines.items()
         }
-        print("Aggregating Stats for all CNFs...")
-        self.aggregate_stats = self._aggregate_cnf_stats()
+        return profile
 
-        print("Aggregating Stats for timed out CNFs...")
-        self.aggregate_timed_out_stats = self._aggregate_cnf_stats(self.timed_out_cnfs)
+    def phase_profile_to_json(
+        self,
+        output_path: str,
+        stat_mode=StatMode.CNF_STATS,
+        num_buckets=NUM_PHASE_BUCKETS,
+    ):
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(self.phase_profile(stat_mode, num_buckets), f, indent=4)
+
+    def bootstrap_stats(
+        self,
+        stat_mode=StatMode.AGGREGATE_STATS,
+        num_resamples=BOOTSTRAP_RESAMPLES,
+        confidence=CONFIDENCE,
+        seed=None,
+    ):
+        """
+        The aggregate or category stats of `stat_mode` with a percentile
+        bootstrap interval for every pct, resampling the subset's CNFs with
+        replacement:
 
-        print("Aggregating Stats for completed CNFs...")
-        self.aggregate_completed_stats = self._aggregate_cnf_stats(self.completed_cnfs)
+        {
+            ...
+            name: {..., pct_ci: [low, high]},
+            ...
+        }
+        """
+        aggregate_mode = CATEGORY_TO_AGGREGATE_MODE.get(stat_mode, stat_mode)
+        if aggregate_mode not in AGGREGATE_MODE_SUBSETS:
+            raise ValueError(f"Invalid stat mode for bootstrap: {stat_mode}")
+        stats = self.get_stats(stat_mode)
 
-        print("Aggregating Stats by Category for all CNFs...")
-        self.category_stats = self._aggregate_cnf_stats_by_category()
+        table = self._get_stats_table()
+        mask = self._subset_mask(AGGREGATE_MODE_SUBSETS[aggregate_mode], table)
+        symbol_ids, cnf_times, times = table.function_time_matrix(self.normalize, mask)
+        names = [table.symbols[symbol_id] for symbol_id in symbol_ids.tolist()]
 
-        print("Aggregating Stats by Category for timed out CNFs...")
-        self.category_timed_out_stats = self._aggregate_cnf_stats_by_category(
-            self.aggregate_timed_out_stats
-        )
+        if stat_mode in CATEGORY_TO_AGGREGATE_MODE:
+            # category pct is relative to the summed function times, as in
+            # `_aggregate_cnf_stats_by_category`
+            category_ids = {}
+            function_categories = [
+                category_ids.setdefault(
+                    self.function_map.get_category(name), len(category_ids)
+                )
+                for name in names
+            ]
+            one_hot = np.zeros((len(names), len(category_ids)))
+            one_hot[np.arange(len(names)), function_categories] = 1
+            times = times @ one_hot
+            cnf_times = times.sum(axis=1)
+            names = list(category_ids)
 
-        print("Aggregating Stats by Category for completed CNFs...")
-        self.category_completed_stats = self._aggregate_cnf_stats_by_category(
-            self.aggregate_completed_stats
+        low, high = bootstrap_ratio_intervals(
+            times, cnf_times, num_resamples, confidence, seed
         )
+        intervals = dict(zip(names, zip(low.tolist(), high.tolist())))
+        return {
+            name: {**entry, "pct_ci": list(intervals[name])}
+            for name, entry in stats.items()
+        }
 
-    def to_json(self, output_path: str, stat_mode: StatMode):
-        stats = None
-        match stat_mode:
-            case StatMode.CNF_STATS:
-                stats = self.cnf_stats
-            case StatMode.TIMED_OUT_STATS:
-                stats = self.timed_out_cnfs
-            case StatMode.COMPLETED_STATS:
-                stats = self.completed_cnfs
-            case StatMode.AGGREGATE_STATS:
-                stats = self.aggregate_stats
-            case StatMode.AGGREGATE_TIMED_OUT_STATS:
-                stats = self.aggregate_timed_out_stats
-            case StatMode.AGGREGATE_COMPLETED_STATS:
-                stats = self.aggregate_completed_stats
-            case StatMode.CATEGORY_STATS:
-                stats = self.category_stats
-            case StatMode.CATEGORY_TIMED_OUT_STATS:
-                stats = self.category_timed_out_stats
-            case StatMode.CATEGORY_COMPLETED_STATS:
-                stats = self.category_completed_stats
-            case _:
-                raise ValueError(f"Invalid stat mode: {stat_mode}")
+    def report_quality(
+        self, min_samples=MIN_REPORT_SAMPLES, max_lost_ratio=MAX_LOST_RATIO
+    ):
+        """
+        Returns {
+            ...
+            cnf: {
+                samples, lost_samples: report header counts (None if unknown)
+                lost_ratio: lost / (samples + lost), None if unknown
+                flags: "no_header", "few_samples" and/or "lost_samples"
+            },
+            ...
+        }
+        for every CNF with a report.
+        """
+        table = self._get_stats_table()
+        samples = table.metadata_counts("samples")
+        lost = table.metadata_counts("lost_samples")
+        lost_ratio = lost / (samples + lost)
+
+        no_header = np.isnan(samples)
+        few_samples = samples < min_samples
+        high_loss = lost_ratio > max_lost_ratio
+
+        def count(value):
+            return None if np.isnan(value) else int(value)
+
+        quality = {}
+        for i in np.flatnonzero(table.has_stats).tolist():
+            flags = [
+                flag
+                for flag, flagged in (
+                    ("no_header", no_header[i]),
+                    ("few_samples", few_samples[i]),
+                    ("lost_samples", high_loss[i]),
+                )
+                if flagged
+            ]
+            quality[str(table.cnf_names[i])] = {
+                "samples": count(samples[i]),
+                "lost_samples": count(lost[i]),
+                "lost_ratio": None if np.isnan(lost_ratio[i]) else lost_ratio[i].item(),
+                "flags": flags,
+            }
+        return quality
+
+    def weighted_stats(
+        self,
+        stat_mode=StatMode.AGGREGATE_STATS,
+        weight="samples",
+        exclude_flagged=False,
+        min_samples=MIN_REPORT_SAMPLES,
+        max_lost_ratio=MAX_LOST_RATIO,
+    ):
+        """
+        The aggregate or category stats of `stat_mode` with each CNF's rows
+        scaled by its report's absolute sample count (weight="samples") or
+        event count ("event_count") instead of its runtime, so a 50-sample
+        report weighs a millionth of a 50-million-sample one. CNFs without
+        that header field are left out, and `exclude_flagged` also drops
+        the ones `report_quality` flags.
+
+        Returns {name: {<weight>: total, pct[, category]}}.
+        """
+        if weight not in ("samples", "event_count"):
+            raise ValueError(f"Invalid weight: {weight}")
+        aggregate_mode = CATEGORY_TO_AGGREGATE_MODE.get(stat_mode, stat_mode)
+        if aggregate_mode not in AGGREGATE_MODE_SUBSETS:
+            raise ValueError(f"Invalid stat mode for weighting: {stat_mode}")
+
+        table = self._get_stats_table()
+        mask = self._subset_mask(AGGREGATE_MODE_SUBSETS[aggregate_mode], table)
+        if mask is None:
+            mask = np.ones(table.num_cnfs, dtype=bool)
+        weights = table.metadata_counts(weight)
+        mask = mask & ~np.isnan(weights)
+        if exclude_flagged:
+            flagged = {
+                cnf
+                for cnf, quality in self.report_quality(
+                    min_samples, max_lost_ratio
+                ).items()
+                if quality["flags"]
+            }
+            mask &= ~np.isin(table.cnf_names.astype(str), list(flagged))
+        if not mask.any():
+            raise ValueError(f"No reports with a {weight} header to weight by")
+        weights = np.nan_to_num(weights)
+
+        if stat_mode in CATEGORY_TO_AGGREGATE_MODE:
+            stats = table.aggregate_by_category(
+                self.normalize, self.function_map.get_category, mask, weights
+            )
+        else:
+            stats = table.aggregate(
+                self.normalize, self.function_map.get_category, mask, weights
+            )
+        return {
+            name: {
+                weight: entry["time"],
+                **{k: v for k, v in entry.items() if k != "time"},
+            }
+            for name, entry in stats.items()
+        }
 
+    def bootstrap_to_json(
+        self,
+        output_path: str,
+        stat_mode=StatMode.AGGREGATE_STATS,
+        num_resamples=BOOTSTRAP_RESAMPLES,
+        confidence=CONFIDENCE,
+        seed=None,
+    ):
+        stats = self.bootstrap_stats(stat_mode, num_resamples, confidence, seed)
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         with open(output_path, "w") as f:
             json.dump(stats, f, indent=4)
 
+    def _get_stats_table(self):
+        # the columnar table, or a temporary one built from the dict rows
+        if self.stats_table is not None:
+            return self.stats_table
+        self._require_rows()
+        return CNFStatsTable.from_cnf_stats(self._cnf_stats)
+
+    def _get_cnf_phase_timeline(self, report_path, resolution):
+        profile = SampleProfile.load(report_path)
+        timeline = PhaseTimeline(resolution)
+
+        # category id of every frame; -1 drops library and filtered frames, and
+        # the trailing -1 catches the leaf id -1 of empty stacks
+        compiler_dso = np.flatnonzero(profile.dsos == self.compiler.value)
+        frame_categories = np.full(len(profile.frame_symbols) + 1, -1, dtype=np.int64)
+        for frame, (symbol_id, dso_id) in enumerate(
+            zip(profile.frame_symbols.tolist(), profile.frame_dsos.tolist())
+        ):
+            symbol = str(profile.symbols[symbol_id])
+            if dso_id not in compiler_dso or not keep_symbol(symbol):
+                continue
+            category = self.function_map.get_category(symbol)
+            if category is None:
+                category = PerfParser.UNCATEGORIZED
+            frame_categories[frame] = timeline.category_id(category)
+
+        for times, periods, leaves in profile.iter_sample_chunks():
+            timeline.add(times, periods, frame_categories[leaves])
+        return timeline
+
+    def _get_cnf_calling_context_tree(self, cnf_name):
+        """
+        Returns (tree in report percentages, total kept self_pct) for one CNF.
+        """
+        perf_report = self._get_report_path(cnf_name)
+        if not perf_report.exists():
+            return None, 0
+
+        tree = CallingContextTree()
+        total_self_pct = 0
+        for entry, stacks in stream_report_stacks(perf_report, self.compiler.value):
+            total_self_pct += entry["self_pct"]
+            for frames, pct in stacks:
+                tree.add_stack(frames, pct)
+        return tree, total_self_pct
+
+    def _get_cnf_times(self, stat_mode):
+        if self.columnar:
+            table = self.stats_table
+            mask = self._subset_mask(ROW_MODE_SUBSETS[stat_mode])
+            if mask is None:
+                mask = np.ones(table.num_cnfs, dtype=bool)
+            mask = mask & table.has_stats
+            return [
+                (cnf, None if np.isnan(time) else time)
+                for cnf, time in zip(
+                    table.cnf_names[mask].tolist(), table.times[mask].tolist()
+                )
+            ]
+        return [
+            (cnf, data.get("time"))
+            for cnf, data in self.get_stats(stat_mode).items()
+            if "stats" in data
+        ]
+
+    def _require_rows(self):
+        if self._cnf_stats is None and not self.columnar:
+            raise ValueError(
+                "Row-level stats were not kept in streaming mode; "
+                "pass spill_path to spill them to disk"
+            )
+
+    def _iter_spilled_rows(self, stat_mode):
+        self._require_rows()
+        subset = ROW_MODE_SUBSETS[stat_mode]
+        return (
+            (cnf, data)
+            for cnf, data in self._cnf_stats.items()
+            if self._in_subset(data, subset)
+        )
+
+    def _get_row_view(self, stat_mode):
+        subset = ROW_MODE_SUBSETS.get(stat_mode)
+        return self.stats_table.to_cnf_stats(self._subset_mask(subset))
+
+    def _in_subset(self, data, subset):
+        match subset:
+            case "all":
+                return True
+            case "timed out":
+                return data.get("time", self.TIMEOUT) >= self.TIMEOUT
+            case "completed":
+                return data.get("time", self.TIMEOUT) < self.TIMEOUT
+
+    def _subset_mask(self, subset, table=None):
+        if table is None:
+            table = self.stats_table
+        match subset:
+            case "all":
+                return None
+            case "timed out":
+                return table.timed_out_mask(self.TIMEOUT)
+            case "completed":
+                return table.completed_mask(self.TIMEOUT)
+
+    def _aggregate_subsets(self, subsets):
+        if self.columnar:
+            return {
+                subset: self.stats_table.aggregate(
+                    self.normalize,
+                    self.function_map.get_category,
+                    self._subset_mask(subset),
+                )
+                for subset in subsets
+            }
+        if self.streaming:
+            return self._accumulator.results(subsets, self.function_map.get_category)
+        return self._aggregate_cnf_stats_fused(
+            {
+                subset: lambda data, s=subset: self._in_subset(data, s)
+                for subset in subsets
+            }
+        )
+
+    def _aggregate_subset_by_category(self, subset):
+        if self.columnar:
+            return self.stats_table.aggregate_by_category(
+                self.normalize,
+                self.function_map.get_category,
+                self._subset_mask(subset),
+            )
+        aggregate_mode = {
+            subset: mode for mode, subset in AGGREGATE_MODE_SUBSETS.items()
+        }[subset]
+        return self._aggregate_cnf_stats_by_category(self.get_stats(aggregate_mode))
+
     def _init_cnf_stats(self):
         """
         CNF Field:
         - stats
         - time: reported runtime
+        - metadata: report header (see `read_report_metadata`)
 
         Stats Fields:
         - children_pct
@@ -128,24 +711,11 @@ class PerfParser:
             - making self_pct actually add to 1
         - category
         """
-        cnf_stats = {}
-        for cnf in tqdm(self.cnfs, desc="Initializing CNF Stats..."):
-            cnf_stats[cnf] = {}
-            stats = self._get_cnf_stats(cnf)
-            if stats is None:
-                continue
-
-            norm_stats = self._normalize_cnf_stats(stats)
-            for stat in norm_stats:
-                function_name = stat["symbol"]
-                category = self.function_map.get_category(function_name)
-                if category is None:
-                    category = PerfParser.UNCATEGORIZED
-                stat["category"] = category
-
-            cnf_stats[cnf]["stats"] = norm_stats
-            cnf_stats[cnf]["time"] = self._get_cnf_runtime(cnf)
+        entries = self._build_entries(self.cnfs)
+        if self.parse_cache is not None:
+            print(self.parse_cache.summary())
 
+        cnf_stats = {cnf: entries[cnf] for cnf in self.cnfs}
         cnf_stats = dict(
             sorted(
                 cnf_stats.items(),
@@ -156,6 +726,201 @@ class PerfParser:
 
         return cnf_stats
 
+    def _stream_cnf_stats(self):
+        """
+        Streaming counterpart of `_init_cnf_stats`: reports are parsed in
+        batches of STREAM_BATCH_SIZE and each entry is folded into a
+        FunctionTimeAccumulator, then spilled to `spill_path` if set, and
+        dropped. CNFs are visited in the order `_init_cnf_stats` sorts them
+        (see `_iter_sorted_entries`), so the sums, and hence the aggregates,
+        match the in-memory mode exactly.
+
+        Returns (accumulator, NDJSONStats of the spilled rows or None).
+        """
+        accumulator = FunctionTimeAccumulator(
+            {
+                subset: lambda data, s=subset: self._in_subset(data, s)
+                for subset in AGGREGATE_MODE_SUBSETS.values()
+            },
+            self.normalize,
+        )
+
+        def iter_entries():
+            for cnf, entry in self._iter_sorted_entries():
+                accumulator.add(entry)
+                yield cnf, entry
+
+        entries = tqdm(
+            iter_entries(), total=len(self.cnfs), desc="Streaming CNF Stats..."
+        )
+        if self.spill_path is None:
+            for _ in entries:
+                pass
+            spilled = None
+        else:
+            offsets = write_ndjson(self.spill_path, entries, "cnf")
+            spilled = NDJSONStats(self.spill_path, offsets)
+
+        if self.parse_cache is not None:
+            print(self.parse_cache.summary())
+        return accumulator, spilled
+
+    def _init_stats_table(self):
+        """
+        Columnar counterpart of `_init_cnf_stats`: each parsed entry is
+        appended straight into a CNFStatsTableBuilder and dropped, so the
+        dict-of-dicts is never held next to the table.
+        """
+        builder = CNFStatsTableBuilder()
+        for cnf, entry in tqdm(
+            self._iter_sorted_entries(),
+            total=len(self.cnfs),
+            desc="Initializing CNF Stats...",
+        ):
+            builder.append(cnf, entry)
+
+        if self.parse_cache is not None:
+            print(self.parse_cache.summary())
+        with self.instrumentation.stage("columnar_table"):
+            return builder.build()
+
+    def _iter_sorted_entries(self):
+        """
+        Yields (cnf, `_build_cnf_entry`) in the order `_init_cnf_stats` sorts
+        the CNFs (runtimes are known from the manifest before parsing),
+        parsing reports in batches of STREAM_BATCH_SIZE.
+        """
+        # CNFs without a report get an empty entry, which sorts as TIMEOUT
+        cnfs = sorted(
+            self.cnfs,
+            key=lambda cnf: (
+                self._get_cnf_runtime(cnf)
+                if self._get_report_path(cnf).exists()
+                else None
+            )
+            or PerfParser.TIMEOUT,
+            reverse=True,
+        )
+
+        # one worker pool serves every batch
+        if self.jobs > 1 and len(cnfs) > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=self.jobs, initializer=_init_worker, initargs=(self,)
+            )
+        else:
+            executor = None
+        try:
+            for start in range(0, len(cnfs), STREAM_BATCH_SIZE):
+                batch = cnfs[start : start + STREAM_BATCH_SIZE]
+                entries = self._build_entries(batch, executor, progress=False)
+                for cnf in batch:
+                    yield cnf, entries.pop(cnf)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def _build_entries(self, cnfs, executor=None, progress=True):
+        """
+        Returns {cnf: `_build_cnf_entry`} for `cnfs`, taking rows from the
+        parse cache where valid and storing those of freshly parsed reports.
+        """
+        entries = {}
+        to_parse = []
+        with self.instrumentation.stage("parse_cache_lookup"):
+            for cnf in cnfs:
+                rows = None
+                report_path = self._get_report_path(cnf)
+                if self.parse_cache is not None and report_path.exists():
+                    rows = self.parse_cache.get(report_path)
+                if rows is None:
+                    to_parse.append(cnf)
+                else:
+                    # the header is re-read (it is only a few lines); rows are cached
+                    entries[cnf] = {
+                        "stats": rows,
+                        "time": self._get_cnf_runtime(cnf),
+                        "metadata": read_report_metadata(report_path),
+                    }
+
+        with self.instrumentation.stage("parse_reports", reports=len(to_parse)):
+            self._parse_entries(to_parse, entries, executor, progress)
+
+        if self.parse_cache is not None:
+            with self.instrumentation.stage("parse_cache_store"):
+                for cnf in to_parse:
+                    if "stats" in entries[cnf]:
+                        self.parse_cache.put(
+                            self._get_report_path(cnf), entries[cnf]["stats"]
+                        )
+                self.parse_cache.commit()
+
+        return entries
+
+    def _parse_entries(self, to_parse, entries, executor=None, progress=True):
+        """
+        Fills `entries` with `_build_cnf_entry` of every CNF in `to_parse`,
+        across `jobs` worker processes (those of `executor` if given).
+        """
+        if self.jobs > 1 and len(to_parse) > 1:
+            if executor is None:
+                with ProcessPoolExecutor(
+                    max_workers=self.jobs,
+                    initializer=_init_worker,
+                    initargs=(self,),
+                ) as executor:
+                    self._parse_entries(to_parse, entries, executor, progress)
+                return
+
+            # map() yields in submission order, so the merge below sees the
+            # same sequence as a serial run and the sort stays stable
+            parsed = executor.map(
+                _build_cnf_entry_in_worker,
+                to_parse,
+                chunksize=max(1, len(to_parse) // (self.jobs * 4)),
+            )
+            for cnf, (entry, reports) in tqdm(
+                zip(to_parse, parsed),
+                total=len(to_parse),
+                desc="Initializing CNF Stats...",
+                disable=not progress,
+            ):
+                entries[cnf] = entry
+                self.instrumentation.merge_reports(reports)
+        else:
+            for cnf in tqdm(
+                to_parse, desc="Initializing CNF Stats...", disable=not progress
+            ):
+                entries[cnf] = self._build_cnf_entry(cnf)
+
+    def _build_cnf_entry(self, cnf):
+        """
+        Parses, normalizes and categorizes a single CNF's report.
+        """
+        entry = {}
+        timer = self.instrumentation.report_timer(cnf)
+        stats = self._get_cnf_stats(cnf, timer.counts)
+        timer.lap("parse")
+        if stats is None:
+            return entry
+
+        norm_stats = self._normalize_cnf_stats(stats)
+        timer.lap("normalize")
+        for stat in norm_stats:
+            function_name = stat["symbol"]
+            category = self.function_map.get_category(function_name)
+            if category is None:
+                category = PerfParser.UNCATEGORIZED
+            stat["category"] = category
+        timer.lap("categorize")
+
+        entry["stats"] = norm_stats
+        entry["time"] = self._get_cnf_runtime(cnf)
+        timer.lap("runtime")
+        entry["metadata"] = read_report_metadata(self._get_report_path(cnf))
+        timer.lap("metadata")
+        self.instrumentation.record_report(timer)
+        return entry
+
     def _aggregate_cnf_stats(self, cnf_stats=None):
         """
         Returns {
@@ -167,49 +932,23 @@ class PerfParser:
             ...
         }
         """
-        if cnf_stats is None:
-            cnf_stats = self.cnf_stats
-
-        total_time = sum(stat.get("time", 0) for stat in cnf_stats.values())
-        print(f"Total time: {total_time}")
-        assert total_time > 0, "Total time should be greater than 0"
-
-        function_times = {}
-        for cnf, data in cnf_stats.items():
-            stats = data.get("stats", [])
-            cnf_time = data.get("time", 0)
-            if cnf_time == 0:
-                continue
-
-            for stat in stats:
-                function_name = stat["symbol"]
-                self_pct = (
-                    stat["norm_self_pct"]
-                    if self.normalize
-                    else (stat["self_pct"] / 100.0)
-                )
-                function_time = self_pct * cnf_time
+        return self._aggregate_cnf_stats_fused({"all": lambda data: True}, cnf_stats)[
+            "all"
+        ]
 
-                function_times[function_name] = (
-                    function_times.get(function_name, 0) + function_time
-                )
-
-        function_stats = {}
-        for function_name, function_time in function_times.items():
-            function_stats[function_name] = {
-                "time": function_time,
-                "pct": function_time / total_time,
-                "category": self.function_map.get_category(function_name),
-            }
-        function_stats = dict(
-            sorted(
-                function_stats.items(),
-                key=lambda item: item[1]["time"],
-                reverse=True,
-            )
-        )
+    def _aggregate_cnf_stats_fused(self, subsets, cnf_stats=None):
+        """
+        Aggregates several subsets of CNFs in a single pass over the rows.
+        `subsets` maps a name to a predicate on a CNF's data; returns a
+        `_aggregate_cnf_stats` result per name.
+        """
+        if cnf_stats is None:
+            cnf_stats = self._cnf_stats
 
-        return function_stats
+        accumulator = FunctionTimeAccumulator(subsets, self.normalize)
+        for data in cnf_stats.values():
+            accumulator.add(data)
+        return accumulator.results(subsets, self.function_map.get_category)
 
     def _aggregate_cnf_stats_by_category(self, agg_cnf_stats=None):
         """
@@ -257,9 +996,15 @@ class PerfParser:
     def _get_cnf_names(self):
         cnf_names = []
         for file_path in self.perf_dir.iterdir():
-            if file_path.is_file() and file_path.name.endswith(".log"):
+            if file_path.is_file() and file_path.name.endswith(SAMPLES_SUFFIX):
+                cnf_name = file_path.name[: -len(SAMPLES_SUFFIX)]
+            elif file_path.is_file() and file_path.name.endswith(".log"):
                 # strip the .log to get the pure cnf filename
                 cnf_name = file_path.name.rstrip(".log")
+            else:
+                continue
+            # a CNF with both a sample file and a text report is listed once
+            if cnf_name not in cnf_names:
                 cnf_names.append(cnf_name)
         return cnf_names
 
@@ -269,64 +1014,163 @@ class PerfParser:
             stat["norm_self_pct"] = stat["self_pct"] / total_self_pct
         return cnf_stats
 
-    def _get_cnf_stats(self, cnf_name):
-        perf_report = self.perf_dir / f"{cnf_name}.log"
+    def _get_report_path(self, cnf_name):
+        # sample files exported at record time take precedence over text reports
+        samples_path = self.perf_dir / f"{cnf_name}{SAMPLES_SUFFIX}"
+        if samples_path.exists():
+            return samples_path
+        return self.perf_dir / f"{cnf_name}.log"
+
+    def _get_cnf_stats(self, cnf_name, counts=None):
+        perf_report = self._get_report_path(cnf_name)
         if not perf_report.exists():
             return None
-        with open(perf_report, "r") as f:
-            lines = f.readlines()
-            parsed = [match_main_line(line) for line in lines]
-            parsed = [
-                p
-                for p in parsed
-                if (
-                    p is not None
-                    and p["sharedobject"] == self.compiler.value
-                    and "@" not in p["symbol"]
-                    and "__" not in p["symbol"]
-                    and "::" not in p["symbol"]
-                    and not p["symbol"].startswith("_")
-                    and not p["symbol"].startswith("0x")
-                )
-            ]
 
-            # sort in descending order by self_pct
-            parsed = sorted(parsed, key=lambda x: x["self_pct"], reverse=True)
-            return parsed
+        parsed = list(stream_report_rows(perf_report, self.compiler.value, counts))
+
+        # sort in descending order by self_pct
+        parsed = sorted(parsed, key=lambda x: x["self_pct"], reverse=True)
+        return parsed
 
     def _get_total_self_pct(self, cnf_stats):
         return sum([st["self_pct"] for st in cnf_stats])
 
     def _get_cnf_runtime(self, cnf_name):
-        log_path = Path(f"./stdout/valid/{cnf_name}.log")
-        if not log_path.exists():
-            return None
+        return self.run_manifest.runtime(cnf_name, timeout=PerfParser.TIMEOUT)
 
-        with open(log_path, "r") as f:
-            for line in f:
-                if line.startswith("Total Time:"):
-                    time_str = line.split(":")[1].strip().rstrip("s")
-                    return float(time_str)
-        return PerfParser.TIMEOUT
 
+# subset of CNFs each view covers
+ROW_MODE_SUBSETS = {
+    StatMode.CNF_STATS: "all",
+    StatMode.TIMED_OUT_STATS: "timed out",
+    StatMode.COMPLETED_STATS: "completed",
+}
+ROW_MODES = set(ROW_MODE_SUBSETS)
+AGGREGATE_MODE_SUBSETS = {
+    StatMode.AGGREGATE_STATS: "all",
+    StatMode.AGGREGATE_TIMED_OUT_STATS: "timed out",
+    StatMode.AGGREGATE_COMPLETED_STATS: "completed",
+}
+CATEGORY_TO_AGGREGATE_MODE = {
+    StatMode.CATEGORY_STATS: StatMode.AGGREGATE_STATS,
+    StatMode.CATEGORY_TIMED_OUT_STATS: StatMode.AGGREGATE_TIMED_OUT_STATS,
+    StatMode.CATEGORY_COMPLETED_STATS: StatMode.AGGREGATE_COMPLETED_STATS,
+}
 
-def match_main_line(line):
-    children_pct_pattern = r"\s*(?P<children_pct>\d+\.\d+)%"
-    self_pct_pattern = r"\s+(?P<self_pct>\d+\.\d+)%"
-    command_pattern = r"\s+(?P<command>\S+)"
-    sharedobject_pattern = r"\s+(?P<sharedobject>\S+)"
-    symbol_pattern = r"\s+\[\.\]\s+(?P<symbol>\S+)"
-    pattern = (
-        "^"
-        + children_pct_pattern
-        + self_pct_pattern
-        + command_pattern
-        + sharedobject_pattern
-        + symbol_pattern
-        + "$"
-    )
 
-    match = re.match(pattern, line)
+class CNFStatsView(Mapping):
+    """
+    Read-only view of a subset of cnf_stats that shares the underlying dict
+    instead of copying it.
+    """
+
+    def __init__(self, cnf_stats, cnfs):
+        self._cnf_stats = cnf_stats
+        self._cnfs = list(cnfs)
+        self._members = set(self._cnfs)
+
+    def __getitem__(self, cnf):
+        if cnf not in self._members:
+            raise KeyError(cnf)
+        return self._cnf_stats[cnf]
+
+    def __iter__(self):
+        return iter(self._cnfs)
+
+    def __len__(self):
+        return len(self._cnfs)
+
+
+class FunctionTimeAccumulator:
+    """
+    Running total and per-function times of several subsets of CNFs, folded
+    in one CNF's data at a time. `subsets` maps a name to a predicate on a
+    CNF's data.
+    """
+
+    def __init__(self, subsets, normalize):
+        self.subsets = subsets
+        self.normalize = normalize
+        self.total_times = {name: 0 for name in subsets}
+        self.function_times = {name: {} for name in subsets}
+
+    def add(self, data):
+        members = [name for name, in_subset in self.subsets.items() if in_subset(data)]
+        for name in members:
+            self.total_times[name] += data.get("time", 0)
+
+        stats = data.get("stats", [])
+        cnf_time = data.get("time", 0)
+        if cnf_time == 0 or not members:
+            return
+
+        for stat in stats:
+            function_name = stat["symbol"]
+            self_pct = (
+                stat["norm_self_pct"] if self.normalize else (stat["self_pct"] / 100.0)
+            )
+            function_time = self_pct * cnf_time
+
+            for name in members:
+                times = self.function_times[name]
+                times[function_name] = times.get(function_name, 0) + function_time
+
+    def results(self, names, get_category):
+        """
+        Returns a `PerfParser._aggregate_cnf_stats` result per name.
+        """
+        results = {}
+        for name in names:
+            total_time = self.total_times[name]
+            assert total_time > 0, "Total time should be greater than 0"
+
+            function_stats = {}
+            for function_name, function_time in self.function_times[name].items():
+                function_stats[function_name] = {
+                    "time": function_time,
+                    "pct": function_time / total_time,
+                    "category": get_category(function_name),
+                }
+            results[name] = dict(
+                sorted(
+                    function_stats.items(),
+                    key=lambda item: item[1]["time"],
+                    reverse=True,
+                )
+            )
+
+        return results
+
+
+# set once per pool worker so the parser (and its function map) is pickled
+# once per process rather than once per CNF
+_worker_parser = None
+
+
+def _init_worker(parser):
+    global _worker_parser
+    _worker_parser = parser
+
+
+def _build_cnf_entry_in_worker(cnf):
+    entry = _worker_parser._build_cnf_entry(cnf)
+    # the report's timings go back with it to the parent's Instrumentation
+    return entry, _worker_parser.instrumentation.pop_reports()
+
+
+MAIN_LINE_PATTERN = re.compile(
+    r"^\s*(?P<children_pct>\d+\.\d+)%"
+    r"\s+(?P<self_pct>\d+\.\d+)%"
+    r"\s+(?P<command>\S+)"
+    r"\s+(?P<sharedobject>\S+)"
+    r"\s+\[\.\]\s+(?P<symbol>\S+)$"
+)
+MAIN_LINE_BYTES_PATTERN = re.compile(MAIN_LINE_PATTERN.pattern.encode())
+READ_CHUNK_SIZE = 1 << 20
+
+
+def match_main_line(line):
+    match = MAIN_LINE_PATTERN.match(line)
     if match:
         res = match.groupdict()
         res["children_pct"] = float(res["children_pct"])
@@ -336,19 +1180,242 @@ def match_main_line(line):
         return None
 
 
+def keep_symbol(symbol):
+    """
+    Drops runtime/library frames (versioned, mangled, C++ qualified, private
+    and unresolved addresses) so only the compiler's own functions remain.
+    """
+    return (
+        "@" not in symbol
+        and "__" not in symbol
+        and "::" not in symbol
+        and not symbol.startswith("_")
+        and not symbol.startswith("0x")
+    )
+
+
+def iter_report_lines(perf_report, chunk_size=READ_CHUNK_SIZE, counts=None):
+    """
+    Yields the raw lines (bytes, without the newline) of a perf report,
+    reading it in fixed-size chunks so a report is never held in memory.
+    `counts`, if given, is a {"bytes", "lines"} dict the read is added to.
+    """
+    remainder = b""
+    with open(perf_report, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            lines = (remainder + chunk).split(b"\n")
+            remainder = lines.pop()
+            if counts is not None:
+                counts["bytes"] += len(chunk)
+                counts["lines"] += len(lines)
+            yield from lines
+    if remainder:
+        if counts is not None:
+            counts["lines"] += 1
+        yield remainder
+
+
+def stream_main_lines(
+    perf_report, sharedobject, chunk_size=READ_CHUNK_SIZE, counts=None
+):
+    """
+    Streaming equivalent of filtering `match_main_line` over every line of a
+    report. Call-graph, folded-stack, header and blank lines are rejected by a
+    prefix check before the regex runs, and the sharedobject/symbol filters
+    are applied in the same pass.
+    """
+    sharedobject_token = f" {sharedobject} ".encode()
+    for line in iter_report_lines(perf_report, chunk_size, counts):
+        # main lines are the only ones that start with a percentage and name
+        # a user-space symbol
+        stripped = line.lstrip()
+        if not stripped[:1].isdigit():
+            continue
+        if b"[.]" not in line or sharedobject_token not in line:
+            continue
+
+        match = MAIN_LINE_BYTES_PATTERN.match(line.rstrip(b"\r"))
+        if match is None:
+            continue
+        if match["sharedobject"].decode() != sharedobject:
+            continue
+        symbol = match["symbol"].decode()
+        if not keep_symbol(symbol):
+            continue
+
+        yield {
+            "children_pct": float(match["children_pct"]),
+            "self_pct": float(match["self_pct"]),
+            "command": match["command"].decode(),
+            "sharedobject": sharedobject,
+            "symbol": symbol,
+        }
+
+
+FOLDED_STACK_PATTERN = re.compile(
+    rb"^[\s|]*(?:--(?P<pct>\d+\.\d+)%--|---)(?P<stack>\S.*)$"
+)
+
+
+def stream_folded_stacks(perf_report, sharedobject, chunk_size=READ_CHUNK_SIZE):
+    """
+    Streams a `--call-graph=folded` report and yields (entry, stacks) for
+    every main line kept by the `stream_main_lines` filters. `stacks` holds
+    the (root-first frames, pct) contexts of the entry's self samples, taken
+    from its folded lines whose leaf is the entry itself (see
+    `_self_contexts`), so their pcts add up to the entry's self_pct.
+    """
+    sharedobject_token = f" {sharedobject} ".encode()
+    entry = None
+    stacks = []
+    for line in iter_report_lines(perf_report, chunk_size):
+        line = line.rstrip(b"\r")
+        stripped = line.lstrip()
+        if stripped[:1].isdigit():
+            if entry is not None:
+                yield entry, _self_contexts(entry, stacks)
+            entry = None
+            stacks = []
+            if b"[.]" not in line or sharedobject_token not in line:
+                continue
+            match = MAIN_LINE_BYTES_PATTERN.match(line)
+            if match is None or match["sharedobject"].decode() != sharedobject:
+                continue
+            symbol = match["symbol"].decode()
+            if not keep_symbol(symbol):
+                continue
+            entry = {
+                "children_pct": float(match["children_pct"]),
+                "self_pct": float(match["self_pct"]),
+                "command": match["command"].decode(),
+                "sharedobject": sharedobject,
+                "symbol": symbol,
+            }
+            continue
+
+        if entry is None or stripped[:1] not in (b"|", b"-"):
+            continue
+        match = FOLDED_STACK_PATTERN.match(line)
+        if match is None:
+            continue
+        frames = match["stack"].decode(errors="replace").split(";")
+        if frames[-1] != entry["symbol"]:
+            continue
+        # a folded line without a percentage covers the whole entry
+        pct = float(match["pct"]) if match["pct"] else entry["children_pct"]
+        stacks.append((frames, pct))
+
+    if entry is not None:
+        yield entry, _self_contexts(entry, stacks)
+
+
+def _self_contexts(entry, stacks):
+    """
+    Under a `--children` entry the folded chains all end at the entry and add
+    up to its children_pct, so they also cover the samples of its callees.
+    Only the entry's self_pct belongs to those leaf contexts: the chains split
+    it in proportion to their pcts (relative to their own sum, which stays
+    right when perf's call-graph cutoff dropped small chains). An entry
+    without chains keeps its self_pct as a context of its own.
+    """
+    total_pct = sum(pct for _, pct in stacks)
+    if total_pct <= 0:
+        if entry["self_pct"] <= 0:
+            return []
+        return [([entry["symbol"]], entry["self_pct"])]
+    scale = entry["self_pct"] / total_pct
+    return [(frames, pct * scale) for frames, pct in stacks]
+
+
+# "# Samples: 12K of event 'cycles:u'" (counts abbreviated with K/M/G/T)
+HEADER_SAMPLES_PATTERN = re.compile(
+    rb"^#\s*Samples:\s*(?P<count>\d+(?:\.\d+)?)(?P<unit>[KMGT]?)"
+    rb"\s+of event\s+'(?P<event>[^']*)'"
+)
+HEADER_EVENT_COUNT_PATTERN = re.compile(rb"^#\s*Event count \(approx\.\):\s*(\d+)")
+HEADER_LOST_PATTERN = re.compile(rb"^#\s*Total Lost Samples:\s*(\d+)")
+SAMPLE_COUNT_UNITS = {b"": 1, b"K": 10**3, b"M": 10**6, b"G": 10**9, b"T": 10**12}
+
+
+def read_report_metadata(perf_report):
+    """
+    Header metadata of a perf report: {samples, event, event_count,
+    lost_samples}, None where the header lacks a field. Text reports are
+    read only up to their first row; with several events, the first event's
+    header is kept. `samples` is as precise as perf's abbreviation (12K).
+    """
+    if is_sample_file(perf_report):
+        return SampleProfile.read_metadata(perf_report)
+
+    metadata = {
+        "samples": None,
+        "event": None,
+        "event_count": None,
+        "lost_samples": None,
+    }
+    for line in iter_report_lines(perf_report):
+        if not line.startswith(b"#"):
+            if line.strip():
+                break
+            continue
+        if metadata["samples"] is None:
+            match = HEADER_SAMPLES_PATTERN.match(line)
+            if match:
+                count = float(match["count"]) * SAMPLE_COUNT_UNITS[match["unit"]]
+                metadata["samples"] = int(count)
+                metadata["event"] = match["event"].decode()
+                continue
+        if metadata["event_count"] is None:
+            match = HEADER_EVENT_COUNT_PATTERN.match(line)
+            if match:
+                metadata["event_count"] = int(match[1])
+                continue
+        if metadata["lost_samples"] is None:
+            match = HEADER_LOST_PATTERN.match(line)
+            if match:
+                metadata["lost_samples"] = int(match[1])
+    return metadata
+
+
+def is_sample_file(perf_report):
+    return str(perf_report).endswith(SAMPLES_SUFFIX)
+
+
+def stream_report_rows(perf_report, sharedobject, counts=None):
+    """
+    `stream_main_lines` for a text report, or the kept rows of a sample file
+    written by `SampleProfile.save`. `counts` is as in `iter_report_lines`;
+    sample files only add their size.
+    """
+    if not is_sample_file(perf_report):
+        yield from stream_main_lines(perf_report, sharedobject, counts=counts)
+        return
+    if counts is not None:
+        counts["bytes"] += Path(perf_report).stat().st_size
+    for row in SampleProfile.load(perf_report).rows(sharedobject):
+        if keep_symbol(row["symbol"]):
+            yield row
+
+
+def stream_report_stacks(perf_report, sharedobject):
+    """
+    `stream_folded_stacks` for a text report or a sample file.
+    """
+    if not is_sample_file(perf_report):
+        yield from stream_folded_stacks(perf_report, sharedobject)
+        return
+    for row, stacks in SampleProfile.load(perf_report).folded_stacks(sharedobject):
+        if keep_symbol(row["symbol"]):
+            yield row, stacks
+
+
 def get_total_self_pct(fn_pcts):
     return sum([pct["self_pct"] for pct in fn_pcts])
 
 
-def get_cnf_runtime(cnf_name):
+def get_cnf_runtime(cnf_name, stdout_dir="stdout/valid"):
     TIMEOUT = 3600
-    log_path = Path(f"./stdout/valid/{cnf_name}.log")
-    if not log_path.exists():
-        return None
-
-    with open(log_path, "r") as f:
-        for line in f:
-            if line.startswith("Total Time:"):
-                time_str = line.split(":")[1].strip().rstrip("s")
-                return float(time_str)
-    return TIMEOUT
+    return RunManifest(stdout_dir).runtime(cnf_name, timeout=TIMEOUT)
@@ -0,0 +1,132 @@
+import numpy as np
+
+# width (seconds) of the fine buckets each run is counted into
+PHASE_RESOLUTION = 1.0
+NUM_PHASE_BUCKETS = 20
+
+
+class PhaseTimeline:
+    """
+    Streaming category timeline of one run. Sample periods are added into
+    fixed-width time buckets (relative to the first sample) per category,
+    so memory grows with run length / resolution, not with sample count.
+
+    Fields:
+    - categories: interned category names, the columns of `counts`
+    - counts: (time bucket, category) -> summed sample period
+    - start / end: first and last sample timestamps
+    """
+
+    def __init__(self, resolution=PHASE_RESOLUTION):
+        self.resolution = resolution
+        self.categories = []
+        self.category_ids = {}
+        self.counts = np.zeros((0, 0))
+        self.start = None
+        self.end = None
+
+    @property
+    def duration(self):
+        if self.start is None:
+            return 0.0
+        return self.end - self.start
+
+    def category_id(self, category):
+        category_id = self.category_ids.get(category)
+        if category_id is None:
+            category_id = self.category_ids[category] = len(self.categories)
+            self.categories.append(category)
+        return category_id
+
+    def add(self, times, periods, category_ids):
+        """
+        Adds one chunk of samples; `category_ids` come from `category_id`,
+        and samples with a negative id are skipped.
+        """
+        if len(times) == 0:
+            return
+        if self.start is None:
+            self.start = float(times.min())
+            self.end = self.start
+        self.end = max(self.end, float(times.max()))
+
+        keep = category_ids >= 0
+        # perf script is only roughly time-ordered across CPUs
+        buckets = np.maximum((times[keep] - self.start) // self.resolution, 0)
+        buckets = buckets.astype(np.int64)
+        category_ids = category_ids[keep]
+        if len(buckets) == 0:
+            return
+
+        num_buckets = max(len(self.counts), int(buckets.max()) + 1)
+        num_categories = len(self.categories)
+        if self.counts.shape != (num_buckets, num_categories):
+            counts = np.zeros((num_buckets, num_categories))
+            counts[: self.counts.shape[0], : self.counts.shape[1]] = self.counts
+            self.counts = counts
+
+        flat = np.bincount(
+            buckets * num_categories + category_ids,
+            weights=periods[keep],
+            minlength=num_buckets * num_categories,
+        )
+        self.counts += flat.reshape(num_buckets, num_categories)
+
+    def normalized(self, num_buckets=NUM_PHASE_BUCKETS):
+        """
+        Rebins the run onto `num_buckets` equal fractions of its duration.
+        Returns (category, share) columns as a {category: array} dict, where
+        each bucket's shares sum to 1 (or 0 for buckets without samples).
+        """
+        if len(self.counts) == 0:
+            return {}
+        duration = max(self.duration, self.resolution)
+        centers = (np.arange(len(self.counts)) + 0.5) * self.resolution
+        targets = np.minimum(
+            (centers / duration * num_buckets).astype(int), num_buckets - 1
+        )
+
+        rebinned = np.zeros((num_buckets, len(self.categories)))
+        np.add.at(rebinned, targets, self.counts)
+        totals = rebinned.sum(axis=1, keepdims=True)
+        shares = np.divide(
+            rebinned, totals, out=np.zeros_like(rebinned), where=totals > 0
+        )
+        return dict(zip(self.categories, shares.T))
+
+
+def aggregate_timelines(timelines, num_buckets=NUM_PHASE_BUCKETS):
+    """
+    Averages the normalized category shares of several runs bucket by
+    bucket, each run weighted equally over the buckets it has samples in.
+
+    Returns {
+        "num_cnfs": runs with samples,
+        "bucket_edges": fractions of run time bounding each bucket,
+        "shares": {category: [mean share per bucket]},
+    }
+    """
+    totals = {}
+    covered = np.zeros(num_buckets)
+    num_cnfs = 0
+    for timeline in timelines:
+        shares = timeline.normalized(num_buckets)
+        if not shares:
+            continue
+        num_cnfs += 1
+        covered += sum(shares.values()) > 0
+        for category, share in shares.items():
+            totals[category] = totals.get(category, 0) + share
+
+    means = {
+        category: np.divide(
+            total, covered, out=np.zeros(num_buckets), where=covered > 0
+        )
+        for category, total in totals.items()
+    }
+    ordered = sorted(means.items(), key=lambda item: item[1].sum(), reverse=True)
+    return {
+        "num_cnfs": num_cnfs,
+        "bucket_edges": np.linspace(0, 1, num_buckets + 1).tolist(),
+        "shares": {category: share.tolist() for category, share in ordered},
+    }
@@ -0,0 +1,185 @@
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from queue import Queue
+
+
+def log(msg):
+    timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
+    print(f"{timestamp} {msg}", flush=True)
+
+
+class ProfilingSweep:
+    """
+    Runs profiling jobs concurrently with per-job isolation and CPU pinning,
+    tracking progress in a resumable JSON state file.
+
+    Each job gets its own scratch directory (for `perf record -o`, TMPDIR and
+    any compiler output) and a disjoint set of cores. `reserve_cores` cores
+    are left unassigned to limit interference from the rest of the system.
+
+    State File Fields (per job name):
+    - status: running, done, timeout or failed
+    - returncode
+    - started / finished: timestamps
+    - wall_seconds: measured job duration
+    - predicted_seconds: cost-model prediction, when the sweep was ordered
+    """
+
+    DONE = "done"
+    TIMEOUT = "timeout"
+    FAILED = "failed"
+    RUNNING = "running"
+    FINISHED_STATUSES = {DONE, TIMEOUT}
+
+    def __init__(
+        self,
+        state_path="sweep_state.json",
+        jobs=1,
+        cores_per_job=1,
+        reserve_cores=0,
+        work_dir=None,
+        retry_failed=False,
+    ):
+        self.state_path = Path(state_path)
+        self.jobs = jobs
+        self.work_dir = work_dir
+        if work_dir is not None:
+            Path(work_dir).mkdir(parents=True, exist_ok=True)
+        self.retry_failed = retry_failed
+
+        self.state = self._load_state()
+        self._lock = threading.Lock()
+
+        self.core_sets = self._partition_cores(jobs, cores_per_job, reserve_cores)
+
+    def is_finished(self, name):
+        status = self.state.get(name, {}).get("status")
+        if status in ProfilingSweep.FINISHED_STATUSES:
+            return True
+        return status == ProfilingSweep.FAILED and not self.retry_failed
+
+    def mark(self, name, **fields):
+        with self._lock:
+            self.state.setdefault(name, {}).update(fields)
+            self._save_state()
+
+    def run(self, tasks, predictions=None):
+        """
+        tasks: list of (name, fn), run in order; fn(job) runs one profiling
+        job and returns a status (DONE, TIMEOUT or FAILED) plus an optional
+        returncode. `job` holds the job's `work_dir` and pinned `cores`.
+        predictions: optional {name: predicted seconds}, logged and stored
+        next to the measured wall time so the cost model can be checked.
+
+        Jobs already finished in the state file are skipped; jobs left
+        "running" by an interrupted sweep are run again.
+        """
+        pending = [(name, fn) for name, fn in tasks if not self.is_finished(name)]
+        skipped = len(tasks) - len(pending)
+        if skipped:
+            log(f"⏭️ Skipping {skipped} jobs already finished in {self.state_path}")
+
+        core_pool = Queue()
+        for cores in self.core_sets:
+            core_pool.put(cores)
+
+        def run_task(name, fn):
+            cores = core_pool.get()
+            predicted = None if predictions is None else predictions.get(name)
+            try:
+                self.mark(
+                    name,
+                    status=ProfilingSweep.RUNNING,
+                    started=_now(),
+                    predicted_seconds=predicted,
+                )
+                start = time.monotonic()
+                with tempfile.TemporaryDirectory(
+                    prefix=f"perf-{name}-", dir=self.work_dir
+                ) as work_dir:
+                    job = {"name": name, "work_dir": Path(work_dir), "cores": cores}
+                    try:
+                        status, returncode = fn(job)
+                    except Exception as e:
+                        log(f"❌ {name}: {e}")
+                        status, returncode = ProfilingSweep.FAILED, None
+                wall_seconds = time.monotonic() - start
+                self.mark(
+                    name,
+                    status=status,
+                    returncode=returncode,
+                    finished=_now(),
+                    wall_seconds=wall_seconds,
+                )
+                if predicted is not None:
+                    log(
+                        f"⏲️ {name}: predicted {predicted:.1f}s, "
+                        f"actual {wall_seconds:.1f}s ({status})"
+                    )
+            finally:
+                core_pool.put(cores)
+
+        with ThreadPoolExecutor(max_workers=len(self.core_sets)) as executor:
+            futures = [executor.submit(run_task, name, fn) for name, fn in pending]
+            for future in futures:
+                future.result()
+
+    def run_command(self, cmd, job, **kwargs):
+        """
+        subprocess.run pinned to the job's cores (via taskset), with TMPDIR
+        pointing at the job's scratch directory.
+        """
+        env = dict(kwargs.pop("env", os.environ))
+        env["TMPDIR"] = str(job["work_dir"])
+        cores = job["cores"]
+        if cores is not None:
+            # taskset (rather than a preexec_fn, which is unsafe with threads)
+            # pins the shell, perf and the profiled compiler it spawns
+            cpu_list = ",".join(str(core) for core in sorted(cores))
+            if kwargs.pop("shell", False):
+                cmd = ["taskset", "-c", cpu_list, "/bin/sh", "-c", cmd]
+            else:
+                cmd = ["taskset", "-c", cpu_list, *cmd]
+        return subprocess.run(cmd, env=env, **kwargs)
+
+    def _partition_cores(self, jobs, cores_per_job, reserve_cores):
+        if jobs <= 1 and reserve_cores == 0:
+            # serial sweep: leave scheduling to the OS, as before
+            return [None]
+
+        available = sorted(os.sched_getaffinity(0))
+        usable = available[reserve_cores:]
+        if len(usable) < jobs * cores_per_job:
+            raise ValueError(
+                f"{jobs} jobs x {cores_per_job} cores need {jobs * cores_per_job} "
+                f"cores, but only {len(usable)} of {len(available)} are usable "
+                f"with {reserve_cores} reserved"
+            )
+        return [
+            set(usable[i * cores_per_job : (i + 1) * cores_per_job])
+            for i in range(jobs)
+        ]
+
+    def _load_state(self):
+        if not self.state_path.exists():
+            return {}
+        with open(self.state_path, "r") as f:
+            return json.load(f)
+
+    def _save_state(self):
+        # write-then-rename so an interrupted sweep never leaves a torn file
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=4)
+        os.replace(tmp_path, self.state_path)
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
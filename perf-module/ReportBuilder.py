@@ -0,0 +1,81 @@
+from pathlib import Path
+from PerfParser import PerfParser, StatMode
+from PerfTableGenerator import function_table_latex, category_table_latex
+
+# subset -> (aggregate mode, category mode), in notebook order
+REPORT_SUBSETS = {
+    "all": (StatMode.AGGREGATE_STATS, StatMode.CATEGORY_STATS),
+    "completed": (
+        StatMode.AGGREGATE_COMPLETED_STATS,
+        StatMode.CATEGORY_COMPLETED_STATS,
+    ),
+    "timed_out": (
+        StatMode.AGGREGATE_TIMED_OUT_STATS,
+        StatMode.CATEGORY_TIMED_OUT_STATS,
+    ),
+}
+
+
+class ReportBuilder:
+    """
+    Builds every LaTeX table of the notebooks (function and category tables
+    for all/completed/timed-out CNFs) straight from a live PerfParser,
+    columnar or not, instead of writing the stats to JSON and reloading them
+    in a PerfTableGenerator per subset.
+
+    The three aggregates come from one fused pass over the rows (see
+    `PerfParser.compute`), and the tables are rendered from them with the
+    same DataFrame code as PerfTableGenerator.
+    """
+
+    def __init__(self, perf_parser: PerfParser):
+        self.perf_parser = perf_parser
+
+    def build(self, subsets=None):
+        """
+        Returns {subset: {"function": latex, "category": latex}}.
+        """
+        subsets = list(REPORT_SUBSETS) if subsets is None else subsets
+        for subset in subsets:
+            if subset not in REPORT_SUBSETS:
+                raise ValueError(f"Invalid subset: {subset}")
+
+        modes = [mode for subset in subsets for mode in REPORT_SUBSETS[subset]]
+        self.perf_parser.compute(*modes)
+
+        tables = {}
+        for subset in subsets:
+            aggregate_mode, category_mode = REPORT_SUBSETS[subset]
+            tables[subset] = {
+                "function": function_table_latex(
+                    self.perf_parser.get_stats(aggregate_mode)
+                ),
+                "category": category_table_latex(
+                    _json_keys(self.perf_parser.get_stats(category_mode))
+                ),
+            }
+        return tables
+
+    def write(self, output_dir, subsets=None):
+        """
+        Writes `<output_dir>/<subset>_<function|category>_table.tex` and
+        returns the written paths.
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for subset, tables in self.build(subsets).items():
+            for kind, latex in tables.items():
+                path = output_dir / f"{subset}_{kind}_table.tex"
+                with open(path, "w") as f:
+                    f.write(latex)
+                paths.append(path)
+        return paths
+
+
+def _json_keys(stats):
+    """
+    Keys the uncategorized entry "null", as in the JSON stats files the
+    notebooks load into a PerfTableGenerator.
+    """
+    return {"null" if key is None else key: value for key, value in stats.items()}
@@ -0,0 +1,267 @@
+import json
+import os
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+LOG_SUFFIX = ".log"
+MANIFEST_NAME = ".manifest.sqlite"
+# subdirectories the Preprocessors sort logs into
+LOCATIONS = ["", "valid", "invalid"]
+
+VALID_KEYWORD = b"Compiling..."
+TOTAL_TIME_PREFIX = b"Total Time:"
+# "<Phase> Time: 1.23s" / "<phase> time 1.23" lines other than Total Time
+PHASE_TIME_PATTERN = re.compile(
+    rb"^\s*(?P<phase>[A-Za-z][\w ./-]*?)\s+[Tt]ime\s*:?\s*"
+    rb"(?P<seconds>\d+(?:\.\d*)?)\s*s?\s*$"
+)
+
+
+class RunManifest:
+    """
+    Index of the compiler stdout logs under one stdout directory, so each
+    log is read once rather than by every consumer.
+
+    `stdout_dir` is the directory the profiling scripts write to, or its
+    valid/ or invalid/ subdirectory; logs are indexed across all three, and
+    lookups by CNF default to the directory given. The
+    index is kept in `<stdout root>/.manifest.sqlite` and refreshed
+    incrementally: only logs whose size or mtime changed are rescanned, and
+    logs moved between subdirectories (same size and mtime) just change
+    location.
+
+    Entry fields:
+    - location: "", "valid" or "invalid"
+    - valid: whether the log reached compilation ("Compiling...")
+    - completed: whether the log reports a Total Time
+    - runtime: the Total Time in seconds, None for timed-out runs
+    - phases: {phase: seconds} of the other "<Phase> Time:" lines
+    """
+
+    TIMEOUT = 3600
+
+    def __init__(self, stdout_dir, manifest_path=None, jobs=1):
+        stdout_dir = Path(stdout_dir)
+        self.location = ""
+        if stdout_dir.name in LOCATIONS[1:]:
+            self.location = stdout_dir.name
+            stdout_dir = stdout_dir.parent
+        self.root = stdout_dir
+        self.manifest_path = (
+            Path(manifest_path) if manifest_path else self.root / MANIFEST_NAME
+        )
+        self.jobs = jobs
+
+        self.conn = None
+        self.entries = None
+        self.scanned = 0
+
+    def __getstate__(self):
+        # pool workers get the loaded entries, not the sqlite connection
+        state = self.__dict__.copy()
+        state["conn"] = None
+        return state
+
+    def refresh(self):
+        """
+        Rescans new and changed logs and drops entries of deleted ones.
+        """
+        logs = self._list_logs()
+        self._connect()
+        if self.conn is not None:
+            self.entries = self._load_entries()
+        else:
+            self.entries = {}
+
+        stale = [
+            name
+            for name, (location, size, mtime_ns) in logs.items()
+            if name not in self.entries
+            or (self.entries[name]["size"], self.entries[name]["mtime_ns"])
+            != (size, mtime_ns)
+        ]
+        paths = [self._log_path(logs[name][0], name) for name in stale]
+        if self.jobs > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                scans = list(executor.map(scan_log, paths, chunksize=16))
+        else:
+            scans = [scan_log(path) for path in paths]
+        self.scanned = len(scans)
+
+        changed = set(stale)
+        removed = []
+        for name, scan in zip(stale, scans):
+            self.entries[name] = scan
+        for name in list(self.entries):
+            if name not in logs:
+                del self.entries[name]
+                removed.append(name)
+                continue
+            location, size, mtime_ns = logs[name]
+            if name not in changed and self.entries[name]["location"] != location:
+                changed.add(name)
+            self.entries[name].update(location=location, size=size, mtime_ns=mtime_ns)
+
+        self._save_entries(changed, removed)
+        return self
+
+    def get(self, log_name):
+        """
+        Returns the entry of one log file (e.g. "a.cnf.log"), or None.
+        """
+        if self.entries is None:
+            self.refresh()
+        return self.entries.get(log_name)
+
+    def get_cnf(self, cnf_name, location=None):
+        """
+        Returns the entry of a CNF's log in `location` (by default the
+        directory the manifest was opened on), or None when it has none.
+        """
+        if location is None:
+            location = self.location
+        entry = self.get(f"{cnf_name}{LOG_SUFFIX}")
+        if entry is None or entry["location"] != location:
+            return None
+        return entry
+
+    def iter_entries(self, location=None):
+        """
+        Yields (log name, entry), in sorted name order.
+        """
+        if self.entries is None:
+            self.refresh()
+        for name in sorted(self.entries):
+            entry = self.entries[name]
+            if location is None or entry["location"] == location:
+                yield name, entry
+
+    def runtime(self, cnf_name, location=None, timeout=TIMEOUT):
+        """
+        Total Time of a CNF's run; `timeout` when it timed out and None when
+        there is no log.
+        """
+        entry = self.get_cnf(cnf_name, location)
+        if entry is None:
+            return None
+        return entry["runtime"] if entry["completed"] else timeout
+
+    def timed_out(self, cnf_name, location=None):
+        entry = self.get_cnf(cnf_name, location)
+        return entry is not None and not entry["completed"]
+
+    def _list_logs(self):
+        logs = {}
+        for location in LOCATIONS:
+            directory = self.root / location
+            if not directory.is_dir():
+                continue
+            with os.scandir(directory) as it:
+                for dir_entry in it:
+                    if not dir_entry.name.endswith(LOG_SUFFIX):
+                        continue
+                    if not dir_entry.is_file():
+                        continue
+                    st = dir_entry.stat()
+                    # a log in several places is indexed where it was last seen
+                    logs[dir_entry.name] = (location, st.st_size, st.st_mtime_ns)
+        return logs
+
+    def _log_path(self, location, name):
+        return str(self.root / location / name)
+
+    def _connect(self):
+        if self.conn is not None or not self.manifest_path.parent.is_dir():
+            return
+        self.conn = sqlite3.connect(self.manifest_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS logs (
+                name TEXT PRIMARY KEY,
+                location TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                valid INTEGER NOT NULL,
+                completed INTEGER NOT NULL,
+                runtime REAL,
+                phases TEXT NOT NULL
+            )
+            """)
+        self.conn.commit()
+
+    def _load_entries(self):
+        entries = {}
+        for row in self.conn.execute("SELECT * FROM logs"):
+            name, location, size, mtime_ns, valid, completed, runtime, phases = row
+            entries[name] = {
+                "location": location,
+                "size": size,
+                "mtime_ns": mtime_ns,
+                "valid": bool(valid),
+                "completed": bool(completed),
+                "runtime": runtime,
+                "phases": json.loads(phases),
+            }
+        return entries
+
+    def _save_entries(self, changed, removed):
+        """
+        Writes the rows of the `changed` entries and deletes the `removed`
+        ones; an unchanged manifest is not written.
+        """
+        if self.conn is None or not (changed or removed):
+            return
+        self.conn.executemany(
+            "DELETE FROM logs WHERE name = ?", [(name,) for name in removed]
+        )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [self._row(name, self.entries[name]) for name in sorted(changed)],
+        )
+        self.conn.commit()
+
+    def _row(self, name, entry):
+        return (
+            name,
+            entry["location"],
+            entry["size"],
+            entry["mtime_ns"],
+            int(entry["valid"]),
+            int(entry["completed"]),
+            entry["runtime"],
+            json.dumps(entry["phases"]),
+        )
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def scan_log(log_path):
+    """
+    Streams one stdout log once, collecting every manifest field but its
+    location, size and mtime.
+    """
+    valid = False
+    runtime = None
+    phases = {}
+    with open(log_path, "rb") as f:
+        for line in f:
+            if not valid and VALID_KEYWORD in line:
+                valid = True
+            if line.startswith(TOTAL_TIME_PREFIX):
+                if runtime is None:
+                    runtime = float(line.split(b":")[1].strip().rstrip(b"s"))
+                continue
+            match = PHASE_TIME_PATTERN.match(line)
+            if match:
+                phase = match["phase"].decode(errors="replace").strip()
+                phases.setdefault(phase, float(match["seconds"]))
+    return {
+        "valid": valid,
+        "completed": runtime is not None,
+        "runtime": runtime,
+        "phases": phases,
+    }
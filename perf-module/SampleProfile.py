@@ -0,0 +1,366 @@
+import os
+import shutil
+import subprocess
+from array import array
+from pathlib import Path
+import numpy as np
+
+# fields requested from `perf script`; the parser relies on this layout
+PERF_SCRIPT_FIELDS = "comm,tid,time,period,event,ip,sym,dso"
+SAMPLES_SUFFIX = ".samples.npz"
+SAMPLE_CHUNK_SIZE = 1 << 18
+
+
+class Demangler:
+    """
+    Demangles C++ symbols with a per-symbol cache. Uses the `cxxfilt` module
+    when installed, otherwise one batched `c++filt` call per `demangle_all`;
+    without either, names are kept as they are.
+    """
+
+    def __init__(self):
+        self.cache = {}
+        try:
+            import cxxfilt
+
+            self._cxxfilt = cxxfilt
+        except ImportError:
+            self._cxxfilt = None
+        self._cxxfilt_path = shutil.which("c++filt")
+
+    def demangle_all(self, symbols):
+        missing = [s for s in dict.fromkeys(symbols) if s not in self.cache]
+        mangled = [s for s in missing if s.startswith("_Z")]
+        for symbol in missing:
+            self.cache[symbol] = symbol
+
+        if mangled and self._cxxfilt is not None:
+            for symbol in mangled:
+                try:
+                    self.cache[symbol] = self._cxxfilt.demangle(symbol)
+                except self._cxxfilt.InvalidName:
+                    pass
+        elif mangled and self._cxxfilt_path is not None:
+            result = subprocess.run(
+                [self._cxxfilt_path],
+                input="\n".join(mangled) + "\n",
+                capture_output=True,
+                text=True,
+            )
+            demangled = result.stdout.split("\n")
+            if result.returncode == 0 and len(demangled) > len(mangled):
+                self.cache.update(zip(mangled, demangled))
+
+        return [self.cache[s] for s in symbols]
+
+
+class SampleProfile:
+    """
+    Raw perf samples of one run in compact columnar form, built from
+    `perf script` output and stored as a compressed .npz.
+
+    Arrays:
+    - symbols / dsos / commands: interned names (dsos are basenames, as in
+      `perf report`'s Shared Object column)
+    - frame_symbols / frame_dsos: (symbol, dso) of every interned frame
+    - stack_offsets / stack_frames: CSR of interned stacks, root-first frame
+      ids; stack i is stack_frames[stack_offsets[i] : stack_offsets[i + 1]]
+    - sample_times: perf timestamps in seconds
+    - sample_periods: sample weights (event counts)
+    - sample_stacks / sample_commands: per-sample stack and command ids
+    """
+
+    ARRAYS = [
+        "symbols",
+        "dsos",
+        "commands",
+        "frame_symbols",
+        "frame_dsos",
+        "stack_offsets",
+        "stack_frames",
+        "sample_times",
+        "sample_periods",
+        "sample_stacks",
+        "sample_commands",
+    ]
+
+    def __init__(self, event=None, **arrays):
+        self.event = event
+        for name in SampleProfile.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @property
+    def num_samples(self):
+        return len(self.sample_times)
+
+    @property
+    def num_stacks(self):
+        return len(self.stack_offsets) - 1
+
+    @classmethod
+    def from_perf_script(cls, lines, demangler=None):
+        """
+        Parses `perf script -F PERF_SCRIPT_FIELDS` output (str lines) in one
+        streaming pass, interning frames, stacks and commands as it goes.
+        """
+        symbol_ids, dso_ids, command_ids, frame_ids, stack_ids = {}, {}, {}, {}, {}
+        frame_symbols, frame_dsos = array("i"), array("i")
+        stack_offsets, stack_frames = array("q", [0]), array("i")
+        times, periods = array("d"), array("q")
+        sample_stacks, sample_commands = array("i"), array("i")
+        event = None
+
+        def intern(table, key):
+            index = table.get(key)
+            if index is None:
+                index = table[key] = len(table)
+            return index
+
+        def add_sample(header, frames):
+            nonlocal event
+            fields = header.strip().rsplit(None, 4)
+            if len(fields) < 5:
+                return
+            command, _, time, period, sample_event = fields
+            event = event or sample_event.rstrip(":")
+
+            # perf script prints leaf-first; stacks are stored root-first
+            stack = tuple(frames[::-1])
+            stack_id = stack_ids.get(stack)
+            if stack_id is None:
+                stack_id = stack_ids[stack] = len(stack_ids)
+                stack_frames.extend(stack)
+                stack_offsets.append(len(stack_frames))
+
+            times.append(float(time.rstrip(":")))
+            periods.append(int(period))
+            sample_stacks.append(stack_id)
+            sample_commands.append(intern(command_ids, command))
+
+        header = None
+        frames = []
+        for line in lines:
+            line = line.rstrip("\n")
+            if not line.strip():
+                if header is not None:
+                    add_sample(header, frames)
+                header = None
+                frames = []
+            elif line[0] in " \t" and header is not None:
+                # "<ip> <sym> (<dso>)"
+                parts = line.strip().split(None, 1)
+                if len(parts) < 2:
+                    continue
+                symbol, _, dso = parts[1].rpartition(" (")
+                key = (symbol, os.path.basename(dso.rstrip(")")))
+                frame_id = frame_ids.get(key)
+                if frame_id is None:
+                    frame_id = frame_ids[key] = len(frame_ids)
+                    frame_symbols.append(intern(symbol_ids, key[0]))
+                    frame_dsos.append(intern(dso_ids, key[1]))
+                frames.append(frame_id)
+            else:
+                if header is not None:
+                    add_sample(header, frames)
+                header = line
+                frames = []
+        if header is not None:
+            add_sample(header, frames)
+
+        demangler = demangler or Demangler()
+        symbols = demangler.demangle_all(list(symbol_ids))
+        return cls(
+            event=event,
+            symbols=np.array(symbols, dtype=str),
+            dsos=np.array(list(dso_ids), dtype=str),
+            commands=np.array(list(command_ids), dtype=str),
+            frame_symbols=np.frombuffer(frame_symbols, dtype=np.int32),
+            frame_dsos=np.frombuffer(frame_dsos, dtype=np.int32),
+            stack_offsets=np.frombuffer(stack_offsets, dtype=np.int64),
+            stack_frames=np.frombuffer(stack_frames, dtype=np.int32),
+            sample_times=np.frombuffer(times, dtype=np.float64),
+            sample_periods=np.frombuffer(periods, dtype=np.int64),
+            sample_stacks=np.frombuffer(sample_stacks, dtype=np.int32),
+            sample_commands=np.frombuffer(sample_commands, dtype=np.int32),
+        )
+
+    @classmethod
+    def from_perf_data(cls, perf_data, run=subprocess.run, demangler=None, **kw):
+        """
+        Runs `perf script` on a perf.data file (through `run`, e.g. a
+        ProfilingSweep's run_command) and parses its output, spooled to a
+        scratch file next to perf.data.
+        """
+        perf_data = Path(perf_data)
+        script_path = perf_data.with_name(perf_data.name + ".script")
+        with open(script_path, "w") as out_file:
+            run(
+                ["perf", "script", "-i", str(perf_data), "-F", PERF_SCRIPT_FIELDS],
+                stdout=out_file,
+                stderr=subprocess.DEVNULL,
+                **kw,
+            )
+        try:
+            with open(script_path, "r", errors="replace") as f:
+                return cls.from_perf_script(f, demangler)
+        finally:
+            script_path.unlink()
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            event=np.array(self.event or "", dtype=str),
+            **{name: getattr(self, name) for name in SampleProfile.ARRAYS},
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in SampleProfile.ARRAYS}
+            event = str(data["event"]) or None
+        return cls(event=event, **arrays)
+
+    @staticmethod
+    def read_metadata(path):
+        """
+        Report-header-style metadata of a saved sample file, reading only the
+        event name and sample periods. perf script does not report lost
+        samples, so lost_samples is None.
+        """
+        with np.load(path) as data:
+            periods = data["sample_periods"]
+            event = str(data["event"]) or None
+        return {
+            "samples": len(periods),
+            "event": event,
+            "event_count": int(periods.sum()),
+            "lost_samples": None,
+        }
+
+    def stack_leaves(self):
+        """
+        Leaf frame id of every stack (-1 for empty stacks).
+        """
+        lengths = np.diff(self.stack_offsets)
+        leaves = np.full(self.num_stacks, -1, dtype=np.int64)
+        nonempty = lengths > 0
+        leaves[nonempty] = self.stack_frames[self.stack_offsets[1:][nonempty] - 1]
+        return leaves
+
+    def iter_sample_chunks(self, chunk_size=SAMPLE_CHUNK_SIZE):
+        """
+        Yields (times, periods, leaf frame ids) for consecutive slices of
+        `chunk_size` samples.
+        """
+        leaves = self.stack_leaves()
+        for start in range(0, self.num_samples, chunk_size):
+            stop = start + chunk_size
+            yield (
+                self.sample_times[start:stop],
+                self.sample_periods[start:stop],
+                leaves[self.sample_stacks[start:stop]],
+            )
+
+    def rows(self, dso):
+        """
+        Returns `perf report --children`-style rows for the frames of `dso`,
+        one per (command, symbol), in descending children_pct order.
+        children_pct counts the samples whose stack contains the symbol (once
+        per sample) and self_pct those whose stack ends in it, both as a
+        percentage of every sample's period.
+        """
+        return [row for row, _ in self._iter_rows(dso, with_stacks=False)]
+
+    def folded_stacks(self, dso):
+        """
+        Yields (row, stacks) for every `rows(dso)` row, where `stacks` holds
+        the (root-first symbol names, pct) of the stacks ending in the row's
+        symbol, like `stream_folded_stacks` on a text report but without its
+        call-graph cutoff.
+        """
+        yield from self._iter_rows(dso, with_stacks=True)
+
+    def _iter_rows(self, dso, with_stacks):
+        total = self.sample_periods.sum()
+        dso_ids = np.flatnonzero(self.dsos == dso)
+        if total == 0 or len(dso_ids) == 0:
+            return
+        dso_id = dso_ids[0]
+        num_symbols = len(self.symbols)
+
+        # samples grouped by (stack, command)
+        keys = self.sample_stacks.astype(np.int64) * len(self.commands)
+        keys += self.sample_commands
+        keys, inverse = np.unique(keys, return_inverse=True)
+        weights = np.bincount(inverse, weights=self.sample_periods)
+        stacks = keys // len(self.commands)
+        commands = keys % len(self.commands)
+
+        # self: groups whose leaf frame belongs to dso
+        leaves = self.stack_leaves()[stacks]
+        is_self = leaves >= 0
+        is_self[is_self] = self.frame_dsos[leaves[is_self]] == dso_id
+        self_keys = commands * num_symbols
+        self_keys[is_self] += self.frame_symbols[leaves[is_self]]
+        self_keys[~is_self] = -1
+
+        # children: every dso symbol on a group's stack, once per group
+        starts = self.stack_offsets[stacks]
+        lengths = self.stack_offsets[stacks + 1] - starts
+        groups = np.repeat(np.arange(len(stacks)), lengths)
+        positions = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        frames = self.stack_frames[starts[groups] + positions]
+        in_dso = self.frame_dsos[frames] == dso_id
+        groups = groups[in_dso]
+        pairs = np.unique(groups * num_symbols + self.frame_symbols[frames[in_dso]])
+        pair_groups = pairs // num_symbols
+        pair_keys = commands[pair_groups] * num_symbols + pairs % num_symbols
+
+        row_keys, pair_rows = np.unique(pair_keys, return_inverse=True)
+        children = np.bincount(pair_rows, weights=weights[pair_groups])
+        self_weights = np.zeros(len(row_keys))
+        has_self = self_keys >= 0
+        np.add.at(
+            self_weights,
+            np.searchsorted(row_keys, self_keys[has_self]),
+            weights[has_self],
+        )
+
+        order = np.argsort(-children, kind="stable")
+        self_groups = {}
+        if with_stacks:
+            for group in np.flatnonzero(has_self).tolist():
+                self_groups.setdefault(int(self_keys[group]), []).append(group)
+
+        for row in order.tolist():
+            key = int(row_keys[row])
+            entry = {
+                "children_pct": float(100.0 * children[row] / total),
+                "self_pct": float(100.0 * self_weights[row] / total),
+                "command": str(self.commands[key // num_symbols]),
+                "sharedobject": dso,
+                "symbol": str(self.symbols[key % num_symbols]),
+            }
+            if not with_stacks:
+                yield entry, None
+                continue
+            yield entry, [
+                (
+                    self._stack_symbols(stacks[group]),
+                    float(100.0 * weights[group] / total),
+                )
+                for group in self_groups.get(key, [])
+            ]
+
+    def _stack_symbols(self, stack):
+        frames = self.stack_frames[
+            self.stack_offsets[stack] : self.stack_offsets[stack + 1]
+        ]
+        return self.symbols[self.frame_symbols[frames]].tolist()
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in SampleProfile.ARRAYS)
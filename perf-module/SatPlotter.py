@@ -1,15 +1,23 @@
-import json
-import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
 from PerfParser import PerfParser
+from StatsIO import load_stats
+from BatchPlotter import get_best_fit
 
 
 class SatPlotter:
-    def __init__(self, cnf_stats_path):
+    # row fields the plots read
+    COLUMNS = ["category", "self_pct", "norm_self_pct"]
+
+    def __init__(self, cnf_stats_path, cnfs=None):
+        """
+        cnf_stats_path: .json, .ndjson or .npz CNF stats
+        cnfs: optional subset of CNF names to load
+        """
         self.cnf_stats_path = Path(cnf_stats_path)
-        with open(self.cnf_stats_path, "r") as f:
-            self.cnf_stats = json.load(f)
+        self.cnf_stats = load_stats(
+            self.cnf_stats_path, keys=cnfs, columns=SatPlotter.COLUMNS
+        )
 
     def plot_sat_time_percent(self, normalize=False, show_best_fit=True):
         x = []
@@ -45,7 +53,7 @@ class SatPlotter:
         plt.scatter(x_timeout, y_timeout, color="red", label="Timed Out", marker="x")
 
         if show_best_fit:
-            x_fit, y_fit = self._get_best_fit(x, y)
+            x_fit, y_fit = get_best_fit(x, y)
             plt.plot(
                 x_fit, y_fit, color="green", label="Best Fit Line (log-scale on x-axis)"
             )
@@ -58,14 +66,3 @@ class SatPlotter:
         plt.ylim(0, 1)
 
         plt.show()
-
-    def _get_best_fit(self, x, y):
-        x_np = np.array(x)
-        y_np = np.array(y)
-
-        coeffs = np.polyfit(np.log(x_np), y_np, deg=1)
-        best_fit_fn = np.poly1d(coeffs)
-        x_fit = np.linspace(x_np.min(), x_np.max(), 500)
-        y_fit = best_fit_fn(np.log(x_fit))
-
-        return x_fit, y_fit
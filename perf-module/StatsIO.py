@@ -0,0 +1,138 @@
+import json
+import re
+from collections.abc import ItemsView, Mapping
+from pathlib import Path
+from CNFStatsTable import CNFStatsTable
+
+# every NDJSON line starts with its key so readers can skip lines unparsed
+NDJSON_KEY_PATTERN = re.compile(r'^\{"(?:cnf|name)": ("(?:[^"\\]|\\.)*")')
+
+
+def write_ndjson(output_path, items, key_field):
+    """
+    Writes one `{key_field: key, **value}` object per line, consuming `items`
+    lazily so the whole stats dict never has to be serialized at once.
+    Returns {key: byte offset of its line}, e.g. for `NDJSONStats`.
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    offsets = {}
+    offset = 0
+    with open(output_path, "w") as f:
+        for key, value in items:
+            # match json.dump, which stringifies non-str keys (None -> "null")
+            if not isinstance(key, str):
+                key = json.dumps(key)
+            # json.dumps escapes non-ASCII, so characters are bytes
+            line = json.dumps({key_field: key, **value}) + "\n"
+            f.write(line)
+            offsets[key] = offset
+            offset += len(line)
+    return offsets
+
+
+def write_json_items(output_path, items):
+    """
+    Writes `items` as one JSON object laid out exactly like
+    `json.dump(dict(items), f, indent=4)`, serializing one value at a time.
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w") as f:
+        f.write("{")
+        separator = "\n    "
+        for key, value in items:
+            if not isinstance(key, str):
+                key = json.dumps(key)
+            f.write(separator)
+            f.write(json.dumps(key))
+            f.write(": ")
+            f.write(json.dumps(value, indent=4).replace("\n", "\n    "))
+            separator = ",\n    "
+        f.write("}" if separator == "\n    " else "\n}")
+
+
+def iter_ndjson(path, keys=None, columns=None):
+    """
+    Yields (key, value) from a file written by `write_ndjson`. Lines whose
+    key is not in `keys` are skipped without being parsed; `columns` limits
+    the per-function row fields kept for CNF lines.
+    """
+    keys = None if keys is None else set(keys)
+    with open(path, "r") as f:
+        for line in f:
+            if keys is not None:
+                match = NDJSON_KEY_PATTERN.match(line)
+                if match is None or json.loads(match[1]) not in keys:
+                    continue
+            record = json.loads(line)
+            key = record.pop("cnf") if "cnf" in record else record.pop("name")
+            if columns is not None and "stats" in record:
+                record["stats"] = [
+                    {field: stat[field] for field in columns if field in stat}
+                    for stat in record["stats"]
+                ]
+            yield key, record
+
+
+class NDJSONStats(Mapping):
+    """
+    Read-only mapping over a file written by `write_ndjson`, given the
+    offsets it returned: a lookup reads one line, and iterating the items
+    scans the file once, so only the keys are held in memory.
+    """
+
+    def __init__(self, path, offsets):
+        self.path = Path(path)
+        self._offsets = offsets
+
+    def __getitem__(self, key):
+        offset = self._offsets[key]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            record = json.loads(f.readline())
+        record.pop("cnf" if "cnf" in record else "name")
+        return record
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def items(self):
+        return NDJSONItemsView(self)
+
+
+class NDJSONItemsView(ItemsView):
+    def __iter__(self):
+        return iter_ndjson(self._mapping.path)
+
+
+def load_stats(path, keys=None, columns=None):
+    """
+    Loads stats written by `PerfParser.to_json`, `to_ndjson` or `to_npz`
+    (picked by file suffix) into the JSON shape, optionally restricted to the
+    CNFs/functions in `keys` and, for CNF stats, the row fields in `columns`.
+    """
+    path = Path(path)
+    match path.suffix:
+        case ".ndjson":
+            return dict(iter_ndjson(path, keys, columns))
+        case ".npz":
+            table = CNFStatsTable.load_npz(path, keys, columns)
+            return table.to_cnf_stats(columns=columns)
+        case _:
+            with open(path, "r") as f:
+                stats = json.load(f)
+            if keys is not None:
+                keys = set(keys)
+                stats = {key: value for key, value in stats.items() if key in keys}
+            if columns is not None:
+                for value in stats.values():
+                    if "stats" in value:
+                        value["stats"] = [
+                            {field: stat[field] for field in columns if field in stat}
+                            for stat in value["stats"]
+                        ]
+            return stats
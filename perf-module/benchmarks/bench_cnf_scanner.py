@@ -0,0 +1,125 @@
+"""
+Throughput benchmark for CNF feature extraction.
+
+Compares the original line-by-line `_analyze_file` against the memory-mapped
+`scan_cnf`, and `CNFAnalyzer.analyze` across files with a process pool. Pass
+real CNFs with --cnf, otherwise synthetic 3-SAT files are generated in a
+temporary directory.
+
+    python benchmarks/bench_cnf_scanner.py --cnf ../c2d-analysis/cnfs/valid/x.cnf
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from CNFAnalyzer import CNFAnalyzer, SUMMARY_FEATURES, scan_cnf
+
+
+def legacy_analyze_file(cnf_path):
+    num_vars = 0
+    num_clauses = 0
+    total_size = 0
+
+    with open(cnf_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("c"):
+                continue
+            elif line.startswith("p cnf"):
+                _, _, num_vars, num_clauses = line.split()
+                num_vars = int(num_vars)
+                num_clauses = int(num_clauses)
+            else:
+                literals = line.split()
+                total_size += len([lit for lit in literals if lit != "0"])
+
+    return {
+        "num_vars": num_vars,
+        "num_clauses": num_clauses,
+        "total_size": total_size,
+    }
+
+
+def write_synthetic_cnf(path, num_vars=200_000, ratio=4.26, seed=0):
+    rng = np.random.default_rng(seed)
+    num_clauses = int(num_vars * ratio)
+    literals = rng.integers(1, num_vars + 1, size=(num_clauses, 3))
+    literals *= rng.choice([-1, 1], size=literals.shape)
+    with open(path, "w") as f:
+        f.write(f"c synthetic random 3-SAT\np cnf {num_vars} {num_clauses}\n")
+        np.savetxt(f, np.hstack((literals, np.zeros((num_clauses, 1), int))), "%d")
+
+
+def bench(fn, cnfs, repeat):
+    total_bytes = sum(cnf.stat().st_size for cnf in cnfs)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [fn(cnf) for cnf in cnfs]
+        best = min(best, time.perf_counter() - start)
+    return results, {"seconds": best, "gb_per_s": total_bytes / best / 1e9}
+
+
+def bench_pool(cnfs, jobs, repeat):
+    total_bytes = sum(cnf.stat().st_size for cnf in cnfs)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        valid_dir = Path(tmp_dir) / "valid"
+        valid_dir.mkdir()
+        for cnf in cnfs:
+            os.symlink(cnf.resolve(), valid_dir / cnf.name)
+
+        best = float("inf")
+        for _ in range(repeat):
+            analyzer = CNFAnalyzer(tmp_dir, tmp_dir, jobs=jobs)
+            start = time.perf_counter()
+            analyzer.analyze()
+            best = min(best, time.perf_counter() - start)
+    return {"seconds": best, "gb_per_s": total_bytes / best / 1e9}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cnf", action="append", default=[])
+    parser.add_argument("--num_files", type=int, default=4)
+    parser.add_argument("--num_vars", type=int, default=200_000)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        cnfs = [Path(c) for c in args.cnf]
+        if not cnfs:
+            for i in range(args.num_files):
+                cnf = Path(tmp_dir) / f"synthetic_{i}.cnf"
+                write_synthetic_cnf(cnf, args.num_vars, seed=i)
+                cnfs.append(cnf)
+
+        legacy, legacy_res = bench(legacy_analyze_file, cnfs, args.repeat)
+        scanned, scan_res = bench(scan_cnf, cnfs, args.repeat)
+        for cnf, old, new in zip(cnfs, legacy, scanned):
+            if any(old[feature] != new[feature] for feature in SUMMARY_FEATURES):
+                print(f"Mismatch on {cnf}: {old} vs {new}")
+
+        for name, res in [("legacy", legacy_res), ("scan_cnf", scan_res)]:
+            print(f"{name:>10}: {res['seconds']:.3f}s  {res['gb_per_s']:.3f} GB/s")
+        if args.jobs > 1:
+            res = bench_pool(cnfs, args.jobs, args.repeat)
+            print(
+                f"{'analyze':>10}: {res['seconds']:.3f}s  {res['gb_per_s']:.3f} GB/s"
+                f"  ({args.jobs} jobs)"
+            )
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Memory and aggregation benchmark for the dict-of-dicts cnf_stats against
+CNFStatsTable, on a synthetic corpus (default: 10x the ~470 c2d CNFs).
+
+    python benchmarks/bench_columnar.py --cnfs 4700 --functions 470
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from CNFStatsTable import CNFStatsTable
+from PerfParser import AbstractFunctionMap, PerfParser
+
+CATEGORIES = ["sat", "cache", "nnf", "compile", "dtree", "hdtree", "utility"]
+
+
+class SyntheticFunctionMap(AbstractFunctionMap):
+    def get_category(self, function_name):
+        return CATEGORIES[hash(function_name) % len(CATEGORIES)]
+
+
+def make_cnf_stats(num_cnfs, num_functions, rows_per_cnf, seed=0):
+    rng = random.Random(seed)
+    symbols = [f"function_{i}" for i in range(num_functions)]
+    function_map = SyntheticFunctionMap()
+    cnf_stats = {}
+    for i in range(num_cnfs):
+        rows = []
+        for symbol in rng.sample(symbols, rows_per_cnf):
+            self_pct = rng.random() * 10
+            rows.append(
+                {
+                    "children_pct": self_pct + rng.random(),
+                    "self_pct": self_pct,
+                    "command": "c2d",
+                    "sharedobject": "c2d",
+                    "symbol": symbol,
+                    "category": function_map.get_category(symbol),
+                }
+            )
+        total = sum(r["self_pct"] for r in rows)
+        for r in rows:
+            r["norm_self_pct"] = r["self_pct"] / total
+        runtime = PerfParser.TIMEOUT if rng.random() < 0.3 else rng.random() * 3000
+        cnf_stats[f"cnf_{i}.cnf"] = {"stats": rows, "time": runtime}
+    return cnf_stats, function_map
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cnfs", type=int, default=4700)
+    parser.add_argument("--functions", type=int, default=470)
+    parser.add_argument("--rows-per-cnf", type=int, default=200)
+    args = parser.parse_args()
+
+    cnf_stats, dict_seconds, dict_peak = measure(
+        lambda: make_cnf_stats(args.cnfs, args.functions, args.rows_per_cnf)[0]
+    )
+    function_map = SyntheticFunctionMap()
+    table, table_seconds, table_peak = measure(
+        lambda: CNFStatsTable.from_cnf_stats(cnf_stats)
+    )
+    print(f"rows: {table.num_rows:,}")
+    print(f"dict  build: {dict_seconds:.2f}s  peak {dict_peak / 1e6:.1f} MB")
+    print(
+        f"table build: {table_seconds:.2f}s  peak {table_peak / 1e6:.1f} MB  "
+        f"(resident {table.nbytes() / 1e6:.1f} MB)"
+    )
+
+    # a parser shell with just the fields the aggregation methods read
+    perf_parser = PerfParser.__new__(PerfParser)
+    perf_parser._cnf_stats = cnf_stats
+    perf_parser.normalize = True
+    perf_parser.function_map = function_map
+
+    start = time.perf_counter()
+    agg = perf_parser._aggregate_cnf_stats()
+    perf_parser._aggregate_cnf_stats_by_category(agg)
+    dict_agg_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table.aggregate(True, function_map.get_category)
+    table.aggregate_by_category(True, function_map.get_category)
+    table_agg_seconds = time.perf_counter() - start
+
+    print(f"dict  aggregate: {dict_agg_seconds:.3f}s")
+    print(f"table aggregate: {table_agg_seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
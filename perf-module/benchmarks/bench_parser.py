@@ -0,0 +1,133 @@
+"""
+Throughput benchmark for perf report parsing.
+
+Compares the original `readlines()` + per-line regex construction path against
+`stream_main_lines`. Pass real reports with --report, otherwise a synthetic
+folded report is generated in a temporary directory.
+
+    python benchmarks/bench_parser.py --report ../c2d-analysis/perf-report/x.cnf.log
+"""
+
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from PerfParser import Compiler, keep_symbol, stream_main_lines
+
+
+def legacy_match_main_line(line):
+    children_pct_pattern = r"\s*(?P<children_pct>\d+\.\d+)%"
+    self_pct_pattern = r"\s+(?P<self_pct>\d+\.\d+)%"
+    command_pattern = r"\s+(?P<command>\S+)"
+    sharedobject_pattern = r"\s+(?P<sharedobject>\S+)"
+    symbol_pattern = r"\s+\[\.\]\s+(?P<symbol>\S+)"
+    pattern = (
+        "^"
+        + children_pct_pattern
+        + self_pct_pattern
+        + command_pattern
+        + sharedobject_pattern
+        + symbol_pattern
+        + "$"
+    )
+
+    match = re.match(pattern, line)
+    if match:
+        res = match.groupdict()
+        res["children_pct"] = float(res["children_pct"])
+        res["self_pct"] = float(res["self_pct"])
+        return res
+    else:
+        return None
+
+
+def legacy_parse(perf_report, sharedobject):
+    with open(perf_report, "r") as f:
+        lines = f.readlines()
+        parsed = [legacy_match_main_line(line) for line in lines]
+        return [
+            p
+            for p in parsed
+            if p is not None
+            and p["sharedobject"] == sharedobject
+            and keep_symbol(p["symbol"])
+        ]
+
+
+def streaming_parse(perf_report, sharedobject):
+    return list(stream_main_lines(perf_report, sharedobject))
+
+
+def write_synthetic_report(path, num_functions=2000, stacks_per_function=40):
+    rng = random.Random(0)
+    symbols = [f"fn_{i}" for i in range(num_functions)]
+    with open(path, "w") as f:
+        f.write("# Samples: 1M of event 'cycles'\n#\n")
+        for symbol in symbols:
+            self_pct = rng.random()
+            f.write(
+                f"    {self_pct + 1:.2f}%     {self_pct:.2f}%  c2d      c2d"
+                f"                  [.] {symbol}\n"
+            )
+            f.write("            |\n")
+            for _ in range(stacks_per_function):
+                stack = ";".join(rng.sample(symbols, 12) + [symbol])
+                f.write(f"            |--{rng.random():.2f}%--{stack}\n")
+            f.write("\n")
+
+
+def bench(fn, reports, sharedobject, repeat):
+    total_bytes = sum(report.stat().st_size for report in reports)
+    total_lines = 0
+    for report in reports:
+        with open(report, "rb") as f:
+            total_lines += sum(1 for _ in f)
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = 0
+        for report in reports:
+            rows += len(fn(report, sharedobject))
+        best = min(best, time.perf_counter() - start)
+
+    return {
+        "seconds": best,
+        "rows": rows,
+        "mb_per_s": total_bytes / best / 1e6,
+        "lines_per_s": total_lines / best,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--report", action="append", default=[])
+    parser.add_argument(
+        "--compiler", choices=[c.value for c in Compiler], default="c2d"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        reports = [Path(r) for r in args.report]
+        if not reports:
+            synthetic = Path(tmp_dir) / "synthetic.cnf.log"
+            write_synthetic_report(synthetic)
+            reports = [synthetic]
+
+        for name, fn in [("legacy", legacy_parse), ("streaming", streaming_parse)]:
+            res = bench(fn, reports, args.compiler, args.repeat)
+            print(
+                f"{name:>10}: {res['seconds']:.3f}s  {res['mb_per_s']:.1f} MB/s  "
+                f"{res['lines_per_s']:,.0f} lines/s  ({res['rows']} rows)"
+            )
+
+
+if __name__ == "__main__":
+    main()
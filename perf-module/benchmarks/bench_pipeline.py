@@ -0,0 +1,228 @@
+"""
+End-to-end benchmark of the analysis pipeline on synthetic corpora (see
+synthetic_corpus.py) of 100, 1k and 10k CNFs: PerfParser construction, every
+`to_json` mode, PerfTableGenerator, SatPlotter and `CNFAnalyzer.analyze`.
+
+Results are written to a JSON baseline; pass --compare with an earlier
+baseline to print per-stage ratios and fail on stages slower than
+--tolerance. Corpora are generated once per size under --corpus-dir (a
+temporary directory by default) and reused on later runs.
+
+benchmarks/baseline.json is recorded with the first command below; record it
+again whenever a change makes a stage intentionally slower or faster.
+
+    python benchmarks/bench_pipeline.py --sizes 100 1000 10000 --repeat 3 --output benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --sizes 100 --repeat 3 --compare benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+import matplotlib
+
+# SatPlotter draws with pyplot; keep its show() from blocking
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from CNFAnalyzer import CNFAnalyzer
+from PerfParser import Compiler, PerfParser, StatMode
+from PerfTableGenerator import PerfTableGenerator
+from ReportBuilder import REPORT_SUBSETS
+from RunManifest import MANIFEST_NAME
+from SatPlotter import SatPlotter
+from synthetic_corpus import SymbolFunctionMap, generate_corpus
+
+SIZES = [100, 1000, 10000]
+
+
+def corpus_for(corpus_dir, num_cnfs, args):
+    """
+    Generates the corpus of `num_cnfs` CNFs unless it already exists.
+    """
+    output_dir = Path(corpus_dir) / f"{args.compiler}_{num_cnfs}"
+    function_map_path = output_dir / "function_map.json"
+    if not function_map_path.exists():
+        generate_corpus(
+            output_dir,
+            num_cnfs,
+            compiler=Compiler(args.compiler),
+            num_functions=args.functions,
+            rows_per_report=args.rows_per_report,
+            seed=args.seed,
+        )
+    return output_dir
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def bench_size(corpus_dir, args):
+    """
+    Returns {stage: best seconds} for one corpus.
+    """
+    compiler = Compiler(args.compiler)
+    function_map = SymbolFunctionMap.load(corpus_dir / "function_map.json")
+    stats_dir = corpus_dir / "stats"
+    stats_dir.mkdir(exist_ok=True)
+    results = {}
+
+    def build_parser():
+        # time a cold start: the stdout manifest is rebuilt like on a first run
+        (corpus_dir / "stdout" / MANIFEST_NAME).unlink(missing_ok=True)
+        return PerfParser(
+            compiler,
+            function_map,
+            perf_dir=corpus_dir / "perf-report",
+            stdout_dir=corpus_dir / "stdout" / "valid",
+            jobs=args.jobs,
+            columnar=args.columnar,
+            streaming=args.streaming,
+            spill_path=stats_dir / "cnf_rows.ndjson" if args.streaming else None,
+        )
+
+    perf_parser, results["perf_parser"] = timed(build_parser, args.repeat)
+
+    for stat_mode in StatMode:
+        path = stats_dir / f"{stat_mode.value}.json"
+
+        def write_json():
+            # drop computed views so every repeat recomputes its mode
+            perf_parser._views = {}
+            perf_parser.to_json(path, stat_mode)
+
+        _, results[f"to_json:{stat_mode.value}"] = timed(write_json, args.repeat)
+
+    def generate_tables():
+        for aggregate_mode, category_mode in REPORT_SUBSETS.values():
+            generator = PerfTableGenerator(
+                stats_dir / f"{aggregate_mode.value}.json",
+                stats_dir / f"{category_mode.value}.json",
+            )
+            generator.generate_function_table_latex()
+            generator.generate_category_table_latex()
+
+    _, results["perf_table_generator"] = timed(generate_tables, args.repeat)
+
+    def plot_sat():
+        SatPlotter(
+            stats_dir / f"{StatMode.CNF_STATS.value}.json"
+        ).plot_sat_time_percent()
+        plt.close("all")
+
+    _, results["sat_plotter"] = timed(plot_sat, args.repeat)
+
+    def analyze():
+        return CNFAnalyzer(
+            str(corpus_dir / "cnfs"),
+            str(corpus_dir / "stdout" / "valid"),
+            jobs=args.jobs,
+        ).analyze()
+
+    _, results["cnf_analyzer"] = timed(analyze, args.repeat)
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints each stage's time relative to the baseline and returns the
+    (size, stage) pairs slower than `tolerance` times their baseline.
+    """
+    regressions = []
+    for size, stages in results.items():
+        baseline_stages = baseline.get("results", {}).get(size)
+        if baseline_stages is None:
+            print(f"{size} CNFs: not in baseline")
+            continue
+        for stage, seconds in stages.items():
+            if stage not in baseline_stages:
+                continue
+            ratio = seconds / baseline_stages[stage]
+            flag = "  REGRESSION" if ratio > tolerance else ""
+            print(f"{size:>6} {stage:>36}: {ratio:5.2f}x{flag}")
+            if ratio > tolerance:
+                regressions.append((size, stage))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument(
+        "--compiler", choices=[c.value for c in Compiler], default="c2d"
+    )
+    parser.add_argument("--functions", type=int, default=None)
+    parser.add_argument("--rows-per-report", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--columnar", action="store_true")
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--corpus-dir", default=None)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None)
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus_root = Path(args.corpus_dir or tmp_dir)
+        results = {}
+        for num_cnfs in args.sizes:
+            corpus_dir = corpus_for(corpus_root, num_cnfs, args)
+            stages = bench_size(corpus_dir, args)
+            results[str(num_cnfs)] = stages
+            for stage, seconds in stages.items():
+                print(f"{num_cnfs:>6} {stage:>36}: {seconds:8.3f}s")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "environment": environment(),
+                    "config": {
+                        "compiler": args.compiler,
+                        "functions": args.functions,
+                        "rows_per_report": args.rows_per_report,
+                        "seed": args.seed,
+                        "jobs": args.jobs,
+                        "columnar": args.columnar,
+                        "streaming": args.streaming,
+                        "repeat": args.repeat,
+                    },
+                    "results": results,
+                },
+                f,
+                indent=4,
+            )
+
+    if args.compare is not None:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Consistency checks of the derived profiles against the flat aggregates, run
+on a small synthetic corpus (see synthetic_corpus.py), for every subset and
+with and without normalization:
+
+- each function's exclusive time summed over the calling-context tree's
+  contexts must match its aggregate time
+- the total weight of the exported flame graphs (folded stacks and
+  speedscope) must match the subset's total aggregate time
+
+Exits with 1 and lists the mismatches if a check fails.
+
+    python benchmarks/check_consistency.py --cnfs 50
+"""
+
+import argparse
+import json
+import math
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from FlameGraphExporter import FlameGraphExporter
+from PerfParser import Compiler, PerfParser, StatMode
+from synthetic_corpus import SymbolFunctionMap, generate_corpus
+
+ROW_TO_AGGREGATE_MODE = {
+    StatMode.CNF_STATS: StatMode.AGGREGATE_STATS,
+    StatMode.TIMED_OUT_STATS: StatMode.AGGREGATE_TIMED_OUT_STATS,
+    StatMode.COMPLETED_STATS: StatMode.AGGREGATE_COMPLETED_STATS,
+}
+REL_TOLERANCE = 1e-9
+# to_folded writes values with 6 decimals
+FOLDED_PRECISION = 1e-6
+
+
+def mismatches(expected, actual, rel_tol=REL_TOLERANCE):
+    """
+    Returns [(name, expected, actual)] for the names of either {name: value}
+    dict whose values differ beyond `rel_tol` (missing counts as 0).
+    """
+    abs_tol = rel_tol * max([abs(value) for value in expected.values()] + [1.0])
+    return [
+        (name, expected.get(name, 0.0), actual.get(name, 0.0))
+        for name in sorted(set(expected) | set(actual))
+        if not math.isclose(
+            expected.get(name, 0.0),
+            actual.get(name, 0.0),
+            rel_tol=rel_tol,
+            abs_tol=abs_tol,
+        )
+    ]
+
+
+def check_exclusive_totals(perf_parser):
+    """
+    Mismatches between `exclusive_by_frame` of every row view's
+    calling-context tree and the matching aggregate stats.
+    """
+    failures = []
+    for row_mode, aggregate_mode in ROW_TO_AGGREGATE_MODE.items():
+        tree = perf_parser.build_calling_context_tree(row_mode)
+        aggregate = {
+            name: entry["time"]
+            for name, entry in perf_parser.get_stats(aggregate_mode).items()
+        }
+        for name, expected, actual in mismatches(aggregate, tree.exclusive_by_frame()):
+            failures.append(
+                f"{row_mode.value}: {name} exclusive {actual} != aggregate {expected}"
+            )
+    return failures
+
+
+def check_flame_graph_totals(perf_parser, output_dir):
+    """
+    Mismatches between the total weight of every row view's exported flame
+    graphs and the matching aggregate time.
+    """
+    failures = []
+    for row_mode, aggregate_mode in ROW_TO_AGGREGATE_MODE.items():
+        expected = sum(
+            entry["time"] for entry in perf_parser.get_stats(aggregate_mode).values()
+        )
+        exporter = FlameGraphExporter(perf_parser.build_calling_context_tree(row_mode))
+
+        speedscope_path = Path(output_dir) / f"{row_mode.value}.speedscope.json"
+        exporter.to_speedscope(speedscope_path)
+        with open(speedscope_path, "r") as f:
+            speedscope_total = sum(json.load(f)["profiles"][0]["weights"])
+        if not math.isclose(speedscope_total, expected, rel_tol=REL_TOLERANCE):
+            failures.append(
+                f"{row_mode.value}: speedscope total {speedscope_total} "
+                f"!= aggregate {expected}"
+            )
+
+        folded_path = Path(output_dir) / f"{row_mode.value}.folded"
+        exporter.to_folded(folded_path)
+        with open(folded_path, "r") as f:
+            values = [float(line.rsplit(" ", 1)[1]) for line in f]
+        if not math.isclose(
+            sum(values), expected, abs_tol=FOLDED_PRECISION * len(values)
+        ):
+            failures.append(
+                f"{row_mode.value}: folded total {sum(values)} != aggregate {expected}"
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cnfs", type=int, default=50)
+    parser.add_argument(
+        "--compiler", choices=[c.value for c in Compiler], default="c2d"
+    )
+    parser.add_argument("--rows-per-report", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        corpus_dir = Path(corpus_dir)
+        compiler = Compiler(args.compiler)
+        generate_corpus(
+            corpus_dir,
+            args.cnfs,
+            compiler=compiler,
+            rows_per_report=args.rows_per_report,
+            seed=args.seed,
+        )
+        function_map = SymbolFunctionMap.load(corpus_dir / "function_map.json")
+        for normalize in (True, False):
+            perf_parser = PerfParser(
+                compiler,
+                function_map,
+                perf_dir=corpus_dir / "perf-report",
+                stdout_dir=corpus_dir / "stdout" / "valid",
+                normalize=normalize,
+            )
+            failures += [
+                f"normalize={normalize} {failure}"
+                for failure in check_exclusive_totals(perf_parser)
+                + check_flame_graph_totals(perf_parser, corpus_dir / "flame_graphs")
+            ]
+
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+    print("All consistency checks passed")
+
+
+if __name__ == "__main__":
+    main()
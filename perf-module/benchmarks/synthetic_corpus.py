@@ -0,0 +1,308 @@
+"""
+Synthetic corpus generator for the perf-module benchmarks.
+
+Writes the three inputs the analysis pipeline reads, for any number of
+CNFs, shaped like the real c2d/miniC2D runs:
+
+    <output_dir>/perf-report/<cnf>.log   text perf reports (header, main
+                                         lines and folded call stacks)
+    <output_dir>/stdout/valid/<cnf>.log  compiler stdout logs, without a
+                                         Total Time for timed-out runs
+    <output_dir>/cnfs/valid/<cnf>        random 3-SAT DIMACS files
+    <output_dir>/function_map.json       {symbol: category} of the symbols
+
+Symbols and their categories are taken from the compiler's tags/ directory
+(c2d: tags.ndjson + category_to_file.json, miniC2D:
+category_to_functions.json), padded with made-up names when more functions
+are requested than the tags define.
+
+    python benchmarks/synthetic_corpus.py /tmp/corpus --cnfs 1000 --compiler c2d
+"""
+
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+import numpy as np
+from tqdm import tqdm
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from PerfParser import AbstractFunctionMap, Compiler, PerfParser
+
+REPO_DIR = Path(__file__).resolve().parents[2]
+TAGS_DIRS = {
+    Compiler.C2D: REPO_DIR / "c2d-analysis" / "tags",
+    Compiler.MINIC2D: REPO_DIR / "miniC2D-analysis" / "tags",
+}
+TAG_KINDS = {"function", "subroutine"}
+
+# perf's default sampling frequency, used to size the report headers
+SAMPLE_FREQUENCY = 4000
+CYCLES_PER_SAMPLE = 750_000
+# share of samples outside the compiler binary (libc, kernel)
+FOREIGN_SHARE = 0.05
+FOREIGN_SYMBOLS = [
+    ("libc.so.6", "__memmove_avx_unaligned_erms"),
+    ("libc.so.6", "_int_malloc"),
+    ("[kernel.kallsyms]", "clear_page_erms"),
+]
+PHASES = ["Read", "Decompose", "Compile"]
+CLAUSE_RATIO = 4.26
+
+
+class SymbolFunctionMap(AbstractFunctionMap):
+    """
+    Function map over a fixed {symbol: category} dict, e.g. a synthetic
+    corpus' function_map.json.
+    """
+
+    def __init__(self, symbol_categories, input_paths=()):
+        self.symbol_categories = symbol_categories
+        self.input_paths = list(input_paths)
+
+    @classmethod
+    def load(cls, function_map_path):
+        with open(function_map_path, "r") as f:
+            return cls(json.load(f), input_paths=[function_map_path])
+
+    def get_category(self, function_name):
+        return self.symbol_categories.get(function_name)
+
+    def get_input_paths(self):
+        return self.input_paths
+
+
+def load_tag_symbols(compiler: Compiler, tags_dir=None):
+    """
+    Returns {symbol: category} of the functions in a compiler's tags/
+    directory; c2d functions in files without a category map to None.
+    """
+    tags_dir = Path(tags_dir) if tags_dir is not None else TAGS_DIRS[compiler]
+
+    if compiler == Compiler.MINIC2D:
+        with open(tags_dir / "category_to_functions.json", "r") as f:
+            category_to_functions = json.load(f)
+        return {
+            function: category
+            for category, functions in category_to_functions.items()
+            for function in functions
+        }
+
+    with open(tags_dir / "category_to_file.json", "r") as f:
+        category_to_files = json.load(f)
+    file_to_category = {
+        file: category
+        for category, files in category_to_files.items()
+        for file in files
+    }
+    symbol_categories = {}
+    with open(tags_dir / "tags.ndjson", "r") as f:
+        for line in f:
+            tag = json.loads(line)
+            if tag.get("kind") in TAG_KINDS:
+                symbol_categories.setdefault(
+                    tag["name"], file_to_category.get(tag.get("path"))
+                )
+    return symbol_categories
+
+
+def pick_symbols(symbol_categories, num_functions, rng):
+    """
+    `num_functions` symbols of `symbol_categories` (all of them when None),
+    padded with "<category>_synthetic_<i>" names cycling through the
+    categories when the tags define fewer.
+    """
+    symbols = sorted(symbol_categories)
+    if num_functions is None:
+        return dict(symbol_categories)
+    if num_functions <= len(symbols):
+        chosen = rng.choice(len(symbols), size=num_functions, replace=False)
+        return {symbols[i]: symbol_categories[symbols[i]] for i in sorted(chosen)}
+
+    picked = dict(symbol_categories)
+    categories = sorted({c for c in symbol_categories.values() if c is not None})
+    for i in range(num_functions - len(symbols)):
+        category = categories[i % len(categories)]
+        picked[f"{category}_synthetic_{i}"] = category
+    return picked
+
+
+def write_perf_report(
+    path, compiler: Compiler, symbols, rng, runtime, rows, stacks_per_row
+):
+    """
+    Text `perf report --children -g folded` output for one CNF: `rows`
+    symbols with Dirichlet-distributed self shares, each followed by up to
+    `stacks_per_row` folded call stacks ending in it.
+    """
+    binary = compiler.value
+    rows = min(rows, len(symbols))
+    chosen = rng.choice(len(symbols), size=rows, replace=False)
+    self_pcts = rng.dirichlet(np.full(rows, 0.3)) * (1 - FOREIGN_SHARE) * 100
+    children_pcts = self_pcts + rng.random(rows) * (100 - self_pcts) * 0.2
+
+    samples = max(int(runtime * SAMPLE_FREQUENCY), 1)
+    lines = [
+        f"# Total Lost Samples: {int(samples * rng.random() * 0.01)}\n",
+        "#\n",
+        f"# Samples: {_abbreviate(samples)} of event 'cycles'\n",
+        f"# Event count (approx.): {samples * CYCLES_PER_SAMPLE}\n",
+        "#\n",
+        "# Children      Self  Command  Shared Object        Symbol\n",
+        "#\n",
+    ]
+    for i, self_pct, children_pct in zip(chosen, self_pcts, children_pcts):
+        symbol = symbols[i]
+        lines.append(
+            f"    {children_pct:5.2f}%    {self_pct:5.2f}%  {binary}      {binary}"
+            f"                  [.] {symbol}\n"
+        )
+        lines.append("            |\n")
+        num_stacks = rng.integers(1, stacks_per_row + 1)
+        stack_pcts = rng.dirichlet(np.ones(num_stacks)) * children_pct
+        for stack_pct in stack_pcts:
+            depth = rng.integers(2, 12)
+            callers = [symbols[j] for j in rng.choice(len(symbols), size=depth)]
+            stack = ";".join(["main"] + callers + [symbol])
+            lines.append(f"            |--{stack_pct:.2f}%--{stack}\n")
+        lines.append("\n")
+
+    for (dso, symbol), pct in zip(
+        FOREIGN_SYMBOLS, rng.dirichlet(np.ones(len(FOREIGN_SYMBOLS))) * FOREIGN_SHARE
+    ):
+        lines.append(
+            f"    {pct * 100:5.2f}%    {pct * 100:5.2f}%  {binary}      {dso}"
+            f"                  [.] {symbol}\n\n"
+        )
+
+    with open(path, "w") as f:
+        f.writelines(lines)
+
+
+def write_stdout_log(path, rng, runtime, timed_out):
+    """
+    Compiler stdout: phase times summing to `runtime`, and a Total Time line
+    unless the run timed out.
+    """
+    lines = ["Reading CNF...\n", "Compiling...\n"]
+    if not timed_out:
+        for phase, share in zip(PHASES, rng.dirichlet(np.ones(len(PHASES)))):
+            lines.append(f"{phase} Time: {runtime * share:.3f}s\n")
+        lines.append(f"Total Time: {runtime:.3f}s\n")
+    with open(path, "w") as f:
+        f.writelines(lines)
+
+
+def write_cnf(path, rng, num_vars):
+    num_clauses = int(num_vars * CLAUSE_RATIO)
+    literals = rng.integers(1, num_vars + 1, size=(num_clauses, 3))
+    literals *= rng.choice([-1, 1], size=literals.shape)
+    with open(path, "w") as f:
+        f.write(f"c synthetic random 3-SAT\np cnf {num_vars} {num_clauses}\n")
+        f.write("%d %d %d 0\n" * num_clauses % tuple(literals.ravel().tolist()))
+
+
+def _abbreviate(count):
+    # perf prints large sample counts in K/M
+    for unit, size in [("M", 10**6), ("K", 10**3)]:
+        if count >= 10 * size:
+            return f"{count / size:.0f}{unit}"
+    return str(count)
+
+
+def generate_corpus(
+    output_dir,
+    num_cnfs,
+    compiler: Compiler = Compiler.C2D,
+    num_functions=None,
+    tags_dir=None,
+    rows_per_report=100,
+    stacks_per_row=4,
+    timeout_ratio=0.3,
+    num_vars=200,
+    seed=0,
+):
+    """
+    Writes a synthetic corpus of `num_cnfs` CNFs to `output_dir` (see the
+    module docstring) and returns its {symbol: category}.
+
+    Completed runtimes are log-uniform between 10ms and the timeout; CNF
+    sizes scale with them, up to 10x `num_vars`.
+    """
+    rng = np.random.default_rng(seed)
+    output_dir = Path(output_dir)
+    perf_dir = output_dir / "perf-report"
+    stdout_dir = output_dir / "stdout" / "valid"
+    cnfs_dir = output_dir / "cnfs" / "valid"
+    for directory in [perf_dir, stdout_dir, cnfs_dir]:
+        directory.mkdir(parents=True, exist_ok=True)
+
+    symbol_categories = pick_symbols(
+        load_tag_symbols(compiler, tags_dir), num_functions, rng
+    )
+    symbols = list(symbol_categories)
+    with open(output_dir / "function_map.json", "w") as f:
+        json.dump(symbol_categories, f, indent=4)
+
+    width = len(str(num_cnfs - 1))
+    for i in tqdm(range(num_cnfs), desc="Generating CNFs..."):
+        cnf_name = f"synthetic_{i:0{width}d}.cnf"
+        timed_out = rng.random() < timeout_ratio
+        if timed_out:
+            runtime = PerfParser.TIMEOUT
+        else:
+            runtime = math.exp(
+                rng.uniform(math.log(0.01), math.log(PerfParser.TIMEOUT))
+            )
+        scale = math.log(runtime / 0.01) / math.log(PerfParser.TIMEOUT / 0.01)
+
+        write_perf_report(
+            perf_dir / f"{cnf_name}.log",
+            compiler,
+            symbols,
+            rng,
+            runtime,
+            rows_per_report,
+            stacks_per_row,
+        )
+        write_stdout_log(stdout_dir / f"{cnf_name}.log", rng, runtime, timed_out)
+        write_cnf(cnfs_dir / cnf_name, rng, max(int(num_vars * (1 + 9 * scale)), 3))
+
+    return symbol_categories
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output_dir")
+    parser.add_argument("--cnfs", type=int, default=1000)
+    parser.add_argument(
+        "--compiler", choices=[c.value for c in Compiler], default="c2d"
+    )
+    parser.add_argument("--functions", type=int, default=None)
+    parser.add_argument("--tags-dir", default=None)
+    parser.add_argument("--rows-per-report", type=int, default=100)
+    parser.add_argument("--stacks-per-row", type=int, default=4)
+    parser.add_argument("--timeout-ratio", type=float, default=0.3)
+    parser.add_argument("--vars", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    symbol_categories = generate_corpus(
+        args.output_dir,
+        args.cnfs,
+        compiler=Compiler(args.compiler),
+        num_functions=args.functions,
+        tags_dir=args.tags_dir,
+        rows_per_report=args.rows_per_report,
+        stacks_per_row=args.stacks_per_row,
+        timeout_ratio=args.timeout_ratio,
+        num_vars=args.vars,
+        seed=args.seed,
+    )
+    print(f"{args.cnfs} CNFs over {len(symbol_categories)} functions")
+
+
+if __name__ == "__main__":
+    main()